@@ -1,13 +1,69 @@
+import asyncio
+import json
 import sqlite3
+import zlib
 import aiosqlite
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from backend.models import Project, Document, ChatHistory, ProjectStats
+from backend.db_pool import ConnectionPool
+from backend.models import Project, Document, ChatHistory, ChatHistorySearchResult, ProjectStats, DocumentVectors, ConversationSummary, DocumentInsights, DocumentWithInsights
+from backend.serialization import models_from_rows
 from shared.config import Config
 
+# Column order of the SELECTs that feed models_from_rows
+_PROJECT_COLUMNS = ("id", "name", "description", "created_at", "updated_at")
+_DOCUMENT_COLUMNS = ("id", "project_id", "filename", "file_type", "file_size", "upload_date", "status", "content_hash")
+_CHAT_COLUMNS = ("id", "project_id", "message", "response", "timestamp")
+
+def _pack_turns(turns: List[ChatHistory]) -> List[Tuple]:
+    """Archive rows for chat turns, with message and response compressed together"""
+    return [
+        (turn.id, turn.project_id, turn.timestamp, zlib.compress(json.dumps([turn.message, turn.response]).encode()))
+        for turn in turns
+    ]
+
+def _unpack_turn(row) -> ChatHistory:
+    message, response = json.loads(zlib.decompress(row[3]))
+    return ChatHistory(id=row[0], project_id=row[1], message=message, response=response, timestamp=datetime.fromisoformat(row[2]))
+
+# Sort keys accepted by the document listing; each has a (project_id, column, id) index
+DOCUMENT_SORTS = {"upload_date": "d.upload_date", "filename": "d.filename", "file_size": "d.file_size"}
+
 class Database:
     def __init__(self, db_path: str = None):
         self.db_path = db_path or Config.DATABASE_PATH
+        self.pool = ConnectionPool(self.db_path)
+    
+    async def connect(self):
+        """Open the connection pool"""
+        await self.pool.open()
+    
+    async def close(self):
+        """Close the connection pool"""
+        await self.pool.close()
+    
+    async def optimize(self):
+        """Let SQLite refresh planner statistics that have gone stale"""
+        async with self.pool.writer() as conn:
+            await conn.execute("PRAGMA optimize")
+    
+    async def analyze(self):
+        """Recollect planner statistics for every index, sampling to bound the cost"""
+        async with self.pool.writer() as conn:
+            await conn.execute(f"PRAGMA analysis_limit = {Config.SQLITE_ANALYSIS_LIMIT}")
+            await conn.execute("ANALYZE")
+    
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Return up to ``pages`` free pages to the filesystem, returning how many were freed"""
+        async with self.pool.writer() as conn:
+            cursor = await conn.execute("PRAGMA freelist_count")
+            free = (await cursor.fetchone())[0]
+            if not free:
+                return 0
+            # Stepped to completion by executescript; execute would free a single page
+            await conn.executescript(f"PRAGMA incremental_vacuum({min(free, pages)});")
+            cursor = await conn.execute("PRAGMA freelist_count")
+            return free - (await cursor.fetchone())[0]
     
     async def get_connection(self):
         """Get async database connection"""
@@ -15,16 +71,15 @@ class Database:
     
     # Project CRUD operations
     async def create_project(self, project: Project) -> Project:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.writer() as conn:
             await conn.execute(
                 "INSERT INTO projects (id, name, description, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
                 (project.id, project.name, project.description, project.created_at, project.updated_at)
             )
-            await conn.commit()
             return project
     
     async def get_project(self, project_id: str) -> Optional[Project]:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.reader() as conn:
             cursor = await conn.execute(
                 "SELECT id, name, description, created_at, updated_at FROM projects WHERE id = ?",
                 (project_id,)
@@ -41,24 +96,15 @@ class Database:
             return None
     
     async def get_all_projects(self) -> List[Project]:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.reader() as conn:
             cursor = await conn.execute(
                 "SELECT id, name, description, created_at, updated_at FROM projects ORDER BY updated_at DESC"
             )
             rows = await cursor.fetchall()
-            return [
-                Project(
-                    id=row[0],
-                    name=row[1],
-                    description=row[2],
-                    created_at=datetime.fromisoformat(row[3]),
-                    updated_at=datetime.fromisoformat(row[4])
-                )
-                for row in rows
-            ]
+            return models_from_rows(Project, _PROJECT_COLUMNS, rows)
     
     async def update_project(self, project_id: str, name: str = None, description: str = None) -> Optional[Project]:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.writer() as conn:
             updates = []
             params = []
             
@@ -78,49 +124,110 @@ class Database:
                     f"UPDATE projects SET {', '.join(updates)} WHERE id = ?",
                     params
                 )
-                await conn.commit()
-            
-            return await self.get_project(project_id)
+        
+        return await self.get_project(project_id)
     
-    async def delete_project(self, project_id: str) -> bool:
-        async with aiosqlite.connect(self.db_path) as conn:
+    async def delete_project(self, project_id: str) -> Optional[List[str]]:
+        """Delete a project with its documents and chat history in one transaction.
+        
+        Foreign keys are not enforced, so the dependent rows are removed
+        explicitly. Returns the content hashes the project's documents
+        referred to, or None if the project did not exist.
+        """
+        async with self.pool.writer() as conn:
+            cursor = await conn.execute(
+                "SELECT DISTINCT content_hash FROM documents WHERE project_id = ? AND content_hash IS NOT NULL",
+                (project_id,)
+            )
+            content_hashes = [row[0] for row in await cursor.fetchall()]
+            await conn.execute(
+                "DELETE FROM document_insights WHERE document_id IN (SELECT id FROM documents WHERE project_id = ?)",
+                (project_id,)
+            )
+            await conn.execute("DELETE FROM documents WHERE project_id = ?", (project_id,))
+            await conn.execute("DELETE FROM chat_history WHERE project_id = ?", (project_id,))
+            await conn.execute("DELETE FROM conversation_summaries WHERE project_id = ?", (project_id,))
             cursor = await conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-            await conn.commit()
-            return cursor.rowcount > 0
+            return content_hashes if cursor.rowcount > 0 else None
     
     # Document CRUD operations
     async def create_document(self, document: Document) -> Document:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.writer() as conn:
             await conn.execute(
-                "INSERT INTO documents (id, project_id, filename, file_type, file_size, upload_date) VALUES (?, ?, ?, ?, ?, ?)",
-                (document.id, document.project_id, document.filename, document.file_type, document.file_size, document.upload_date)
+                "INSERT INTO documents (id, project_id, filename, file_type, file_size, upload_date, status, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (document.id, document.project_id, document.filename, document.file_type, document.file_size, document.upload_date, document.status, document.content_hash)
             )
-            await conn.commit()
             return document
     
+    async def create_documents(self, documents: List[Document]) -> List[Document]:
+        """Insert many documents in one transaction"""
+        async with self.pool.writer() as conn:
+            await conn.executemany(
+                "INSERT INTO documents (id, project_id, filename, file_type, file_size, upload_date, status, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (document.id, document.project_id, document.filename, document.file_type, document.file_size, document.upload_date, document.status, document.content_hash)
+                    for document in documents
+                ]
+            )
+            return documents
+    
+    async def update_document_statuses(self, statuses: Dict[str, str]) -> int:
+        """Set the status of many documents in one transaction, keyed by document id"""
+        async with self.pool.writer() as conn:
+            await conn.executemany(
+                "UPDATE documents SET status = ? WHERE id = ?",
+                [(status, document_id) for document_id, status in statuses.items()]
+            )
+            return len(statuses)
+    
+    async def count_content_hash_references(self, content_hash: str) -> int:
+        """Documents whose original is the blob with this hash"""
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT COUNT(*) FROM documents WHERE content_hash = ?", (content_hash,))
+            return (await cursor.fetchone())[0]
+    
+    async def get_documents_after(self, project_id: Optional[str], after: Optional[str], limit: int) -> List[Document]:
+        """Documents of existing projects ordered by id, resuming after the ``after`` id; all projects when ``project_id`` is None"""
+        conditions, params = ["d.id > ?"], [after or ""]
+        if project_id:
+            conditions.append("d.project_id = ?")
+            params.append(project_id)
+        async with self.pool.reader() as conn:
+            # Rows left behind by projects deleted before their documents were removed with them are skipped
+            cursor = await conn.execute(
+                f"""
+                SELECT d.id, d.project_id, d.filename, d.file_type, d.file_size, d.upload_date, d.status, d.content_hash
+                FROM documents d
+                JOIN projects p ON p.id = d.project_id
+                WHERE {" AND ".join(conditions)}
+                ORDER BY d.id LIMIT ?
+                """,
+                (*params, limit)
+            )
+            rows = await cursor.fetchall()
+            return models_from_rows(Document, _DOCUMENT_COLUMNS, rows)
+    
+    async def delete_documents(self, document_ids: List[str]) -> int:
+        """Delete many documents and their insights in one transaction"""
+        async with self.pool.writer() as conn:
+            params = [(document_id,) for document_id in document_ids]
+            await conn.executemany("DELETE FROM document_insights WHERE document_id = ?", params)
+            cursor = await conn.executemany("DELETE FROM documents WHERE id = ?", params)
+            return cursor.rowcount
+    
     async def get_documents_by_project(self, project_id: str) -> List[Document]:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.reader() as conn:
             cursor = await conn.execute(
-                "SELECT id, project_id, filename, file_type, file_size, upload_date FROM documents WHERE project_id = ? ORDER BY upload_date DESC",
+                "SELECT id, project_id, filename, file_type, file_size, upload_date, status, content_hash FROM documents WHERE project_id = ? ORDER BY upload_date DESC",
                 (project_id,)
             )
             rows = await cursor.fetchall()
-            return [
-                Document(
-                    id=row[0],
-                    project_id=row[1],
-                    filename=row[2],
-                    file_type=row[3],
-                    file_size=row[4],
-                    upload_date=datetime.fromisoformat(row[5])
-                )
-                for row in rows
-            ]
+            return models_from_rows(Document, _DOCUMENT_COLUMNS, rows)
     
     async def get_document(self, document_id: str) -> Optional[Document]:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.reader() as conn:
             cursor = await conn.execute(
-                "SELECT id, project_id, filename, file_type, file_size, upload_date FROM documents WHERE id = ?",
+                "SELECT id, project_id, filename, file_type, file_size, upload_date, status, content_hash FROM documents WHERE id = ?",
                 (document_id,)
             )
             row = await cursor.fetchone()
@@ -131,78 +238,421 @@ class Database:
                     filename=row[2],
                     file_type=row[3],
                     file_size=row[4],
-                    upload_date=datetime.fromisoformat(row[5])
+                    upload_date=datetime.fromisoformat(row[5]),
+                    status=row[6],
+                    content_hash=row[7]
                 )
             return None
     
     async def delete_document(self, document_id: str) -> bool:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.writer() as conn:
             cursor = await conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
-            await conn.commit()
+            await conn.execute("DELETE FROM document_insights WHERE document_id = ?", (document_id,))
             return cursor.rowcount > 0
     
+    # Document insights operations
+    async def save_document_insights(self, insights: DocumentInsights) -> DocumentInsights:
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                "INSERT OR REPLACE INTO document_insights (document_id, project_id, summary, outline, key_terms, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (insights.document_id, insights.project_id, insights.summary, json.dumps(insights.outline), json.dumps(insights.key_terms), insights.created_at)
+            )
+            return insights
+    
+    async def get_document_insights(self, document_id: str) -> Optional[DocumentInsights]:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT document_id, project_id, summary, outline, key_terms, created_at FROM document_insights WHERE document_id = ?",
+                (document_id,)
+            )
+            row = await cursor.fetchone()
+            return self._row_to_insights(row) if row else None
+    
+    async def get_documents_with_insights(self, project_id: str) -> List[DocumentWithInsights]:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT d.id, d.project_id, d.filename, d.file_type, d.file_size, d.upload_date, d.status, d.content_hash,
+                       i.document_id, i.project_id, i.summary, i.outline, i.key_terms, i.created_at
+                FROM documents d
+                LEFT JOIN document_insights i ON i.document_id = d.id
+                WHERE d.project_id = ?
+                ORDER BY d.upload_date DESC
+                """,
+                (project_id,)
+            )
+            rows = await cursor.fetchall()
+            return models_from_rows(
+                DocumentWithInsights,
+                _DOCUMENT_COLUMNS + ("insights",),
+                [row[:8] + (self._row_to_insights(row[8:]) if row[8] else None,) for row in rows]
+            )
+    
+    def _document_filters(self, project_id: str, name_filter: Optional[str], file_type: Optional[str]) -> Tuple[List[str], List]:
+        conditions, params = ["d.project_id = ?"], [project_id]
+        if name_filter:
+            escaped = name_filter.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("d.filename LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if file_type:
+            conditions.append("d.file_type = ?")
+            params.append(file_type)
+        return conditions, params
+    
+    async def get_documents_page(
+        self,
+        project_id: str,
+        sort: str = "upload_date",
+        descending: bool = True,
+        after: Optional[Tuple] = None,
+        limit: int = 50,
+        name_filter: Optional[str] = None,
+        file_type: Optional[str] = None
+    ) -> List[DocumentWithInsights]:
+        """One page of documents ordered by ``sort``, resuming after the ``(sort value, id)`` keyset cursor"""
+        column = DOCUMENT_SORTS[sort]
+        direction = "DESC" if descending else "ASC"
+        conditions, params = self._document_filters(project_id, name_filter, file_type)
+        if after:
+            conditions.append(f"({column}, d.id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                f"""
+                SELECT d.id, d.project_id, d.filename, d.file_type, d.file_size, d.upload_date, d.status, d.content_hash,
+                       i.document_id, i.project_id, i.summary, i.outline, i.key_terms, i.created_at
+                FROM documents d
+                LEFT JOIN document_insights i ON i.document_id = d.id
+                WHERE {" AND ".join(conditions)}
+                ORDER BY {column} {direction}, d.id {direction}
+                LIMIT ?
+                """,
+                (*params, limit)
+            )
+            rows = await cursor.fetchall()
+            return models_from_rows(
+                DocumentWithInsights,
+                _DOCUMENT_COLUMNS + ("insights",),
+                [row[:8] + (self._row_to_insights(row[8:]) if row[8] else None,) for row in rows]
+            )
+    
+    async def count_documents(self, project_id: str, name_filter: Optional[str] = None, file_type: Optional[str] = None) -> int:
+        """Documents in a project, read from the trigger-maintained counter unless filtered"""
+        async with self.pool.reader() as conn:
+            if not name_filter and not file_type:
+                cursor = await conn.execute(
+                    "SELECT document_count FROM project_stats WHERE project_id = ?",
+                    (project_id,)
+                )
+                row = await cursor.fetchone()
+                return row[0] if row else 0
+            
+            conditions, params = self._document_filters(project_id, name_filter, file_type)
+            cursor = await conn.execute(
+                f"SELECT COUNT(*) FROM documents d WHERE {' AND '.join(conditions)}",
+                params
+            )
+            return (await cursor.fetchone())[0]
+    
+    def _row_to_insights(self, row) -> DocumentInsights:
+        return DocumentInsights(
+            document_id=row[0],
+            project_id=row[1],
+            summary=row[2],
+            outline=json.loads(row[3]),
+            key_terms=json.loads(row[4]),
+            created_at=datetime.fromisoformat(row[5])
+        )
+    
+    # Vector registry operations
+    async def record_document_vectors(self, project_id: str, document_id: str, vector_count: int) -> DocumentVectors:
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                """
+                INSERT INTO document_vectors (document_id, project_id, vector_count, created_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(document_id) DO UPDATE SET vector_count = excluded.vector_count, created_at = excluded.created_at
+                """,
+                (document_id, project_id, vector_count, datetime.now())
+            )
+            return DocumentVectors(document_id=document_id, project_id=project_id, vector_count=vector_count)
+    
+    async def get_document_vectors(self, document_id: str) -> Optional[DocumentVectors]:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT document_id, project_id, vector_count FROM document_vectors WHERE document_id = ?",
+                (document_id,)
+            )
+            row = await cursor.fetchone()
+            if row:
+                return DocumentVectors(document_id=row[0], project_id=row[1], vector_count=row[2])
+            return None
+    
+    async def get_registered_document_ids(self, project_id: str) -> List[str]:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT document_id FROM document_vectors WHERE project_id = ?",
+                (project_id,)
+            )
+            return [row[0] for row in await cursor.fetchall()]
+    
+    async def get_orphaned_document_vectors(self) -> List[DocumentVectors]:
+        """Registry entries whose document or project no longer exists"""
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT dv.document_id, dv.project_id, dv.vector_count
+                FROM document_vectors dv
+                LEFT JOIN documents d ON d.id = dv.document_id
+                LEFT JOIN projects p ON p.id = dv.project_id
+                WHERE d.id IS NULL OR p.id IS NULL
+                """
+            )
+            rows = await cursor.fetchall()
+            return [
+                DocumentVectors(document_id=row[0], project_id=row[1], vector_count=row[2])
+                for row in rows
+            ]
+    
+    async def delete_document_vectors(self, document_id: str) -> bool:
+        async with self.pool.writer() as conn:
+            cursor = await conn.execute("DELETE FROM document_vectors WHERE document_id = ?", (document_id,))
+            return cursor.rowcount > 0
+    
+    async def delete_project_document_vectors(self, project_id: str) -> int:
+        async with self.pool.writer() as conn:
+            cursor = await conn.execute("DELETE FROM document_vectors WHERE project_id = ?", (project_id,))
+            return cursor.rowcount
+    
+    async def get_project_ids(self) -> List[str]:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT id FROM projects")
+            return [row[0] for row in await cursor.fetchall()]
+    
     # Chat history CRUD operations
     async def create_chat_history(self, chat: ChatHistory) -> ChatHistory:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.writer() as conn:
             await conn.execute(
                 "INSERT INTO chat_history (id, project_id, message, response, timestamp) VALUES (?, ?, ?, ?, ?)",
                 (chat.id, chat.project_id, chat.message, chat.response, chat.timestamp)
             )
-            await conn.commit()
             return chat
     
     async def get_chat_history(self, project_id: str, limit: int = 50) -> List[ChatHistory]:
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.reader() as conn:
             cursor = await conn.execute(
                 "SELECT id, project_id, message, response, timestamp FROM chat_history WHERE project_id = ? ORDER BY timestamp DESC LIMIT ?",
                 (project_id, limit)
             )
             rows = await cursor.fetchall()
+            return models_from_rows(ChatHistory, _CHAT_COLUMNS, rows[::-1])  # Reverse to get chronological order
+    
+    async def get_chat_history_before(
+        self,
+        project_id: str,
+        before: Optional[Tuple[datetime, str]],
+        limit: int
+    ) -> List[ChatHistory]:
+        """Newest turns older than the ``(timestamp, id)`` keyset cursor, in chronological order"""
+        async with self.pool.reader() as conn:
+            if before:
+                cursor = await conn.execute(
+                    """
+                    SELECT id, project_id, message, response, timestamp FROM chat_history
+                    WHERE project_id = ? AND (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC LIMIT ?
+                    """,
+                    (project_id, before[0], before[1], limit)
+                )
+            else:
+                cursor = await conn.execute(
+                    "SELECT id, project_id, message, response, timestamp FROM chat_history WHERE project_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (project_id, limit)
+                )
+            rows = await cursor.fetchall()
+            return models_from_rows(ChatHistory, _CHAT_COLUMNS, rows[::-1])
+    
+    async def search_chat_history(self, project_id: str, match: str, limit: int) -> List[ChatHistorySearchResult]:
+        """Past turns matching an FTS5 query, best match first"""
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT c.id, c.project_id, c.message, c.response, c.timestamp,
+                       snippet(chat_history_fts, -1, '**', '**', '…', 16), bm25(chat_history_fts)
+                FROM chat_history_fts
+                JOIN chat_history c ON c.rowid = chat_history_fts.rowid
+                WHERE chat_history_fts MATCH ? AND c.project_id = ?
+                ORDER BY bm25(chat_history_fts) LIMIT ?
+                """,
+                (match, project_id, limit)
+            )
+            rows = await cursor.fetchall()
             return [
-                ChatHistory(
+                ChatHistorySearchResult(
                     id=row[0],
                     project_id=row[1],
                     message=row[2],
                     response=row[3],
-                    timestamp=datetime.fromisoformat(row[4])
+                    timestamp=datetime.fromisoformat(row[4]),
+                    snippet=row[5],
+                    rank=row[6]
                 )
-                for row in reversed(rows)  # Reverse to get chronological order
+                for row in rows
             ]
     
-    async def get_project_stats(self, project_id: str) -> ProjectStats:
-        async with aiosqlite.connect(self.db_path) as conn:
-            # Get document count
-            doc_cursor = await conn.execute(
-                "SELECT COUNT(*) FROM documents WHERE project_id = ?",
-                (project_id,)
+    async def get_chat_history_after(self, project_id: str, after: Optional[datetime], limit: int) -> List[ChatHistory]:
+        """Oldest turns newer than ``after`` (all turns if None), in chronological order"""
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT id, project_id, message, response, timestamp FROM chat_history WHERE project_id = ? AND timestamp > ? ORDER BY timestamp ASC LIMIT ?",
+                (project_id, after or datetime.min, limit)
             )
-            doc_count = (await doc_cursor.fetchone())[0]
-            
-            # Get chat count
-            chat_cursor = await conn.execute(
-                "SELECT COUNT(*) FROM chat_history WHERE project_id = ?",
+            rows = await cursor.fetchall()
+            return models_from_rows(ChatHistory, _CHAT_COLUMNS, rows)
+    
+    async def count_chat_history_after(self, project_id: str, after: Optional[datetime]) -> int:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT COUNT(*) FROM chat_history WHERE project_id = ? AND timestamp > ?",
+                (project_id, after or datetime.min)
+            )
+            return (await cursor.fetchone())[0]
+    
+    async def get_chat_history_to_archive(self, project_id: str, before: datetime, keep: int, limit: int) -> List[ChatHistory]:
+        """Oldest turns older than ``before``, never touching the project's ``keep`` newest turns"""
+        async with self.pool.reader() as conn:
+            if keep > 0:
+                # Only turns older than the keep-th newest one qualify
+                cursor = await conn.execute(
+                    """
+                    SELECT id, project_id, message, response, timestamp FROM chat_history
+                    WHERE project_id = ? AND timestamp < ? AND (timestamp, id) < (
+                        SELECT timestamp, id FROM chat_history WHERE project_id = ?
+                        ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?
+                    )
+                    ORDER BY timestamp, id LIMIT ?
+                    """,
+                    (project_id, before, project_id, keep - 1, limit)
+                )
+            else:
+                cursor = await conn.execute(
+                    """
+                    SELECT id, project_id, message, response, timestamp FROM chat_history
+                    WHERE project_id = ? AND timestamp < ?
+                    ORDER BY timestamp, id LIMIT ?
+                    """,
+                    (project_id, before, limit)
+                )
+            rows = await cursor.fetchall()
+            return models_from_rows(ChatHistory, _CHAT_COLUMNS, rows)
+    
+    async def archive_chat_history(self, turns: List[ChatHistory]) -> int:
+        """Move turns into the compressed archive in one transaction"""
+        if not turns:
+            return 0
+        # Compress off the event loop and before taking the writer
+        rows = await asyncio.to_thread(_pack_turns, turns)
+        async with self.pool.writer() as conn:
+            # Only delete the turns that actually reached the archive
+            archived = []
+            for row in rows:
+                cursor = await conn.execute(
+                    "INSERT OR IGNORE INTO chat_history_archive (id, project_id, timestamp, payload) VALUES (?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount:
+                    archived.append((row[0],))
+            if not archived:
+                return 0
+            cursor = await conn.executemany("DELETE FROM chat_history WHERE id = ?", archived)
+            return cursor.rowcount
+    
+    async def get_archived_chat_history_before(
+        self,
+        project_id: str,
+        before: Optional[Tuple[datetime, str]],
+        limit: int
+    ) -> List[ChatHistory]:
+        """Like get_chat_history_before, over the archived turns"""
+        async with self.pool.reader() as conn:
+            if before:
+                cursor = await conn.execute(
+                    """
+                    SELECT id, project_id, timestamp, payload FROM chat_history_archive
+                    WHERE project_id = ? AND (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC LIMIT ?
+                    """,
+                    (project_id, before[0], before[1], limit)
+                )
+            else:
+                cursor = await conn.execute(
+                    "SELECT id, project_id, timestamp, payload FROM chat_history_archive WHERE project_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (project_id, limit)
+                )
+            rows = await cursor.fetchall()
+            return [_unpack_turn(row) for row in rows[::-1]]
+    
+    # Conversation summary operations
+    async def get_conversation_summary(self, project_id: str) -> Optional[ConversationSummary]:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT project_id, summary, summarized_through, summarized_turns, updated_at FROM conversation_summaries WHERE project_id = ?",
                 (project_id,)
             )
-            chat_count = (await chat_cursor.fetchone())[0]
-            
-            # Get last activity
-            activity_cursor = await conn.execute(
-                """
-                SELECT MAX(timestamp) FROM (
-                    SELECT upload_date as timestamp FROM documents WHERE project_id = ?
-                    UNION ALL
-                    SELECT timestamp FROM chat_history WHERE project_id = ?
+            row = await cursor.fetchone()
+            if row:
+                return ConversationSummary(
+                    project_id=row[0],
+                    summary=row[1],
+                    summarized_through=datetime.fromisoformat(row[2]) if row[2] else None,
+                    summarized_turns=row[3],
+                    updated_at=datetime.fromisoformat(row[4])
                 )
-                """,
-                (project_id, project_id)
+            return None
+    
+    async def save_conversation_summary(self, summary: ConversationSummary) -> ConversationSummary:
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                "INSERT OR REPLACE INTO conversation_summaries (project_id, summary, summarized_through, summarized_turns, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (summary.project_id, summary.summary, summary.summarized_through, summary.summarized_turns, summary.updated_at)
             )
-            last_activity_str = (await activity_cursor.fetchone())[0]
-            last_activity = datetime.fromisoformat(last_activity_str) if last_activity_str else None
+            return summary
+    
+    # Summary cache operations
+    async def get_cached_summary(self, content_hash: str) -> Optional[str]:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT summary FROM summary_cache WHERE content_hash = ?",
+                (content_hash,)
+            )
+            row = await cursor.fetchone()
+            return row[0] if row else None
+    
+    async def save_cached_summary(self, content_hash: str, level: str, summary: str) -> bool:
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                "INSERT OR REPLACE INTO summary_cache (content_hash, level, summary, created_at) VALUES (?, ?, ?, ?)",
+                (content_hash, level, summary, datetime.now())
+            )
+            return True
+    
+    async def get_project_stats(self, project_id: str) -> ProjectStats:
+        """Counters maintained by triggers on the project's tables; a single primary-key read"""
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT document_count, total_bytes, chat_count, chunk_count, last_activity FROM project_stats WHERE project_id = ?",
+                (project_id,)
+            )
+            row = await cursor.fetchone()
+            if not row:
+                return ProjectStats(document_count=0, chat_count=0)
             
             return ProjectStats(
-                document_count=doc_count,
-                chat_count=chat_count,
-                last_activity=last_activity
+                document_count=row[0],
+                total_bytes=row[1],
+                chat_count=row[2],
+                chunk_count=row[3],
+                last_activity=datetime.fromisoformat(row[4]) if row[4] else None
             )
 
 # Global database instance
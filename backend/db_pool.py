@@ -0,0 +1,92 @@
+import asyncio
+import aiosqlite
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+from shared.config import Config
+
+class ConnectionPool:
+    """Long-lived SQLite connections: one writer and SQLITE_READERS readers.
+    
+    The database runs in WAL mode so readers never wait on the writer.
+    Keeping connections open for the app's lifetime also keeps each
+    connection's prepared-statement cache warm across requests.
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._open_lock = asyncio.Lock()
+    
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path, cached_statements=Config.SQLITE_STATEMENT_CACHE)
+        await conn.executescript(
+            f"""
+            PRAGMA busy_timeout = {Config.SQLITE_BUSY_TIMEOUT_MS};
+            PRAGMA synchronous = NORMAL;
+            PRAGMA cache_size = -{Config.SQLITE_CACHE_SIZE_KB};
+            PRAGMA mmap_size = {Config.SQLITE_MMAP_SIZE};
+            PRAGMA temp_store = MEMORY;
+            PRAGMA query_only = {"ON" if read_only else "OFF"};
+            """
+        )
+        return conn
+    
+    async def open(self):
+        """Open all connections; called at startup, or lazily on first use"""
+        async with self._open_lock:
+            if self._writer:
+                return
+            writer = await self._connect(read_only=False)
+            # WAL is persistent, so it only has to be switched on once per file
+            await writer.executescript("PRAGMA journal_mode = WAL;")
+            readers = [await self._connect(read_only=True) for _ in range(Config.SQLITE_READERS)]
+            
+            self._idle = asyncio.Queue()
+            for conn in readers:
+                self._idle.put_nowait(conn)
+            self._readers = readers
+            self._writer = writer
+    
+    async def close(self):
+        """Close all connections, waiting for the one holding the writer to finish"""
+        async with self._open_lock:
+            if not self._writer:
+                return
+            async with self._write_lock:
+                # Recommended before closing long-lived connections
+                await self._writer.execute("PRAGMA optimize")
+                for conn in self._readers:
+                    await conn.close()
+                await self._writer.close()
+            self._writer = None
+            self._readers = []
+            self._idle = None
+    
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection"""
+        if not self._writer:
+            await self.open()
+        idle = self._idle
+        conn = await idle.get()
+        try:
+            yield conn
+        finally:
+            idle.put_nowait(conn)
+    
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Hold the writer for one transaction, committed on exit and rolled back on error"""
+        if not self._writer:
+            await self.open()
+        async with self._write_lock:
+            conn = self._writer
+            try:
+                yield conn
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
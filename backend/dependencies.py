@@ -0,0 +1,10 @@
+from fastapi import HTTPException
+from backend.models import Project
+from backend.services.project_cache import project_cache
+
+async def get_project_or_404(project_id: str) -> Project:
+    """Route dependency resolving the ``{project_id}`` path parameter to its project, or 404"""
+    project = await project_cache.get(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
\ No newline at end of file
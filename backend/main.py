@@ -1,15 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
-from backend.routers import projects, documents, chat
+from backend.database import db
+from backend.migrations import apply_migrations
+from backend.routers import projects, documents, chat, admin
+from backend.services.pinecone_service import pinecone_service
+from backend.services.scheduler import scheduler
+from backend.services.document_status import document_status
+from backend.services.chat_retention import chat_retention
+from backend.services.metrics import metrics
 from shared.config import Config
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Migrate and open the database, start background maintenance jobs and stop both on shutdown"""
+    await asyncio.to_thread(apply_migrations, db.db_path)
+    await db.connect()
+    scheduler.schedule("db-optimize", Config.DB_OPTIMIZE_INTERVAL, db.optimize, initial_delay=Config.DB_OPTIMIZE_INTERVAL)
+    scheduler.schedule("db-analyze", Config.DB_ANALYZE_INTERVAL, db.analyze, initial_delay=Config.DB_ANALYZE_INTERVAL)
+    scheduler.schedule("db-vacuum", Config.DB_VACUUM_INTERVAL, chat_retention.vacuum, initial_delay=Config.DB_VACUUM_INTERVAL)
+    if Config.CHAT_RETENTION_DAYS > 0:
+        scheduler.schedule("chat-retention", Config.CHAT_ARCHIVE_INTERVAL, chat_retention.run, initial_delay=Config.CHAT_ARCHIVE_INTERVAL)
+    if pinecone_service:
+        scheduler.schedule(
+            "vector-stats-refresh",
+            Config.VECTOR_STATS_REFRESH_INTERVAL,
+            pinecone_service.refresh_namespace_counts
+        )
+    yield
+    await scheduler.shutdown()
+    await document_status.flush()
+    await db.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="StudyBuddy AI API",
     description="Local NotebookLM clone API for document analysis and AI-powered conversations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow Streamlit frontend to connect
@@ -25,6 +56,7 @@ app.add_middleware(
 app.include_router(projects.router)
 app.include_router(documents.router)
 app.include_router(chat.router)
+app.include_router(admin.router)
 
 # Root endpoint
 @app.get("/")
@@ -43,9 +75,16 @@ async def health_check():
         "status": "healthy",
         "database": "connected",
         "gemini_api": "configured" if Config.GEMINI_API_KEY else "not configured",
-        "pinecone_api": "configured" if Config.PINECONE_API_KEY else "not configured"
+        "pinecone_api": "configured" if Config.PINECONE_API_KEY else "not configured",
+        "llm_backend": Config.LLM_BACKEND,
+        "vector_backend": Config.VECTOR_BACKEND
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Latency samples and counters recorded by the services"""
+    return metrics.snapshot()
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
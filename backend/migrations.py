@@ -0,0 +1,400 @@
+import sqlite3
+from typing import Iterator, List, Tuple
+
+# (user_version, description, SQL script). Append new migrations; never edit
+# one that has shipped, since databases that already applied it won't rerun it.
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (
+        1,
+        "baseline schema",
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        
+        CREATE TABLE IF NOT EXISTS documents (
+            id TEXT PRIMARY KEY,
+            project_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            file_size INTEGER,
+            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+        );
+        
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id TEXT PRIMARY KEY,
+            project_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            response TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+        );
+        
+        CREATE TABLE IF NOT EXISTS document_vectors (
+            document_id TEXT PRIMARY KEY,
+            project_id TEXT NOT NULL,
+            vector_count INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            project_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            summarized_through TIMESTAMP,
+            summarized_turns INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+        );
+        
+        CREATE TABLE IF NOT EXISTS summary_cache (
+            content_hash TEXT PRIMARY KEY,
+            level TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        
+        CREATE TABLE IF NOT EXISTS document_insights (
+            document_id TEXT PRIMARY KEY,
+            project_id TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            outline TEXT NOT NULL,
+            key_terms TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_documents_project_id ON documents(project_id);
+        CREATE INDEX IF NOT EXISTS idx_chat_history_project_id ON chat_history(project_id);
+        CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_document_vectors_project_id ON document_vectors(project_id);
+        """
+    ),
+    (
+        2,
+        "trigger-maintained project_stats",
+        """
+        CREATE TABLE IF NOT EXISTS project_stats (
+            project_id TEXT PRIMARY KEY,
+            document_count INTEGER NOT NULL DEFAULT 0,
+            total_bytes INTEGER NOT NULL DEFAULT 0,
+            chat_count INTEGER NOT NULL DEFAULT 0,
+            chunk_count INTEGER NOT NULL DEFAULT 0,
+            last_activity TIMESTAMP
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS trg_projects_insert_stats AFTER INSERT ON projects
+        BEGIN
+            INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.id);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_projects_delete_stats AFTER DELETE ON projects
+        BEGIN
+            DELETE FROM project_stats WHERE project_id = OLD.id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_documents_insert_stats AFTER INSERT ON documents
+        BEGIN
+            INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.project_id);
+            UPDATE project_stats
+            SET document_count = document_count + 1,
+                total_bytes = total_bytes + COALESCE(NEW.file_size, 0),
+                last_activity = MAX(COALESCE(last_activity, ''), NEW.upload_date)
+            WHERE project_id = NEW.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_documents_delete_stats AFTER DELETE ON documents
+        BEGIN
+            UPDATE project_stats
+            SET document_count = document_count - 1,
+                total_bytes = total_bytes - COALESCE(OLD.file_size, 0),
+                last_activity = (
+                    SELECT MAX(timestamp) FROM (
+                        SELECT MAX(upload_date) AS timestamp FROM documents WHERE project_id = OLD.project_id
+                        UNION ALL
+                        SELECT MAX(timestamp) FROM chat_history WHERE project_id = OLD.project_id
+                    )
+                )
+            WHERE project_id = OLD.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_chat_history_insert_stats AFTER INSERT ON chat_history
+        BEGIN
+            INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.project_id);
+            UPDATE project_stats
+            SET chat_count = chat_count + 1,
+                last_activity = MAX(COALESCE(last_activity, ''), NEW.timestamp)
+            WHERE project_id = NEW.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_chat_history_delete_stats AFTER DELETE ON chat_history
+        BEGIN
+            UPDATE project_stats
+            SET chat_count = chat_count - 1,
+                last_activity = (
+                    SELECT MAX(timestamp) FROM (
+                        SELECT MAX(upload_date) AS timestamp FROM documents WHERE project_id = OLD.project_id
+                        UNION ALL
+                        SELECT MAX(timestamp) FROM chat_history WHERE project_id = OLD.project_id
+                    )
+                )
+            WHERE project_id = OLD.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_document_vectors_insert_stats AFTER INSERT ON document_vectors
+        BEGIN
+            INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.project_id);
+            UPDATE project_stats SET chunk_count = chunk_count + NEW.vector_count WHERE project_id = NEW.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_document_vectors_update_stats AFTER UPDATE OF vector_count ON document_vectors
+        BEGIN
+            UPDATE project_stats SET chunk_count = chunk_count - OLD.vector_count + NEW.vector_count WHERE project_id = NEW.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_document_vectors_delete_stats AFTER DELETE ON document_vectors
+        BEGIN
+            UPDATE project_stats SET chunk_count = chunk_count - OLD.vector_count WHERE project_id = OLD.project_id;
+        END;
+        
+        -- Backfill counters for projects created before project_stats existed
+        INSERT OR IGNORE INTO project_stats (project_id, document_count, total_bytes, chat_count, chunk_count, last_activity)
+        SELECT
+            p.id,
+            (SELECT COUNT(*) FROM documents WHERE project_id = p.id),
+            (SELECT COALESCE(SUM(file_size), 0) FROM documents WHERE project_id = p.id),
+            (SELECT COUNT(*) FROM chat_history WHERE project_id = p.id),
+            (SELECT COALESCE(SUM(vector_count), 0) FROM document_vectors WHERE project_id = p.id),
+            (
+                SELECT MAX(timestamp) FROM (
+                    SELECT MAX(upload_date) AS timestamp FROM documents WHERE project_id = p.id
+                    UNION ALL
+                    SELECT MAX(timestamp) FROM chat_history WHERE project_id = p.id
+                )
+            )
+        FROM projects p;
+        """
+    ),
+    (
+        3,
+        "chat history full-text index and keyset index",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5(
+            message, response, content='chat_history', content_rowid='rowid'
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS trg_chat_history_insert_fts AFTER INSERT ON chat_history
+        BEGIN
+            INSERT INTO chat_history_fts (rowid, message, response) VALUES (NEW.rowid, NEW.message, NEW.response);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_chat_history_delete_fts AFTER DELETE ON chat_history
+        BEGIN
+            INSERT INTO chat_history_fts (chat_history_fts, rowid, message, response) VALUES ('delete', OLD.rowid, OLD.message, OLD.response);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_chat_history_update_fts AFTER UPDATE OF message, response ON chat_history
+        BEGIN
+            INSERT INTO chat_history_fts (chat_history_fts, rowid, message, response) VALUES ('delete', OLD.rowid, OLD.message, OLD.response);
+            INSERT INTO chat_history_fts (rowid, message, response) VALUES (NEW.rowid, NEW.message, NEW.response);
+        END;
+        
+        -- Index history written before the full-text table existed
+        INSERT INTO chat_history_fts (chat_history_fts) VALUES ('rebuild');
+        
+        CREATE INDEX IF NOT EXISTS idx_chat_history_project_timestamp_id ON chat_history(project_id, timestamp, id);
+        """
+    ),
+    (
+        4,
+        "composite indexes for hot queries",
+        """
+        -- Document listings: filter by project, newest first, without touching the table
+        CREATE INDEX IF NOT EXISTS idx_documents_project_upload
+            ON documents(project_id, upload_date, id, filename, file_type, file_size);
+        
+        -- Vector registry lookups by project
+        CREATE INDEX IF NOT EXISTS idx_document_vectors_project_document
+            ON document_vectors(project_id, document_id, vector_count);
+        
+        -- Project list ordered by last update
+        CREATE INDEX IF NOT EXISTS idx_projects_updated_at ON projects(updated_at);
+        
+        -- Single-column indexes now covered by the composite ones above
+        DROP INDEX IF EXISTS idx_documents_project_id;
+        DROP INDEX IF EXISTS idx_chat_history_project_id;
+        DROP INDEX IF EXISTS idx_chat_history_timestamp;
+        DROP INDEX IF EXISTS idx_document_vectors_project_id;
+        """
+    ),
+    (
+        5,
+        "indexes for sorted and filtered document listings",
+        """
+        -- Upload-date order is served by idx_documents_project_upload
+        CREATE INDEX IF NOT EXISTS idx_documents_project_filename ON documents(project_id, filename, id);
+        CREATE INDEX IF NOT EXISTS idx_documents_project_size ON documents(project_id, file_size, id);
+        CREATE INDEX IF NOT EXISTS idx_documents_project_type_upload ON documents(project_id, file_type, upload_date, id);
+        """
+    ),
+    (
+        6,
+        "document ingestion status",
+        """
+        ALTER TABLE documents ADD COLUMN status TEXT NOT NULL DEFAULT 'ready';
+        """
+    ),
+    (
+        7,
+        "compressed chat history archive",
+        """
+        -- Turns past the retention window; payload is zlib-compressed JSON of message and response
+        CREATE TABLE IF NOT EXISTS chat_history_archive (
+            id TEXT PRIMARY KEY,
+            project_id TEXT NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            payload BLOB NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_chat_history_archive_project_timestamp_id
+            ON chat_history_archive(project_id, timestamp, id);
+        
+        -- Archived turns still count towards the project's chats; moving a turn nets out to zero
+        CREATE TRIGGER IF NOT EXISTS trg_chat_history_archive_insert_stats AFTER INSERT ON chat_history_archive
+        BEGIN
+            UPDATE project_stats SET chat_count = chat_count + 1 WHERE project_id = NEW.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_chat_history_archive_delete_stats AFTER DELETE ON chat_history_archive
+        BEGIN
+            UPDATE project_stats SET chat_count = chat_count - 1 WHERE project_id = OLD.project_id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_projects_delete_archive AFTER DELETE ON projects
+        BEGIN
+            DELETE FROM chat_history_archive WHERE project_id = OLD.id;
+        END;
+        """
+    ),
+    (
+        8,
+        "original file references",
+        """
+        ALTER TABLE documents ADD COLUMN content_hash TEXT;
+        
+        -- Reference counts when a blob may be released
+        CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
+        """
+    ),
+    (
+        9,
+        "no project_stats rows for deleted projects",
+        """
+        -- A write that lands after its project was deleted must not bring the stats row back
+        DROP TRIGGER IF EXISTS trg_documents_insert_stats;
+        CREATE TRIGGER trg_documents_insert_stats AFTER INSERT ON documents
+        BEGIN
+            INSERT OR IGNORE INTO project_stats (project_id)
+                SELECT NEW.project_id WHERE EXISTS (SELECT 1 FROM projects WHERE id = NEW.project_id);
+            UPDATE project_stats
+            SET document_count = document_count + 1,
+                total_bytes = total_bytes + COALESCE(NEW.file_size, 0),
+                last_activity = MAX(COALESCE(last_activity, ''), NEW.upload_date)
+            WHERE project_id = NEW.project_id;
+        END;
+        
+        DROP TRIGGER IF EXISTS trg_chat_history_insert_stats;
+        CREATE TRIGGER trg_chat_history_insert_stats AFTER INSERT ON chat_history
+        BEGIN
+            INSERT OR IGNORE INTO project_stats (project_id)
+                SELECT NEW.project_id WHERE EXISTS (SELECT 1 FROM projects WHERE id = NEW.project_id);
+            UPDATE project_stats
+            SET chat_count = chat_count + 1,
+                last_activity = MAX(COALESCE(last_activity, ''), NEW.timestamp)
+            WHERE project_id = NEW.project_id;
+        END;
+        
+        DROP TRIGGER IF EXISTS trg_document_vectors_insert_stats;
+        CREATE TRIGGER trg_document_vectors_insert_stats AFTER INSERT ON document_vectors
+        BEGIN
+            INSERT OR IGNORE INTO project_stats (project_id)
+                SELECT NEW.project_id WHERE EXISTS (SELECT 1 FROM projects WHERE id = NEW.project_id);
+            UPDATE project_stats SET chunk_count = chunk_count + NEW.vector_count WHERE project_id = NEW.project_id;
+        END;
+        
+        -- Drop the rows such writes already recreated
+        DELETE FROM project_stats WHERE project_id NOT IN (SELECT id FROM projects);
+        """
+    ),
+    (
+        10,
+        "covering document listing index",
+        """
+        -- Listings also read status and content_hash, added after the index in
+        -- migration 4; include them so listings again never touch the table
+        DROP INDEX IF EXISTS idx_documents_project_upload;
+        CREATE INDEX idx_documents_project_upload
+            ON documents(project_id, upload_date, id, filename, file_type, file_size, status, content_hash);
+        """
+    ),
+]
+
+def _statements(script: str) -> Iterator[str]:
+    """Split a script into statements, keeping trigger bodies whole"""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                yield statement.strip()
+            statement = ""
+
+def apply_migrations(db_path: str) -> int:
+    """Bring the database up to the latest schema, tracked in PRAGMA user_version.
+    
+    Each migration runs in its own transaction together with the version
+    bump, so a failed migration leaves the database at the previous
+    version. Returns the number of migrations applied.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        latest = MIGRATIONS[-1][0]
+        if current > latest:
+            print(f"Database schema version {current} is newer than this code ({latest})")
+            return 0
+        
+        applied = 0
+        for version, description, script in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in _statements(script):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            print(f"Applied migration {version}: {description}")
+            applied += 1
+        
+        if applied:
+            # Give the planner statistics for any new indexes
+            conn.execute("ANALYZE")
+        
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Switching an existing file to incremental auto-vacuum takes one full
+            # VACUUM; afterwards free pages are reclaimed in small steps at runtime
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            print("Enabled incremental auto-vacuum")
+        return applied
+    finally:
+        conn.close()
@@ -1,7 +1,8 @@
 from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 import uuid
+from shared.config import Config
 
 class ProjectBase(BaseModel):
     name: str
@@ -37,23 +38,56 @@ class Document(DocumentBase):
     id: str
     project_id: str
     upload_date: datetime
+    status: str = "ready"  # pending, processing, ready or failed
+    content_hash: Optional[str] = None  # SHA-256 of the original file in the blob store
     
     @classmethod
-    def create_new(cls, project_id: str, filename: str, file_type: str, file_size: int):
+    def create_new(cls, project_id: str, filename: str, file_type: str, file_size: int, status: str = "ready", content_hash: Optional[str] = None):
         return cls(
             id=str(uuid.uuid4()),
             project_id=project_id,
             filename=filename,
             file_type=file_type,
             file_size=file_size,
-            upload_date=datetime.now()
+            upload_date=datetime.now(),
+            status=status,
+            content_hash=content_hash
         )
 
+class DocumentInsights(BaseModel):
+    """Summary, outline and key terms generated for a document after ingestion"""
+    document_id: str
+    project_id: str
+    summary: str
+    outline: List[str] = []
+    key_terms: List[str] = []
+    created_at: datetime
+
+class DocumentWithInsights(Document):
+    insights: Optional[DocumentInsights] = None
+
+class DocumentPage(BaseModel):
+    """One page of a project's documents in the requested order"""
+    items: List[DocumentWithInsights]
+    total: int  # Documents matching the filters
+    max_documents: int
+    next_cursor: Optional[str] = None  # Pass as ``cursor`` to fetch the next page
+
+class DocumentVectors(BaseModel):
+    """Registry entry for the vectors stored for one document.
+    
+    Vector IDs are ``{document_id}_{i}`` for ``i`` in ``range(vector_count)``.
+    """
+    document_id: str
+    project_id: str
+    vector_count: int
+
 class ChatMessageBase(BaseModel):
     message: str
 
 class ChatMessage(ChatMessageBase):
     project_id: str
+    latency_budget_ms: Optional[int] = None  # Prefer the fast model when the caller cannot wait
 
 class ChatHistoryBase(BaseModel):
     message: str
@@ -74,6 +108,40 @@ class ChatHistory(ChatHistoryBase):
             timestamp=datetime.now()
         )
 
+class ChatHistoryPage(BaseModel):
+    """One page of chat history in chronological order"""
+    items: List[ChatHistory]
+    next_cursor: Optional[str] = None  # Pass as ``before`` to fetch the next older page
+
+class ChatHistorySearchResult(ChatHistory):
+    snippet: str
+    rank: float
+
+class ConversationSummary(BaseModel):
+    project_id: str
+    summary: str
+    summarized_through: Optional[datetime] = None  # Timestamp of the newest turn folded in
+    summarized_turns: int = 0
+    updated_at: datetime
+
+class ConversationContext(BaseModel):
+    """Prior conversation handed to the prompt builder"""
+    summary: Optional[str] = None
+    recent_turns: List[ChatHistory] = []
+
+class RoutingDecision(BaseModel):
+    """Which model served a request, and why"""
+    route: str
+    tier: str
+    model: str
+    reason: str
+    query_chars: int = 0
+    context_tokens: int = 0
+    latency_budget_ms: Optional[int] = None
+    escalated: bool = False
+    latency_ms: Optional[float] = None
+    timestamp: datetime
+
 class SearchQuery(BaseModel):
     query: str
     project_id: Optional[str] = None  # If None, search across all projects
@@ -85,7 +153,35 @@ class SearchResult(BaseModel):
     content_snippet: str
     relevance_score: float
 
+class BatchSearchQuery(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=Config.MAX_BATCH_SEARCH_QUERIES)
+    top_k: int = Field(10, ge=1, le=100)
+    
+    @field_validator("queries")
+    @classmethod
+    def queries_not_blank(cls, queries: List[str]) -> List[str]:
+        if any(not query.strip() for query in queries):
+            raise ValueError("Queries must not be blank")
+        return queries
+
+class BatchSearchResult(BaseModel):
+    query: str
+    results: List[SearchResult]
+
 class ProjectStats(BaseModel):
     document_count: int
     chat_count: int
-    last_activity: Optional[datetime] = None
\ No newline at end of file
+    total_bytes: int = 0
+    chunk_count: int = 0
+    vector_count: int = 0
+    last_activity: Optional[datetime] = None
+
+class PromptStats(BaseModel):
+    kind: str
+    model: str
+    budget_tokens: int
+    prompt_tokens: int
+    sections_offered: int
+    sections_used: int
+    sections_truncated: int
+    history_turns: int = 0
\ No newline at end of file
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, BackgroundTasks
+from typing import List, Optional
+from backend.models import RoutingDecision
+from backend.services.chat_retention import chat_retention
+from backend.services.model_router import model_router
+from backend.services.pinecone_service import pinecone_service
+from backend.services.reprocessor import document_reprocessor
+from backend.services.vector_cleanup import vector_cleanup_service
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+@router.post("/vectors/reconcile")
+async def reconcile_vectors(background_tasks: BackgroundTasks):
+    """Start a background job that removes orphaned vectors"""
+    if not pinecone_service:
+        raise HTTPException(status_code=503, detail="Vector service not available")
+    
+    background_tasks.add_task(vector_cleanup_service.reconcile_orphaned_vectors)
+    return {"message": "Vector reconciliation started"}
+
+@router.post("/chat-history/archive")
+async def archive_chat_history(background_tasks: BackgroundTasks):
+    """Start a background run of the chat history retention policy"""
+    background_tasks.add_task(chat_retention.run)
+    return {"message": "Chat history archival started"}
+
+@router.post("/documents/reprocess")
+async def reprocess_documents(background_tasks: BackgroundTasks, project_id: Optional[str] = None):
+    """Start a background job that re-ingests stored originals, for all projects or one"""
+    if document_reprocessor.running:
+        raise HTTPException(status_code=409, detail="Re-processing is already running")
+    
+    background_tasks.add_task(document_reprocessor.run, project_id)
+    return {"message": "Document re-processing started"}
+
+@router.get("/documents/reprocess")
+async def get_reprocess_status():
+    """Whether a re-processing job is running, and the counts of the last finished one"""
+    return {"running": document_reprocessor.running, "last_run": document_reprocessor.last_run}
+
+@router.get("/routing", response_model=List[RoutingDecision])
+async def get_routing_decisions(limit: int = 100):
+    """Most recent model routing decisions, oldest first"""
+    return model_router.recent(limit)
\ No newline at end of file
@@ -1,155 +1,428 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from backend.models import ChatMessage, ChatHistory, SearchQuery, SearchResult
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Awaitable, Dict, List, Optional, Tuple, TypeVar
+from backend.models import Project, ChatMessage, ChatHistory, ChatHistoryPage, ChatHistorySearchResult, SearchQuery, SearchResult, BatchSearchQuery, BatchSearchResult
 from backend.database import db
+from backend.dependencies import get_project_or_404
+from backend.serialization import list_response
 from backend.services.gemini_service import gemini_service
+from backend.services.conversation_memory import conversation_memory
+from backend.services.summarizer import project_summarizer
 from backend.services.pinecone_service import pinecone_service
+from backend.services.project_cache import project_cache
+from backend.services.metrics import metrics
+from backend.services import deadlines
+from shared.config import Config
 
 router = APIRouter(prefix="/api/projects/{project_id}/chat", tags=["chat"])
 
-@router.post("/")
-async def chat_with_project(project_id: str, message: ChatMessage):
-    """Chat with documents in a specific project"""
+T = TypeVar("T")
+
+async def _timed(timings: Dict[str, float], stage: str, step: Awaitable[T]) -> T:
+    """Await one stage of a request, recording its duration in milliseconds"""
+    start = time.perf_counter()
     try:
-        # Check if project exists
-        project = await db.get_project(project_id)
+        return await step
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+        metrics.observe(f"chat.stage.{stage}_ms", timings[stage])
+
+def _server_timing(timings: Dict[str, float]) -> str:
+    """Format stage timings as a Server-Timing header value"""
+    return ", ".join(f"{stage};dur={duration}" for stage, duration in timings.items())
+
+async def _save_chat_turn(chat_history: ChatHistory):
+    """Persist a finished chat turn and fold older turns into the running summary"""
+    if not chat_history.response:
+        return
+    await db.create_chat_history(chat_history)
+    await conversation_memory.update_summary(chat_history.project_id)
+
+def _format_search_results(search_results: List[dict], default_project_id: str = "") -> List[SearchResult]:
+    """Convert raw vector search matches into SearchResult models"""
+    formatted_results = []
+    for result in search_results:
+        metadata = result.get("metadata", {})
+        text = result.get("text", "")
+        formatted_results.append(SearchResult(
+            document_id=metadata.get("document_id", ""),
+            filename=metadata.get("filename", "Unknown"),
+            project_id=metadata.get("project_id", default_project_id),
+            content_snippet=text[:200] + "..." if len(text) > 200 else text,
+            relevance_score=result.get("score", 0.0)
+        ))
+    return formatted_results
+
+@router.post("/")
+async def chat_with_project(
+    project_id: str,
+    message: ChatMessage,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    response: Response
+):
+    """Chat with documents in a specific project.
+    
+    The project lookup, query embedding and conversation memory load are
+    independent, so they run concurrently; the vector search waits on the
+    embedding and generation waits on both. All of it shares one request
+    deadline and is cancelled if the client disconnects. The chat history
+    write runs after the response has been sent.
+    """
+    timings: Dict[str, float] = {}
+    
+    async def respond():
+        project, query_embedding, conversation = await asyncio.gather(
+            _timed(timings, "project", project_cache.get(project_id)),
+            _timed(timings, "embedding", gemini_service.embed_query(message.message)),
+            _timed(timings, "memory", conversation_memory.load(project_id))
+        )
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
-        
-        # Generate query embedding
-        query_embedding = gemini_service.generate_query_embedding(message.message)
         if not query_embedding:
             raise HTTPException(status_code=500, detail="Failed to generate query embedding")
         
         # Search for relevant document chunks
         relevant_chunks = []
         if pinecone_service:
-            search_results = pinecone_service.search_similar_chunks(
+            search_results = await _timed(timings, "search", pinecone_service.search_similar_chunks(
                 query_embedding=query_embedding,
                 project_id=project_id,
                 top_k=5
-            )
+            ))
             
             # Extract text from search results
             relevant_chunks = [result["text"] for result in search_results if result.get("text")]
         
         # Generate response using Gemini with context
-        response = await gemini_service.generate_response(
+        answer = await _timed(timings, "generation", gemini_service.generate_response(
             prompt=message.message,
-            context=relevant_chunks if relevant_chunks else None
-        )
+            context=relevant_chunks if relevant_chunks else None,
+            conversation=conversation,
+            latency_budget_ms=message.latency_budget_ms,
+            project_id=project_id
+        ))
         
-        # Save chat history
+        # Save chat history once the response has gone out
         chat_history = ChatHistory.create_new(
             project_id=project_id,
             message=message.message,
-            response=response
+            response=answer
         )
-        await db.create_chat_history(chat_history)
+        background_tasks.add_task(_save_chat_turn, chat_history)
         
+        response.headers["Server-Timing"] = _server_timing(timings)
         return {
             "message": message.message,
-            "response": response,
+            "response": answer,
             "sources_used": len(relevant_chunks),
-            "timestamp": chat_history.timestamp
+            "timestamp": chat_history.timestamp,
+            "timings_ms": timings
         }
     
+    try:
+        # Runs under the request deadline and stops if the client disconnects
+        return await deadlines.run_request(request, respond)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process chat message: {str(e)}")
 
-@router.get("/history", response_model=List[ChatHistory])
-async def get_chat_history(project_id: str, limit: int = 50):
-    """Get chat history for a project"""
-    try:
-        # Check if project exists
-        project = await db.get_project(project_id)
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/stream")
+async def stream_chat_with_project(
+    project_id: str,
+    message: ChatMessage,
+    request: Request,
+    background_tasks: BackgroundTasks
+):
+    """Chat with documents in a project, streaming the answer as server-sent events.
+    
+    Retrieval runs with the same concurrency as the non-streaming endpoint.
+    Emits ``start`` once retrieval is done, one ``token`` event per text
+    chunk, then ``done`` (with stage timings), or ``error`` if generation
+    fails midway. Retrieval and generation share one request deadline, and
+    generation stops when the client disconnects. The answer is saved to
+    chat history after the stream closes.
+    """
+    request_start = time.perf_counter()
+    timeout = deadlines.request_timeout(request)
+    timings: Dict[str, float] = {}
+    
+    async def retrieve():
+        project, query_embedding, conversation = await asyncio.gather(
+            _timed(timings, "project", project_cache.get(project_id)),
+            _timed(timings, "embedding", gemini_service.embed_query(message.message)),
+            _timed(timings, "memory", conversation_memory.load(project_id))
+        )
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
+        if not query_embedding:
+            raise HTTPException(status_code=500, detail="Failed to generate query embedding")
         
+        # Search for relevant document chunks
+        relevant_chunks = []
+        if pinecone_service:
+            search_results = await _timed(timings, "search", pinecone_service.search_similar_chunks(
+                query_embedding=query_embedding,
+                project_id=project_id,
+                top_k=5
+            ))
+            relevant_chunks = [result["text"] for result in search_results if result.get("text")]
+        return relevant_chunks, conversation
+    
+    try:
+        relevant_chunks, conversation = await deadlines.run_request(request, retrieve)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process chat message: {str(e)}")
+    
+    # Filled in as the answer streams; saved by the background task afterwards
+    chat_history = ChatHistory.create_new(
+        project_id=project_id,
+        message=message.message,
+        response=""
+    )
+    background_tasks.add_task(_save_chat_turn, chat_history)
+    
+    async def event_stream():
+        # Generation gets whatever is left of the request deadline
+        deadlines.start(timeout - (time.perf_counter() - request_start))
+        yield _sse("start", {"sources_used": len(relevant_chunks)})
+        
+        response_parts = []
+        ttft_ms = None
+        generation_start = time.perf_counter()
+        try:
+            async for text in deadlines.until_disconnect(request, gemini_service.stream_response(
+                prompt=message.message,
+                context=relevant_chunks if relevant_chunks else None,
+                conversation=conversation,
+                latency_budget_ms=message.latency_budget_ms,
+                project_id=project_id
+            )):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - request_start) * 1000
+                    metrics.observe("chat.stream.ttft_ms", ttft_ms)
+                response_parts.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            metrics.increment("chat.stream.errors")
+            yield _sse("error", {"detail": f"Failed to generate response: {str(e)}"})
+            return
+        
+        # Nobody is listening any more; don't save a partial answer
+        if await request.is_disconnected():
+            return
+        
+        chat_history.response = "".join(response_parts)
+        timings["generation"] = round((time.perf_counter() - generation_start) * 1000, 1)
+        metrics.observe("chat.stage.generation_ms", timings["generation"])
+        
+        total_ms = (time.perf_counter() - request_start) * 1000
+        metrics.observe("chat.stream.total_ms", total_ms)
+        yield _sse("done", {
+            "id": chat_history.id,
+            "sources_used": len(relevant_chunks),
+            "timestamp": chat_history.timestamp.isoformat(),
+            "ttft_ms": ttft_ms,
+            "total_ms": total_ms,
+            "timings_ms": timings
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Server-Timing": _server_timing(timings)
+        }
+    )
+
+@router.get("/history", response_model=List[ChatHistory])
+async def get_chat_history(project_id: str, limit: int = 50, project: Project = Depends(get_project_or_404)):
+    """Get chat history for a project"""
+    try:
         history = await db.get_chat_history(project_id, limit)
-        return history
+        return list_response(ChatHistory, history)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch chat history: {str(e)}")
 
-@router.post("/search", response_model=List[SearchResult])
-async def search_in_project(project_id: str, query: SearchQuery):
-    """Search within project documents"""
+def _encode_cursor(chat: ChatHistory) -> str:
+    return base64.urlsafe_b64encode(f"{chat.timestamp.isoformat()}|{chat.id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
     try:
-        # Check if project exists
-        project = await db.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+        timestamp, chat_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(timestamp), chat_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+def _fts_query(text: str) -> str:
+    """Quote each term so user input is matched literally rather than parsed as FTS5 syntax"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+@router.get("/history/page", response_model=ChatHistoryPage)
+async def get_chat_history_page(
+    project_id: str,
+    before: Optional[str] = None,
+    limit: int = 50,
+    project: Project = Depends(get_project_or_404)
+):
+    """Get a page of chat history, newest first across pages, walking back with ``before``"""
+    try:
+        limit = max(1, min(limit, Config.CHAT_HISTORY_PAGE_MAX))
+        cursor = _decode_cursor(before) if before else None
+        
+        # Fetch one extra row to know whether an older page exists
+        items = await db.get_chat_history_before(project_id, cursor, limit + 1)
+        if len(items) <= limit:
+            # Archived turns are all older than the live ones, so the walk continues into the archive
+            archive_cursor = (items[0].timestamp, items[0].id) if items else cursor
+            items = await db.get_archived_chat_history_before(project_id, archive_cursor, limit + 1 - len(items)) + items
+        has_more = len(items) > limit
+        items = items[-limit:]
+        return ChatHistoryPage(
+            items=items,
+            next_cursor=_encode_cursor(items[0]) if has_more else None
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch chat history: {str(e)}")
+
+@router.get("/history/search", response_model=List[ChatHistorySearchResult])
+async def search_chat_history(project_id: str, q: str, limit: int = 20, project: Project = Depends(get_project_or_404)):
+    """Full-text search over the project's past questions and answers"""
+    try:
+        match = _fts_query(q)
+        if not match:
+            raise HTTPException(status_code=400, detail="Search query is empty")
         
+        return await db.search_chat_history(project_id, match, max(1, min(limit, Config.CHAT_HISTORY_PAGE_MAX)))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search chat history: {str(e)}")
+
+@router.post("/search", response_model=List[SearchResult])
+async def search_in_project(project_id: str, query: SearchQuery, request: Request, response: Response):
+    """Search within project documents"""
+    timings: Dict[str, float] = {}
+    
+    async def search():
         if not pinecone_service:
             raise HTTPException(status_code=503, detail="Search service not available")
         
-        # Generate query embedding
-        query_embedding = gemini_service.generate_query_embedding(query.query)
+        # Check the project and embed the query concurrently
+        project, query_embedding = await asyncio.gather(
+            _timed(timings, "project", project_cache.get(project_id)),
+            _timed(timings, "embedding", gemini_service.embed_query(query.query))
+        )
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
         if not query_embedding:
             raise HTTPException(status_code=500, detail="Failed to generate query embedding")
         
         # Search in project
-        search_results = pinecone_service.search_similar_chunks(
+        search_results = await _timed(timings, "search", pinecone_service.search_similar_chunks(
             query_embedding=query_embedding,
             project_id=project_id,
             top_k=10
+        ))
+        
+        response.headers["Server-Timing"] = _server_timing(timings)
+        return _format_search_results(search_results, project_id)
+    
+    try:
+        return await deadlines.run_request(request, search)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search project: {str(e)}")
+
+@router.post("/search/batch", response_model=List[BatchSearchResult])
+async def batch_search_in_project(project_id: str, batch: BatchSearchQuery, request: Request, response: Response):
+    """Run several searches within project documents in one request"""
+    timings: Dict[str, float] = {}
+    
+    async def search():
+        if not pinecone_service:
+            raise HTTPException(status_code=503, detail="Search service not available")
+        
+        # Check the project and embed all queries (in batched calls) concurrently
+        project, query_embeddings = await asyncio.gather(
+            _timed(timings, "project", project_cache.get(project_id)),
+            _timed(timings, "embedding", gemini_service.embed_queries(batch.queries))
         )
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        if len(query_embeddings) != len(batch.queries):
+            raise HTTPException(status_code=500, detail="Failed to generate query embeddings")
         
-        # Format results
-        formatted_results = []
-        for result in search_results:
-            metadata = result.get("metadata", {})
-            formatted_results.append(SearchResult(
-                document_id=metadata.get("document_id", ""),
-                filename=metadata.get("filename", "Unknown"),
-                project_id=metadata.get("project_id", project_id),
-                content_snippet=result.get("text", "")[:200] + "..." if len(result.get("text", "")) > 200 else result.get("text", ""),
-                relevance_score=result.get("score", 0.0)
-            ))
+        # Run the vector queries concurrently
+        batch_results = await _timed(timings, "search", pinecone_service.search_similar_chunks_batch(
+            query_embeddings=query_embeddings,
+            project_id=project_id,
+            top_k=batch.top_k
+        ))
         
-        return formatted_results
+        response.headers["Server-Timing"] = _server_timing(timings)
+        return [
+            BatchSearchResult(
+                query=query,
+                results=_format_search_results(search_results, project_id)
+            )
+            for query, search_results in zip(batch.queries, batch_results)
+        ]
     
+    try:
+        return await deadlines.run_request(request, search)
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to search project: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to run batch search: {str(e)}")
 
 @router.post("/summarize")
-async def summarize_project(project_id: str):
+async def summarize_project(project_id: str, project: Project = Depends(get_project_or_404)):
     """Generate a summary of all documents in the project"""
     try:
-        # Check if project exists
-        project = await db.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
         # Get all documents in project
         documents = await db.get_documents_by_project(project_id)
         if not documents:
             raise HTTPException(status_code=404, detail="No documents found in project")
         
-        # For now, we'll generate a simple summary
-        # In a full implementation, you might want to retrieve document chunks from Pinecone
-        summary_prompt = f"""
-        Generate a comprehensive summary for the project "{project.name}".
-        
-        The project contains {len(documents)} documents:
-        {', '.join([doc.filename for doc in documents])}
-        
-        Please provide an overview of what this project might contain based on the document names and project description: {project.description or 'No description provided'}.
-        """
-        
-        summary = await gemini_service.generate_response(summary_prompt)
+        # Map-reduce over the stored chunk text; unchanged levels come from the cache
+        result = await project_summarizer.summarize_project(project, documents)
+        if not result["summary"]:
+            raise HTTPException(status_code=404, detail="No processed document content found in project")
         
         return {
             "project_name": project.name,
             "document_count": len(documents),
-            "summary": summary,
-            "documents": [{"filename": doc.filename, "upload_date": doc.upload_date} for doc in documents]
+            "summary": result["summary"],
+            "documents": [
+                {
+                    "filename": doc.filename,
+                    "upload_date": doc.upload_date,
+                    "summary": result["documents"].get(doc.id)
+                }
+                for doc in documents
+            ],
+            "summaries_computed": result["stats"]["computed"],
+            "summaries_cached": result["stats"]["cached"]
         }
     
     except HTTPException:
@@ -159,37 +432,30 @@ async def summarize_project(project_id: str):
 
 # Global search across all projects
 @router.post("/search/global", response_model=List[SearchResult])  
-async def search_across_projects(query: SearchQuery):
+async def search_across_projects(query: SearchQuery, request: Request, response: Response):
     """Search across all projects"""
-    try:
+    timings: Dict[str, float] = {}
+    
+    async def search():
         if not pinecone_service:
             raise HTTPException(status_code=503, detail="Search service not available")
         
         # Generate query embedding
-        query_embedding = gemini_service.generate_query_embedding(query.query)
+        query_embedding = await _timed(timings, "embedding", gemini_service.embed_query(query.query))
         if not query_embedding:
             raise HTTPException(status_code=500, detail="Failed to generate query embedding")
         
         # Search across all projects
-        search_results = pinecone_service.search_across_projects(
+        search_results = await _timed(timings, "search", pinecone_service.search_across_projects(
             query_embedding=query_embedding,
             top_k=15
-        )
+        ))
         
-        # Format results
-        formatted_results = []
-        for result in search_results:
-            metadata = result.get("metadata", {})
-            formatted_results.append(SearchResult(
-                document_id=metadata.get("document_id", ""),
-                filename=metadata.get("filename", "Unknown"),
-                project_id=metadata.get("project_id", ""),
-                content_snippet=result.get("text", "")[:200] + "..." if len(result.get("text", "")) > 200 else result.get("text", ""),
-                relevance_score=result.get("score", 0.0)
-            ))
-        
-        return formatted_results
+        response.headers["Server-Timing"] = _server_timing(timings)
+        return _format_search_results(search_results)
     
+    try:
+        return await deadlines.run_request(request, search)
     except HTTPException:
         raise
     except Exception as e:
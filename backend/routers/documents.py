@@ -1,24 +1,34 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
-from typing import List
-from backend.models import Document
-from backend.database import db
+import base64
+import json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, BackgroundTasks
+from typing import List, Optional, Tuple
+from backend.models import Document, DocumentInsights, DocumentPage, DocumentWithInsights, Project
+from backend.database import db, DOCUMENT_SORTS
+from backend.dependencies import get_project_or_404
+from backend.serialization import list_response
+from backend.services.blob_store import blob_store
 from backend.services.processor import document_processor
+from backend.services.vector_cleanup import vector_cleanup_service
+from backend.services.context_cache import context_cache
+from backend.services.document_status import document_status
+from backend.services.scheduler import scheduler
 from shared.config import Config
 
 router = APIRouter(prefix="/api/projects/{project_id}/documents", tags=["documents"])
 
 @router.post("/upload", response_model=Document)
-async def upload_document(project_id: str, file: UploadFile = File(...)):
+async def upload_document(
+    project_id: str,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    project: Project = Depends(get_project_or_404)
+):
     """Upload and process a document"""
     try:
-        # Check if project exists
-        project = await db.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
         # Check file count limit
-        existing_docs = await db.get_documents_by_project(project_id)
-        if len(existing_docs) >= Config.MAX_FILES_PER_PROJECT:
+        document_count = await db.count_documents(project_id)
+        if document_count >= Config.MAX_FILES_PER_PROJECT:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Maximum {Config.MAX_FILES_PER_PROJECT} files per project allowed"
@@ -33,16 +43,24 @@ async def upload_document(project_id: str, file: UploadFile = File(...)):
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_message)
         
+        # Keep the original so the document can be re-processed without a new upload
+        content_hash = await blob_store.put(file_content)
+        
         # Create document record
         document = Document.create_new(
             project_id=project_id,
             filename=file.filename,
             file_type=file.filename.split('.')[-1].lower(),
-            file_size=file_size
+            file_size=file_size,
+            status="processing",
+            content_hash=content_hash
         )
         
-        # Save to database first
-        created_document = await db.create_document(document)
+        # Save to database first; the blob stays pinned until the row refers to it
+        try:
+            created_document = await db.create_document(document)
+        finally:
+            blob_store.unpin(content_hash)
         
         # Process document (extract text, create embeddings, store in vector DB)
         processing_success = await document_processor.process_document(
@@ -53,10 +71,19 @@ async def upload_document(project_id: str, file: UploadFile = File(...)):
         )
         
         if not processing_success:
-            # If processing fails, delete the document record
+            # If processing fails, delete the document record and any partial vectors
+            document_status.discard([created_document.id])
             await db.delete_document(created_document.id)
+            background_tasks.add_task(vector_cleanup_service.delete_document_vectors, project_id, created_document.id)
+            background_tasks.add_task(blob_store.release, content_hash)
             raise HTTPException(status_code=500, detail="Failed to process document")
         
+        # The status change is written with the next batch of transitions
+        created_document.status = "ready"
+        document_status.record(created_document.id, "ready")
+        
+        # Cached contexts no longer reflect the project's documents
+        context_cache.invalidate(project_id)
         return created_document
     
     except HTTPException:
@@ -64,17 +91,69 @@ async def upload_document(project_id: str, file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload document: {str(e)}")
 
-@router.get("/", response_model=List[Document])
-async def get_project_documents(project_id: str):
-    """Get all documents for a project"""
+@router.get("/", response_model=List[DocumentWithInsights])
+async def get_project_documents(project_id: str, project: Project = Depends(get_project_or_404)):
+    """Get all documents for a project, with their precomputed insights when ready"""
     try:
-        # Check if project exists
-        project = await db.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+        documents = await db.get_documents_with_insights(project_id)
+        return list_response(DocumentWithInsights, documents)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch documents: {str(e)}")
+
+def _encode_cursor(sort: str, document: Document) -> str:
+    value = getattr(document, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, document.id]).encode()).decode()
+
+def _decode_cursor(sort: str, cursor: str) -> Tuple:
+    try:
+        value, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(value) if sort == "upload_date" else value), document_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid document cursor")
+
+@router.get("/page", response_model=DocumentPage)
+async def get_project_documents_page(
+    project_id: str,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    sort: str = "upload_date",
+    order: str = "desc",
+    q: Optional[str] = None,
+    file_type: Optional[str] = None,
+    project: Project = Depends(get_project_or_404)
+):
+    """Get a page of documents, sorted by upload_date, filename or file_size and filtered by name or type"""
+    try:
+        if sort not in DOCUMENT_SORTS:
+            raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(DOCUMENT_SORTS)}")
+        if order not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="order must be asc or desc")
+        limit = max(1, min(limit, Config.DOCUMENT_PAGE_MAX))
+        after = _decode_cursor(sort, cursor) if cursor else None
+        file_type = file_type.lower() if file_type else None
         
-        documents = await db.get_documents_by_project(project_id)
-        return documents
+        # Fetch one extra row to know whether another page exists
+        items = await db.get_documents_page(
+            project_id,
+            sort=sort,
+            descending=order == "desc",
+            after=after,
+            limit=limit + 1,
+            name_filter=q,
+            file_type=file_type
+        )
+        has_more = len(items) > limit
+        items = items[:limit]
+        return DocumentPage(
+            items=items,
+            total=await db.count_documents(project_id, q, file_type),
+            max_documents=Config.MAX_FILES_PER_PROJECT,
+            next_cursor=_encode_cursor(sort, items[-1]) if has_more else None
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -98,8 +177,26 @@ async def get_document(project_id: str, document_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch document: {str(e)}")
 
+@router.get("/{document_id}/summary", response_model=DocumentInsights)
+async def get_document_summary(project_id: str, document_id: str):
+    """Get the precomputed summary, outline and key terms of a document"""
+    try:
+        document = await db.get_document(document_id)
+        if not document or document.project_id != project_id:
+            raise HTTPException(status_code=404, detail="Document not found in this project")
+        
+        insights = await db.get_document_insights(document_id)
+        if not insights:
+            raise HTTPException(status_code=404, detail="Document summary is not available yet")
+        
+        return insights
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch document summary: {str(e)}")
+
 @router.delete("/{document_id}")
-async def delete_document(project_id: str, document_id: str):
+async def delete_document(project_id: str, document_id: str, background_tasks: BackgroundTasks):
     """Delete a document"""
     try:
         # Check if document exists and belongs to project
@@ -115,8 +212,11 @@ async def delete_document(project_id: str, document_id: str):
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete document")
         
-        # TODO: Delete from Pinecone vector database
-        # pinecone_service.delete_document(project_id, document_id)
+        # Delete from Pinecone in the background (retried, reconciled on failure)
+        background_tasks.add_task(vector_cleanup_service.delete_document_vectors, project_id, document_id)
+        if document.content_hash:
+            background_tasks.add_task(blob_store.release, document.content_hash)
+        context_cache.invalidate(project_id)
         
         return {"message": "Document deleted successfully"}
     except HTTPException:
@@ -125,17 +225,16 @@ async def delete_document(project_id: str, document_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete document: {str(e)}")
 
 @router.post("/bulk-upload")
-async def bulk_upload_documents(project_id: str, files: List[UploadFile] = File(...)):
+async def bulk_upload_documents(
+    project_id: str,
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    project: Project = Depends(get_project_or_404)
+):
     """Upload multiple documents at once"""
     try:
-        # Check if project exists
-        project = await db.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
         # Check total file count
-        existing_docs = await db.get_documents_by_project(project_id)
-        total_files = len(existing_docs) + len(files)
+        total_files = await db.count_documents(project_id) + len(files)
         
         if total_files > Config.MAX_FILES_PER_PROJECT:
             raise HTTPException(
@@ -145,45 +244,76 @@ async def bulk_upload_documents(project_id: str, files: List[UploadFile] = File(
         
         successful_uploads = []
         failed_uploads = []
+        failed_document_ids = []
         
-        for file in files:
-            try:
+        # Validate every file against its real size, then register all valid ones in a single transaction.
+        # The stored originals stay pinned until the rows that refer to them are saved.
+        accepted = []
+        try:
+            for file in files:
                 file_content = await file.read()
                 file_size = len(file_content)
-                
-                # Validate file
                 is_valid, error_message = document_processor.validate_file(file.filename, file_size)
                 if not is_valid:
                     failed_uploads.append({"filename": file.filename, "error": error_message})
                     continue
-                
-                # Create document record
-                document = Document.create_new(
+                # Uploads are spooled to disk, so the content is read again when the file is processed
+                await file.seek(0)
+                accepted.append((file, Document.create_new(
                     project_id=project_id,
                     filename=file.filename,
                     file_type=file.filename.split('.')[-1].lower(),
-                    file_size=file_size
+                    file_size=file_size,
+                    status="pending",
+                    content_hash=await blob_store.put(file_content)
+                )))
+            await db.create_documents([document for _, document in accepted])
+        except BaseException:
+            # No row refers to the originals already stored, so release them once they are unpinned.
+            # Queued rather than added to background_tasks, which do not run for a failed request.
+            for _, document in accepted:
+                scheduler.enqueue(
+                    f"blob-release-{document.content_hash}",
+                    lambda content_hash=document.content_hash: blob_store.release(content_hash)
                 )
-                
-                # Save to database
-                created_document = await db.create_document(document)
+            raise
+        finally:
+            for _, document in accepted:
+                blob_store.unpin(document.content_hash)
+        
+        for file, document in accepted:
+            error = "Processing failed"
+            try:
+                document_status.record(document.id, "processing")
+                file_content = await file.read()
                 
                 # Process document
                 processing_success = await document_processor.process_document(
                     file_content=file_content,
                     filename=file.filename,
                     project_id=project_id,
-                    document=created_document
+                    document=document
                 )
-                
-                if processing_success:
-                    successful_uploads.append(created_document)
-                else:
-                    await db.delete_document(created_document.id)
-                    failed_uploads.append({"filename": file.filename, "error": "Processing failed"})
-                
             except Exception as e:
-                failed_uploads.append({"filename": file.filename, "error": str(e)})
+                processing_success = False
+                error = str(e)
+            
+            if processing_success:
+                document.status = "ready"
+                document_status.record(document.id, "ready")
+                successful_uploads.append(document)
+                context_cache.invalidate(project_id)
+            else:
+                failed_document_ids.append(document.id)
+                background_tasks.add_task(vector_cleanup_service.delete_document_vectors, project_id, document.id)
+                background_tasks.add_task(blob_store.release, document.content_hash)
+                failed_uploads.append({"filename": file.filename, "error": error})
+        
+        # Remove the failed documents together and persist the final statuses before responding
+        if failed_document_ids:
+            document_status.discard(failed_document_ids)
+            await db.delete_documents(failed_document_ids)
+        await document_status.flush()
         
         return {
             "successful_uploads": successful_uploads,
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from typing import List
 from backend.models import Project, ProjectCreate, ProjectStats
 from backend.database import db
+from backend.dependencies import get_project_or_404
+from backend.serialization import list_response
+from backend.services.blob_store import blob_store
+from backend.services.project_cache import project_cache
+from backend.services.pinecone_service import pinecone_service
+from backend.services.vector_cleanup import vector_cleanup_service
+from backend.services.context_cache import context_cache
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
@@ -14,6 +21,7 @@ async def create_project(project_data: ProjectCreate):
             description=project_data.description
         )
         created_project = await db.create_project(project)
+        project_cache.put(created_project)
         return created_project
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create project: {str(e)}")
@@ -23,32 +31,20 @@ async def get_all_projects():
     """Get all projects"""
     try:
         projects = await db.get_all_projects()
-        return projects
+        return list_response(Project, projects)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch projects: {str(e)}")
 
 @router.get("/{project_id}", response_model=Project)
-async def get_project(project_id: str):
+async def get_project(project: Project = Depends(get_project_or_404)):
     """Get a specific project"""
-    try:
-        project = await db.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return project
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch project: {str(e)}")
+    return project
 
 @router.put("/{project_id}", response_model=Project)
-async def update_project(project_id: str, project_data: ProjectCreate):
+async def update_project(project_id: str, project_data: ProjectCreate, existing_project: Project = Depends(get_project_or_404)):
     """Update a project"""
     try:
-        # Check if project exists
-        existing_project = await db.get_project(project_id)
-        if not existing_project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
+        project_cache.invalidate(project_id)
         updated_project = await db.update_project(
             project_id=project_id,
             name=project_data.name,
@@ -58,6 +54,7 @@ async def update_project(project_id: str, project_data: ProjectCreate):
         if not updated_project:
             raise HTTPException(status_code=500, detail="Failed to update project")
         
+        project_cache.put(updated_project)
         return updated_project
     except HTTPException:
         raise
@@ -65,22 +62,21 @@ async def update_project(project_id: str, project_data: ProjectCreate):
         raise HTTPException(status_code=500, detail=f"Failed to update project: {str(e)}")
 
 @router.delete("/{project_id}")
-async def delete_project(project_id: str):
+async def delete_project(project_id: str, background_tasks: BackgroundTasks, existing_project: Project = Depends(get_project_or_404)):
     """Delete a project and all its documents"""
     try:
-        # Check if project exists
-        existing_project = await db.get_project(project_id)
-        if not existing_project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        # Delete from database (cascades to documents and chat history)
-        success = await db.delete_project(project_id)
+        # Delete from database together with its documents and chat history
+        content_hashes = await db.delete_project(project_id)
+        project_cache.invalidate(project_id)
         
-        if not success:
+        if content_hashes is None:
             raise HTTPException(status_code=500, detail="Failed to delete project")
         
-        # TODO: Also delete from Pinecone (namespace cleanup)
-        # pinecone_service.delete_project_namespace(project_id)
+        # Delete the project's vector namespace and unreferenced originals in the background
+        background_tasks.add_task(vector_cleanup_service.delete_project_vectors, project_id)
+        for content_hash in content_hashes:
+            background_tasks.add_task(blob_store.release, content_hash)
+        context_cache.invalidate(project_id)
         
         return {"message": "Project deleted successfully"}
     except HTTPException:
@@ -89,15 +85,14 @@ async def delete_project(project_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete project: {str(e)}")
 
 @router.get("/{project_id}/stats", response_model=ProjectStats)
-async def get_project_stats(project_id: str):
+async def get_project_stats(project_id: str, project: Project = Depends(get_project_or_404)):
     """Get project statistics"""
     try:
-        # Check if project exists
-        existing_project = await db.get_project(project_id)
-        if not existing_project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
         stats = await db.get_project_stats(project_id)
+        if pinecone_service:
+            # Served from the locally cached namespace counts; a remote call is
+            # only made when a delete has left the project's count unknown
+            stats.vector_count = (await pinecone_service.get_project_stats(project_id))["vector_count"]
         return stats
     except HTTPException:
         raise
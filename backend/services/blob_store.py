@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from backend.database import db
+from shared.config import Config
+
+class BlobStore:
+    """Content-addressed store for the original bytes of uploaded files.
+    
+    A blob is named by the SHA-256 of its content and lives under two
+    levels of shard directories (``ab/cd/abcd…``), so identical uploads are
+    stored once and no directory grows too large. Content is zlib-compressed
+    when that saves at least BLOB_MIN_COMPRESSION_SAVING; already-compressed
+    formats like PDF and DOCX are usually kept as they are.
+    
+    ``put`` pins the blob until the caller has saved the hash on its
+    document row and calls ``unpin``; ``release`` never deletes a pinned or
+    referenced blob. Both run under a lock per hash, so a release cannot
+    delete a blob that an upload of the same bytes has just stored.
+    """
+    
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Counter = Counter()
+        self._pins: Counter = Counter()
+    
+    @asynccontextmanager
+    async def _locked(self, content_hash: str) -> AsyncIterator[None]:
+        """Hold the hash's lock; it is dropped once nobody holds or waits for it"""
+        lock = self._locks.setdefault(content_hash, asyncio.Lock())
+        self._lock_users[content_hash] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[content_hash] -= 1
+            if not self._lock_users[content_hash]:
+                del self._lock_users[content_hash]
+                del self._locks[content_hash]
+    
+    def _path(self, content_hash: str) -> Path:
+        return self.root / content_hash[:2] / content_hash[2:4] / content_hash
+    
+    def _locate(self, content_hash: str) -> Optional[Path]:
+        """Existing file for a blob: compressed (``.z``) or raw"""
+        path = self._path(content_hash)
+        for candidate in (path.with_suffix(".z"), path):
+            if candidate.exists():
+                return candidate
+        return None
+    
+    def _write(self, content_hash: str, content: bytes):
+        if self._locate(content_hash):
+            return
+        
+        path = self._path(content_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = zlib.compress(content, Config.BLOB_COMPRESSION_LEVEL)
+        if len(data) <= len(content) * (1 - Config.BLOB_MIN_COMPRESSION_SAVING):
+            path = path.with_suffix(".z")
+        else:
+            data = content
+        
+        # Write to a temporary file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def _read(self, content_hash: str) -> Optional[bytes]:
+        path = self._locate(content_hash)
+        if not path:
+            return None
+        data = path.read_bytes()
+        return zlib.decompress(data) if path.suffix == ".z" else data
+    
+    async def put(self, content: bytes) -> str:
+        """Store content if it is not already present and pin it, returning its hash"""
+        content_hash = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+        async with self._locked(content_hash):
+            await asyncio.to_thread(self._write, content_hash, content)
+            self._pins[content_hash] += 1
+        return content_hash
+    
+    def unpin(self, content_hash: str):
+        """Drop the pin taken by ``put`` once the hash is saved on a document, or the upload was abandoned"""
+        self._pins[content_hash] -= 1
+        if self._pins[content_hash] <= 0:
+            del self._pins[content_hash]
+    
+    async def get(self, content_hash: str) -> Optional[bytes]:
+        """Original content for a hash, or None if the blob is missing"""
+        return await asyncio.to_thread(self._read, content_hash)
+    
+    async def release(self, content_hash: str) -> bool:
+        """Delete a blob once no document refers to it and no upload has it pinned"""
+        async with self._locked(content_hash):
+            if self._pins[content_hash] or await db.count_content_hash_references(content_hash):
+                return False
+            path = self._locate(content_hash)
+            if not path:
+                return False
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+            return True
+
+# Global blob store instance
+blob_store = BlobStore(Config.BLOB_STORE_PATH)
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta
+from backend.database import db
+from backend.services.metrics import metrics
+from shared.config import Config
+
+class ChatRetention:
+    """Archives old chat turns and reclaims the space they leave behind.
+    
+    Turns older than CHAT_RETENTION_DAYS move to chat_history_archive,
+    compressed, except the CHAT_RETENTION_MIN_TURNS newest per project.
+    With CHAT_ARCHIVE_SUMMARIZED_ONLY, a turn is only archived once it has
+    been folded into the project's rolling summary, so conversation memory
+    never loses it. Work is done in small transactions with pauses in
+    between, so request writes only ever wait for one short batch.
+    """
+    
+    async def run(self) -> int:
+        """Archive every project's expired turns, then vacuum; returns the number of turns archived"""
+        if Config.CHAT_RETENTION_DAYS <= 0:
+            return 0
+        
+        cutoff = datetime.now() - timedelta(days=Config.CHAT_RETENTION_DAYS)
+        archived = 0
+        for project_id in await db.get_project_ids():
+            try:
+                archived += await self.archive_project(project_id, cutoff)
+            except Exception as e:
+                print(f"Error archiving chat history for {project_id}: {str(e)}")
+        
+        if archived:
+            await self.vacuum()
+        return archived
+    
+    async def archive_project(self, project_id: str, cutoff: datetime) -> int:
+        """Move a project's turns older than ``cutoff`` into the archive, one batch per transaction"""
+        before = cutoff
+        if Config.CHAT_ARCHIVE_SUMMARIZED_ONLY:
+            summary = await db.get_conversation_summary(project_id)
+            if not summary or not summary.summarized_through:
+                return 0
+            before = min(cutoff, summary.summarized_through)
+        
+        archived = 0
+        while True:
+            turns = await db.get_chat_history_to_archive(
+                project_id, before, Config.CHAT_RETENTION_MIN_TURNS, Config.CHAT_ARCHIVE_BATCH
+            )
+            if not turns:
+                return archived
+            moved = await db.archive_chat_history(turns)
+            archived += moved
+            metrics.increment("chat_retention.archived", moved)
+            # Turns whose id is already archived stay put, so a batch that moves nothing would repeat forever
+            if not moved or len(turns) < Config.CHAT_ARCHIVE_BATCH:
+                return archived
+            await asyncio.sleep(Config.CHAT_ARCHIVE_PAUSE)
+    
+    async def vacuum(self) -> int:
+        """Return free pages to the filesystem in DB_VACUUM_STEP_PAGES steps; returns the pages freed"""
+        freed = 0
+        while True:
+            step = await db.incremental_vacuum(Config.DB_VACUUM_STEP_PAGES)
+            freed += step
+            if step < Config.DB_VACUUM_STEP_PAGES:
+                break
+            await asyncio.sleep(Config.CHAT_ARCHIVE_PAUSE)
+        if freed:
+            metrics.increment("db.vacuum_pages", freed)
+        return freed
+
+# Global chat retention instance
+chat_retention = ChatRetention()
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from backend.services.metrics import metrics
+
+class _Broadcast:
+    """One upstream stream shared by every subscriber that asked for it.
+    
+    Chunks are kept for the lifetime of the stream, so a subscriber that
+    joins late first replays what it missed and then follows live.
+    """
+    
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+    
+    async def publish(self, source: AsyncIterator[str]):
+        try:
+            async for chunk in source:
+                async with self._changed:
+                    self.chunks.append(chunk)
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+    
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.chunks) or self.done)
+                pending = self.chunks[position:]
+                finished = self.done
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if finished and position >= len(self.chunks):
+                if self.error:
+                    raise self.error
+                return
+
+class RequestCoalescer:
+    """Deduplicates identical in-flight LLM calls.
+    
+    Requests are keyed on a hash of model and fully assembled prompt; while
+    a call for a key is running, identical requests wait for its result
+    (or follow its stream) instead of issuing their own. A call is
+    cancelled once every request waiting on it has gone away. Nothing is
+    cached once the call finishes.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._waiters: Counter = Counter()
+        self._streams: Dict[str, _Broadcast] = {}
+    
+    def key(self, model_name: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+    
+    async def run(self, key: str, call: Callable[[], Awaitable[str]]) -> str:
+        """Result of ``call``, shared with any identical call already in flight"""
+        future = self._calls.get(key)
+        if future is not None:
+            metrics.increment(f"{self.name}.coalesced")
+        else:
+            metrics.increment(f"{self.name}.upstream")
+            future = asyncio.ensure_future(call())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        
+        self._waiters[key] += 1
+        try:
+            # One caller going away must not cancel the call for the others
+            return await asyncio.shield(future)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                # The last caller went away, so stop the upstream call
+                if not future.done():
+                    self._forget(key, future)
+                    future.cancel()
+    
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+    
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Chunks of ``open_stream()``, fanned out to identical concurrent streams"""
+        broadcast = self._streams.get(key)
+        if broadcast is not None:
+            metrics.increment(f"{self.name}.stream_coalesced")
+        else:
+            metrics.increment(f"{self.name}.stream_upstream")
+            broadcast = _Broadcast()
+            broadcast.task = asyncio.create_task(broadcast.publish(open_stream()))
+            self._streams[key] = broadcast
+            broadcast.task.add_done_callback(lambda _: self._streams.pop(key, None))
+        
+        broadcast.subscribers += 1
+        try:
+            async for chunk in broadcast.subscribe():
+                yield chunk
+        finally:
+            broadcast.subscribers -= 1
+            # Stop the upstream call once nobody is listening any more
+            if broadcast.subscribers == 0 and not broadcast.done:
+                broadcast.task.cancel()
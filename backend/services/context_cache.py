@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import time
+from collections import Counter, defaultdict, deque
+from datetime import timedelta
+from typing import Deque, Dict, List, Optional, Set, Tuple
+import google.generativeai as genai
+from google.generativeai import caching
+from backend.services.metrics import metrics
+from backend.services.prompt_builder import SYSTEM_PREAMBLE, prompt_builder
+from backend.services.scheduler import scheduler
+from shared.config import Config
+
+def _chunk_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class CachedProjectContext:
+    """A live Gemini cached context holding the preamble and a project's hottest chunks"""
+    
+    def __init__(self, cache: caching.CachedContent, chunk_keys: Set[str], tokens: int, version: int):
+        self.cache = cache
+        self.model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+        self.chunk_keys = chunk_keys
+        self.tokens = tokens
+        self.version = version
+        # Stop using the cache a little before the server expires it
+        self.expires_at = time.monotonic() + Config.CONTEXT_CACHE_TTL - 30
+    
+    @property
+    def name(self) -> str:
+        return self.cache.name
+    
+    def contains(self, text: str) -> bool:
+        return _chunk_key(text) in self.chunk_keys
+
+class ProjectContextCache:
+    """Explicit Gemini context caches for frequently used projects.
+    
+    Every chat turn records which chunks were retrieved. Once a project
+    sees CONTEXT_CACHE_HOT_REQUESTS turns within CONTEXT_CACHE_HOT_WINDOW,
+    a cached context with the preamble and its most retrieved chunks is
+    created on the low-priority queue. Later turns send only the excerpts
+    missing from it. Caches live for CONTEXT_CACHE_TTL and are rebuilt
+    while the project stays hot; any document change invalidates them.
+    """
+    
+    def __init__(self):
+        self._requests: Dict[str, Deque[float]] = defaultdict(deque)
+        self._retrievals: Dict[str, Counter] = defaultdict(Counter)
+        self._texts: Dict[str, Dict[str, str]] = defaultdict(dict)
+        self._entries: Dict[Tuple[str, str], CachedProjectContext] = {}
+        self._pending: Set[Tuple[str, str]] = set()
+        self._retry_after: Dict[Tuple[str, str], float] = {}
+        self._versions: Dict[str, int] = defaultdict(int)
+    
+    def record_request(self, project_id: str, model_name: str, context: Optional[List[str]]):
+        """Count a chat turn and its retrieved chunks, building a cache once the project is hot"""
+        if not Config.CONTEXT_CACHE_ENABLED:
+            return
+        
+        now = time.monotonic()
+        requests = self._requests[project_id]
+        requests.append(now)
+        while requests and requests[0] < now - Config.CONTEXT_CACHE_HOT_WINDOW:
+            requests.popleft()
+        
+        retrievals, texts = self._retrievals[project_id], self._texts[project_id]
+        for text in context or []:
+            key = _chunk_key(text)
+            retrievals[key] += 1
+            texts[key] = text
+        # Keep the tracked chunk set bounded to the most retrieved ones
+        if len(texts) > 4 * Config.CONTEXT_CACHE_MAX_CHUNKS:
+            keep = dict(retrievals.most_common(2 * Config.CONTEXT_CACHE_MAX_CHUNKS))
+            self._retrievals[project_id] = Counter(keep)
+            self._texts[project_id] = {key: texts[key] for key in keep}
+        
+        key = (project_id, model_name)
+        if (
+            len(requests) >= Config.CONTEXT_CACHE_HOT_REQUESTS
+            and self.lookup(project_id, model_name, count=False) is None
+            and key not in self._pending
+            and self._retry_after.get(key, 0) <= now
+        ):
+            self._pending.add(key)
+            scheduler.enqueue(f"context-cache-{project_id}", lambda: self._build(project_id, model_name))
+    
+    def lookup(self, project_id: str, model_name: str, count: bool = True) -> Optional[CachedProjectContext]:
+        """The project's live cached context for a model, if any"""
+        entry = self._entries.get((project_id, model_name))
+        if entry and (entry.expires_at <= time.monotonic() or entry.version != self._versions[project_id]):
+            self._entries.pop((project_id, model_name), None)
+            entry = None
+        if count and self._requests.get(project_id):
+            metrics.increment("context_cache.hits" if entry else "context_cache.misses")
+        return entry
+    
+    async def _build(self, project_id: str, model_name: str):
+        key = (project_id, model_name)
+        try:
+            version = self._versions[project_id]
+            chunks = [self._texts[project_id][chunk] for chunk, _ in self._retrievals[project_id].most_common(Config.CONTEXT_CACHE_MAX_CHUNKS)]
+            text, kept, tokens = await prompt_builder.offload(prompt_builder.build_cached_context, chunks, model_name)
+            if tokens < Config.CONTEXT_CACHE_MIN_TOKENS:
+                # Too little content to cache yet; look again after another window
+                self._retry_after[key] = time.monotonic() + Config.CONTEXT_CACHE_HOT_WINDOW
+                return
+            
+            cache = await asyncio.to_thread(
+                caching.CachedContent.create,
+                model=f"models/{model_name}",
+                display_name=f"studybuddy-project-{project_id}",
+                system_instruction=SYSTEM_PREAMBLE,
+                contents=[text],
+                ttl=timedelta(seconds=Config.CONTEXT_CACHE_TTL)
+            )
+            if version != self._versions[project_id]:
+                # Documents changed while the cache was being created
+                await self._delete(cache)
+                return
+            
+            previous = self._entries.get(key)
+            self._entries[key] = CachedProjectContext(cache, {_chunk_key(chunk) for chunk in kept}, tokens, version)
+            if previous:
+                scheduler.enqueue(f"context-cache-delete-{project_id}", lambda: self._delete(previous.cache))
+            metrics.increment("context_cache.created")
+            metrics.observe("context_cache.tokens", tokens)
+        except Exception as e:
+            print(f"Error creating context cache for project {project_id}: {str(e)}")
+            self._retry_after[key] = time.monotonic() + Config.CONTEXT_CACHE_HOT_WINDOW
+        finally:
+            self._pending.discard(key)
+    
+    async def _delete(self, cache: caching.CachedContent):
+        try:
+            await asyncio.to_thread(cache.delete)
+        except Exception as e:
+            # The server drops it at expiry anyway
+            print(f"Error deleting context cache {cache.name}: {str(e)}")
+    
+    def discard(self, project_id: str, model_name: str):
+        """Stop using a cache the server rejected"""
+        self._entries.pop((project_id, model_name), None)
+    
+    def invalidate(self, project_id: str):
+        """Drop a project's caches and retrieval stats after its documents changed"""
+        self._versions[project_id] += 1
+        self._retrievals.pop(project_id, None)
+        self._texts.pop(project_id, None)
+        for key in [key for key in self._entries if key[0] == project_id]:
+            entry = self._entries.pop(key)
+            scheduler.enqueue(f"context-cache-delete-{project_id}", lambda cache=entry.cache: self._delete(cache))
+            metrics.increment("context_cache.invalidated")
+        for key in [key for key in self._retry_after if key[0] == project_id]:
+            del self._retry_after[key]
+
+# Global context cache instance
+context_cache = ProjectContextCache()
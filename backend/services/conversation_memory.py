@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime
+from typing import Dict
+from backend.database import db
+from backend.models import ConversationContext, ConversationSummary
+from backend.services.gemini_service import gemini_service
+from shared.config import Config
+
+class ConversationMemory:
+    """Bounded conversation memory per project.
+    
+    The last MEMORY_RECENT_TURNS turns go into the prompt verbatim; older
+    turns are folded into a running summary stored in SQLite. Folding runs
+    in a background task after a turn is saved and only ever reads the turns
+    that aged out since the last update, so its cost does not grow with
+    the length of the conversation.
+    """
+    
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+    
+    async def load(self, project_id: str) -> ConversationContext:
+        """Running summary plus the most recent turns for a project"""
+        summary, recent_turns = await asyncio.gather(
+            db.get_conversation_summary(project_id),
+            db.get_chat_history(project_id, Config.MEMORY_RECENT_TURNS)
+        )
+        return ConversationContext(
+            summary=summary.summary if summary else None,
+            recent_turns=recent_turns
+        )
+    
+    async def update_summary(self, project_id: str) -> bool:
+        """Fold turns older than the verbatim window into the running summary"""
+        lock = self._locks.setdefault(project_id, asyncio.Lock())
+        if lock.locked():
+            # An update for this project is already running and will catch up
+            return False
+        
+        async with lock:
+            try:
+                current = await db.get_conversation_summary(project_id)
+                since = current.summarized_through if current else None
+                
+                aged_out = await db.count_chat_history_after(project_id, since) - Config.MEMORY_RECENT_TURNS
+                if aged_out < Config.MEMORY_SUMMARY_MIN_TURNS:
+                    return False
+                
+                turns = await db.get_chat_history_after(
+                    project_id, since, min(aged_out, Config.MEMORY_SUMMARY_BATCH)
+                )
+                summary_text = await gemini_service.summarize_conversation(
+                    current.summary if current else None, turns
+                )
+                if not summary_text:
+                    return False
+                
+                await db.save_conversation_summary(ConversationSummary(
+                    project_id=project_id,
+                    summary=summary_text,
+                    summarized_through=turns[-1].timestamp,
+                    summarized_turns=(current.summarized_turns if current else 0) + len(turns),
+                    updated_at=datetime.now()
+                ))
+                return True
+            except Exception as e:
+                print(f"Error updating conversation summary for {project_id}: {str(e)}")
+                return False
+
+# Global memory instance
+conversation_memory = ConversationMemory()
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+from fastapi import HTTPException, Request
+from backend.services.metrics import metrics
+from shared.config import Config
+
+T = TypeVar("T")
+
+# Monotonic time by which the current request must finish, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(HTTPException):
+    """The request ran out of time; surfaces as 504 through the routers' HTTPException handling"""
+    
+    def __init__(self, stage: str):
+        super().__init__(status_code=504, detail=f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+class ClientDisconnected(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=499, detail="Client closed request")
+
+def request_timeout(request: Request) -> float:
+    """Seconds the request may take: REQUEST_DEADLINE_MS, shortened by an X-Request-Timeout-Ms header"""
+    timeout_ms = Config.REQUEST_DEADLINE_MS
+    header = request.headers.get("x-request-timeout-ms")
+    if header and header.isdigit():
+        timeout_ms = min(timeout_ms, int(header))
+    return timeout_ms / 1000
+
+def start(timeout: float):
+    """Set the deadline for the current task and everything it awaits or spawns"""
+    return _deadline.set(time.monotonic() + timeout)
+
+def clear():
+    """Drop any deadline inherited from the request that spawned the current task"""
+    _deadline.set(None)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def request_options() -> Dict:
+    """Gemini SDK request options that carry the remaining time upstream"""
+    left = remaining()
+    return {"timeout": max(left, 0.001)} if left is not None else {}
+
+async def bounded(stage: str, step: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Await ``step`` within the request deadline and an optional per-call timeout.
+    
+    Raises DeadlineExceeded when the request deadline is what ran out, and
+    asyncio.TimeoutError when only the per-call timeout did.
+    """
+    left = remaining()
+    limit = timeout if left is None else (left if timeout is None else min(left, timeout))
+    if left is not None and left <= 0:
+        if asyncio.iscoroutine(step):
+            step.close()
+        metrics.increment(f"deadline.{stage}.exceeded")
+        raise DeadlineExceeded(stage)
+    try:
+        return await asyncio.wait_for(step, limit)
+    except asyncio.TimeoutError:
+        if left is not None and limit == left:
+            metrics.increment(f"deadline.{stage}.exceeded")
+            raise DeadlineExceeded(stage)
+        raise
+
+async def _first_success(tasks) -> asyncio.Future:
+    pending = set(tasks)
+    while True:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is None:
+                return task
+        if not pending:
+            return done.pop()
+
+async def hedged(stage: str, call: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+    """Run an idempotent upstream call, racing a second copy once the first is slow.
+    
+    The backup is sent when the first attempt outlives the stage's recent
+    p95 latency (HEDGE_PERCENTILE); whichever succeeds first wins and the
+    other is cancelled. Needs HEDGE_MIN_SAMPLES samples before hedging.
+    """
+    samples = f"upstream.{stage}_ms"
+    delay = None
+    if Config.HEDGE_REQUESTS and len(metrics.samples.get(samples, ())) >= Config.HEDGE_MIN_SAMPLES:
+        delay = metrics.percentile(samples, Config.HEDGE_PERCENTILE) / 1000
+    
+    start_time = time.perf_counter()
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        if delay is not None:
+            left = remaining()
+            done, _ = await asyncio.wait(tasks, timeout=delay if left is None else max(min(delay, left), 0))
+            if not done:
+                metrics.increment(f"hedge.{stage}.sent")
+                tasks.append(asyncio.ensure_future(call()))
+        
+        winner = await bounded(stage, _first_success(tasks), timeout)
+        result = winner.result()
+        if winner is not tasks[0]:
+            metrics.increment(f"hedge.{stage}.won")
+        metrics.observe(samples, (time.perf_counter() - start_time) * 1000)
+        return result
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+async def run_request(request: Request, work: Callable[[], Awaitable[T]]) -> T:
+    """Run a handler's work under the request deadline, cancelling it if the client disconnects.
+    
+    The work runs in its own task so the deadline does not leak into
+    background tasks that run after the response.
+    """
+    timeout = request_timeout(request)
+    
+    async def scoped() -> T:
+        start(timeout)
+        return await work()
+    
+    task = asyncio.create_task(scoped())
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=Config.DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                metrics.increment("requests.cancelled_on_disconnect")
+                raise ClientDisconnected()
+            if time.monotonic() >= deadline:
+                metrics.increment("deadline.request.exceeded")
+                raise DeadlineExceeded("request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def until_disconnect(request: Request, source: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Yield from ``source`` until it ends or the client goes away, then close it"""
+    iterator = source.__aiter__()
+    try:
+        while True:
+            step = asyncio.ensure_future(iterator.__anext__())
+            try:
+                while True:
+                    done, _ = await asyncio.wait({step}, timeout=Config.DISCONNECT_POLL_INTERVAL)
+                    if done:
+                        break
+                    if await request.is_disconnected():
+                        metrics.increment("requests.cancelled_on_disconnect")
+                        return
+                try:
+                    item = step.result()
+                except StopAsyncIteration:
+                    return
+            finally:
+                if not step.done():
+                    # Let the generator finish unwinding before closing it
+                    step.cancel()
+                    await asyncio.gather(step, return_exceptions=True)
+            yield item
+    finally:
+        await iterator.aclose()
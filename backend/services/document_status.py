@@ -0,0 +1,70 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+from backend.database import db
+from backend.services.metrics import metrics
+from shared.config import Config
+
+class DocumentStatusWriter:
+    """Buffers document ingestion status transitions and writes them in batches.
+    
+    Transitions for the same document collapse to the latest one. A flush
+    runs STATUS_FLUSH_INTERVAL seconds after the first buffered change, or
+    as soon as STATUS_FLUSH_BATCH documents are waiting, so importing
+    hundreds of files costs a handful of transactions instead of one per
+    transition.
+    """
+    
+    def __init__(self):
+        self._pending: Dict[str, str] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+    
+    def record(self, document_id: str, status: str):
+        """Buffer a status change for a document"""
+        self._pending[document_id] = status
+        if len(self._pending) >= Config.STATUS_FLUSH_BATCH:
+            self._spawn(self.flush())
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_later())
+    
+    def discard(self, document_ids: List[str]):
+        """Drop buffered changes for documents that are being deleted"""
+        for document_id in document_ids:
+            self._pending.pop(document_id, None)
+    
+    def _spawn(self, job) -> asyncio.Task:
+        task = asyncio.create_task(job)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(Config.STATUS_FLUSH_INTERVAL)
+        finally:
+            self._timer = None
+        await self.flush()
+    
+    async def flush(self) -> int:
+        """Write every buffered transition in one transaction, returning how many were written"""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                await db.update_document_statuses(batch)
+            except Exception as e:
+                print(f"Error writing document statuses: {str(e)}")
+                # Retry with the next flush unless a newer transition replaced them
+                for document_id, status in batch.items():
+                    self._pending.setdefault(document_id, status)
+                if self._timer is None:
+                    self._timer = self._spawn(self._flush_later())
+                return 0
+            metrics.increment("document_status.flushes")
+            metrics.increment("document_status.transitions", len(batch))
+            return len(batch)
+
+# Global document status writer instance
+document_status = DocumentStatusWriter()
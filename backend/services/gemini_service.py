@@ -1,28 +1,214 @@
+import asyncio
+import threading
+import time
 import google.generativeai as genai
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from backend.models import ChatHistory, ConversationContext
+from backend.services import deadlines
+from backend.services.coalescer import RequestCoalescer
+from backend.services.context_cache import CachedProjectContext, context_cache
+from backend.services.deadlines import DeadlineExceeded
+from backend.services.model_router import model_router
+from backend.services.prompt_builder import prompt_builder
 from shared.config import Config
 
 class GeminiService:
     def __init__(self):
-        if Config.GEMINI_API_KEY:
+        if Config.LLM_BACKEND == "fake":
+            # Route the SDK to the local stand-in server over REST
+            genai.configure(
+                api_key="fake-key",
+                transport="rest",
+                client_options={"api_endpoint": Config.FAKE_LLM_URL}
+            )
+            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+            self.embedding_model = genai.GenerativeModel('text-embedding-004')
+        elif Config.GEMINI_API_KEY:
             genai.configure(api_key=Config.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-2.5-pro')
+            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
             self.embedding_model = genai.GenerativeModel('text-embedding-004')
         else:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
+        self.model_name = Config.GEMINI_MODEL
+        self._models: Dict[str, genai.GenerativeModel] = {self.model_name: self.model}
+        
+        # Identical prompts in flight at the same time share one upstream call
+        self.coalescer = RequestCoalescer("llm")
+    
+    def _get_model(self, model_name: str) -> genai.GenerativeModel:
+        if model_name not in self._models:
+            self._models[model_name] = genai.GenerativeModel(model_name)
+        return self._models[model_name]
+    
+    async def _generate(self, full_prompt: str, model_name: str, cached: Optional[CachedProjectContext] = None) -> str:
+        """Raw response text for a prompt, deduplicated against identical in-flight calls"""
+        model = cached.model if cached else self._get_model(model_name)
+        
+        async def call() -> str:
+            # Generate on a worker thread so the event loop stays free; the
+            # remaining request time is passed upstream as the call timeout
+            response = await asyncio.to_thread(
+                model.generate_content, full_prompt, request_options=deadlines.request_options()
+            )
+            return response.text
+        
+        if not Config.LLM_COALESCE_REQUESTS:
+            return await deadlines.bounded("generation", call())
+        return await deadlines.bounded(
+            "generation",
+            self.coalescer.run(self.coalescer.key(cached.name if cached else model_name, full_prompt), call)
+        )
     
-    async def generate_response(self, prompt: str, context: List[str] = None) -> str:
-        """Generate a response using Gemini model with optional context"""
+    async def _prepare_prompt(
+        self,
+        prompt: str,
+        context: Optional[List[str]],
+        conversation: Optional[ConversationContext],
+        model_name: str,
+        project_id: Optional[str]
+    ) -> Tuple[str, Optional[CachedProjectContext]]:
+        """Full prompt for a turn, or only the delta when the project has a cached context"""
+        cached = context_cache.lookup(project_id, model_name) if project_id else None
+        if not cached:
+            return await prompt_builder.offload(self._build_prompt_with_context, prompt, context, conversation, model_name), None
+        
+        delta = [chunk for chunk in context or [] if not cached.contains(chunk)]
+        full_prompt, _ = await prompt_builder.offload(
+            prompt_builder.build_cached_chat_prompt, prompt, delta, model_name, cached.tokens, conversation
+        )
+        return full_prompt, cached
+    
+    async def generate_response(
+        self,
+        prompt: str,
+        context: List[str] = None,
+        conversation: Optional[ConversationContext] = None,
+        latency_budget_ms: Optional[int] = None,
+        project_id: Optional[str] = None
+    ) -> str:
+        """Generate a response using Gemini model with optional context and prior conversation.
+        
+        The model is picked per request by the router; a fast answer that
+        signals low confidence is regenerated with the strong model. When
+        ``project_id`` has a cached context, only the delta is sent.
+        """
+        start = time.perf_counter()
         try:
-            # Build the full prompt with context
-            full_prompt = self._build_prompt_with_context(prompt, context)
+            decision = model_router.choose("chat", prompt, await self._context_tokens(context), latency_budget_ms)
+            if project_id:
+                context_cache.record_request(project_id, decision.model, context)
+            answer = await self._generate_turn(prompt, context, conversation, decision.model, project_id)
             
-            # Generate response
-            response = self.model.generate_content(full_prompt)
-            return response.text
+            if model_router.should_escalate(decision, answer, (time.perf_counter() - start) * 1000):
+                model_router.escalate(decision)
+                answer = await self._generate_turn(prompt, context, conversation, decision.model, project_id)
+            
+            decision.latency_ms = (time.perf_counter() - start) * 1000
+            model_router.record(decision)
+            return answer
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
+    async def _generate_turn(
+        self,
+        prompt: str,
+        context: Optional[List[str]],
+        conversation: Optional[ConversationContext],
+        model_name: str,
+        project_id: Optional[str]
+    ) -> str:
+        # Build the prompt for the chosen model's budget, against the project's cache if it has one
+        full_prompt, cached = await self._prepare_prompt(prompt, context, conversation, model_name, project_id)
+        if not cached:
+            return await self._generate(full_prompt, model_name)
+        try:
+            return await self._generate(full_prompt, model_name, cached)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # The cache may have expired or been deleted server-side
+            print(f"Cached context {cached.name} failed, sending the full prompt: {str(e)}")
+            context_cache.discard(project_id, model_name)
+            full_prompt = await prompt_builder.offload(self._build_prompt_with_context, prompt, context, conversation, model_name)
+            return await self._generate(full_prompt, model_name)
+    
+    async def stream_response(
+        self,
+        prompt: str,
+        context: List[str] = None,
+        conversation: Optional[ConversationContext] = None,
+        latency_budget_ms: Optional[int] = None,
+        project_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response from Gemini, yielding text as it is generated.
+        
+        The model is routed like generate_response, but streamed answers
+        are never escalated since their tokens are already on the wire.
+        Concurrent requests with the same assembled prompt follow a single
+        upstream stream.
+        """
+        start = time.perf_counter()
+        decision = model_router.choose("stream", prompt, await self._context_tokens(context), latency_budget_ms)
+        if project_id:
+            context_cache.record_request(project_id, decision.model, context)
+        full_prompt, cached = await self._prepare_prompt(prompt, context, conversation, decision.model, project_id)
+        if not Config.LLM_COALESCE_REQUESTS:
+            source = self._stream_upstream(full_prompt, decision.model, cached)
+        else:
+            source = self.coalescer.stream(
+                self.coalescer.key(cached.name if cached else decision.model, full_prompt),
+                lambda: self._stream_upstream(full_prompt, decision.model, cached)
+            )
+        async for text in source:
+            yield text
+        
+        decision.latency_ms = (time.perf_counter() - start) * 1000
+        model_router.record(decision)
+    
+    async def _stream_upstream(
+        self,
+        full_prompt: str,
+        model_name: str,
+        cached: Optional[CachedProjectContext] = None
+    ) -> AsyncIterator[str]:
+        """Stream one upstream generation.
+        
+        The SDK's streaming iterator is blocking, so it is drained on a
+        worker thread and handed back to the event loop through a queue.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        stop = threading.Event()
+        model = cached.model if cached else self._get_model(model_name)
+        options = deadlines.request_options()
+        
+        def produce():
+            try:
+                for chunk in model.generate_content(full_prompt, stream=True, request_options=options):
+                    if stop.is_set():
+                        return
+                    if chunk.parts:
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+        
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await deadlines.bounded("generation", queue.get())
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop reading the upstream stream if the consumer went away
+            stop.set()
+    
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embeddings for the given text"""
         try:
@@ -36,69 +222,97 @@ class GeminiService:
             print(f"Error generating embedding: {str(e)}")
             return []
     
-    def generate_query_embedding(self, query: str) -> List[float]:
-        """Generate embeddings for search queries"""
-        try:
+    def _embed_query(self, query: str) -> List[float]:
+        result = genai.embed_content(
+            model="models/text-embedding-004",
+            content=query,
+            task_type="retrieval_query",
+            request_options=deadlines.request_options()
+        )
+        return result['embedding']
+    
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        embeddings = []
+        for start in range(0, len(queries), Config.EMBEDDING_BATCH_SIZE):
             result = genai.embed_content(
                 model="models/text-embedding-004",
-                content=query,
-                task_type="retrieval_query"
+                content=queries[start:start + Config.EMBEDDING_BATCH_SIZE],
+                task_type="retrieval_query",
+                request_options=deadlines.request_options()
             )
-            return result['embedding']
+            embeddings.extend(result['embedding'])
+        return embeddings
+    
+    def generate_query_embedding(self, query: str) -> List[float]:
+        """Generate embeddings for search queries"""
+        try:
+            return self._embed_query(query)
         except Exception as e:
             print(f"Error generating query embedding: {str(e)}")
             return []
     
-    def _build_prompt_with_context(self, prompt: str, context: List[str] = None) -> str:
-        """Build a prompt with document context"""
-        if not context:
-            return f"""
-You are StudyBuddy AI, an intelligent assistant that helps users understand and analyze their documents.
-
-User Question: {prompt}
-
-Please provide a helpful and accurate response based on the question asked.
-"""
-        
-        context_text = "\n\n".join([f"Document {i+1}:\n{doc}" for i, doc in enumerate(context)])
-        
-        return f"""
-You are StudyBuddy AI, an intelligent assistant that helps users understand and analyze their documents.
-
-Here are the relevant document excerpts for context:
-
-{context_text}
-
-User Question: {prompt}
-
-Please provide a helpful and accurate response based on the provided documents. If the answer cannot be found in the documents, please say so clearly.
-"""
+    def generate_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """Generate embeddings for several search queries in batched calls"""
+        try:
+            return self._embed_queries(queries)
+        except Exception as e:
+            print(f"Error generating query embeddings: {str(e)}")
+            return []
     
-    async def summarize_documents(self, document_contents: List[str], project_name: str = "this project") -> str:
-        """Generate a summary of multiple documents"""
+    async def embed_query(self, query: str) -> List[float]:
+        """Query embedding computed off the event loop (hedged when slow), so it can overlap other work"""
+        # The hedged call must raise, so a failed attempt falls back to the
+        # other one and is not recorded as a latency sample
         try:
-            # Combine documents with separators
-            combined_content = "\n\n---\n\n".join(document_contents)
-            
-            prompt = f"""
-Please provide a comprehensive summary of the documents in {project_name}. 
-
-Documents content:
-{combined_content}
-
-Create a summary that includes:
-1. Main topics covered
-2. Key insights and findings
-3. Important concepts or themes
-4. Any notable conclusions or recommendations
-
-Keep the summary informative but concise.
-"""
-            
-            response = self.model.generate_content(prompt)
-            return response.text
+            return await deadlines.hedged("embed_query", lambda: asyncio.to_thread(self._embed_query, query))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"Error generating query embedding: {str(e)}")
+            return []
+    
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Batched query embeddings computed off the event loop (hedged when slow)"""
+        try:
+            return await deadlines.hedged("embed_queries", lambda: asyncio.to_thread(self._embed_queries, queries))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            return f"Error generating summary: {str(e)}"
+            print(f"Error generating query embeddings: {str(e)}")
+            return []
+    
+    async def _context_tokens(self, context: Optional[List[str]]) -> int:
+        """Tokens of the retrieved chunks, counted per chunk so repeated chunks hit the count cache"""
+        if not context:
+            return 0
+        return await prompt_builder.offload(
+            lambda: sum(prompt_builder.count_tokens(chunk, self.model_name) for chunk in context)
+        )
+    
+    def _build_prompt_with_context(
+        self,
+        prompt: str,
+        context: List[str] = None,
+        conversation: Optional[ConversationContext] = None,
+        model_name: Optional[str] = None
+    ) -> str:
+        """Build a prompt with prior conversation and as much document context as fits the model's token budget"""
+        full_prompt, _ = prompt_builder.build_chat_prompt(prompt, context, model_name or self.model_name, conversation)
+        return full_prompt
+    
+    async def summarize_conversation(self, existing_summary: Optional[str], turns: List[ChatHistory]) -> str:
+        """Fold older chat turns into the running conversation summary"""
+        prompt = await prompt_builder.offload(prompt_builder.build_memory_prompt, existing_summary, turns, self.model_name)
+        return await self.generate_text(prompt, route="memory")
+    
+    async def generate_text(self, prompt: str, route: str = "summary") -> str:
+        """Generate text for an already-built prompt on the route's model, raising on failure"""
+        start = time.perf_counter()
+        decision = model_router.choose(route, context_tokens=prompt_builder.estimate_tokens(prompt))
+        text = (await self._generate(prompt, decision.model)).strip()
+        decision.latency_ms = (time.perf_counter() - start) * 1000
+        model_router.record(decision)
+        return text
 
 # Global service instance
 gemini_service = GeminiService()
\ No newline at end of file
@@ -0,0 +1,205 @@
+import asyncio
+import numpy as np
+from typing import List, Dict, Optional
+from backend.services import deadlines
+from shared.config import Config
+
+class _Namespace:
+    """Vectors of one namespace, with a lazily rebuilt normalized matrix"""
+    
+    def __init__(self):
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.vectors: List[np.ndarray] = []
+        self.metadata: List[Dict] = []
+        self._matrix: Optional[np.ndarray] = None
+    
+    def upsert(self, vector_id: str, values: List[float], metadata: Dict):
+        vector = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+        
+        if vector_id in self.positions:
+            position = self.positions[vector_id]
+            self.vectors[position] = vector
+            self.metadata[position] = metadata
+        else:
+            self.positions[vector_id] = len(self.ids)
+            self.ids.append(vector_id)
+            self.vectors.append(vector)
+            self.metadata.append(metadata)
+        self._matrix = None
+    
+    def delete(self, vector_ids: List[str]) -> int:
+        doomed = {vector_id for vector_id in vector_ids if vector_id in self.positions}
+        if not doomed:
+            return 0
+        keep = [i for i, vector_id in enumerate(self.ids) if vector_id not in doomed]
+        self.ids = [self.ids[i] for i in keep]
+        self.vectors = [self.vectors[i] for i in keep]
+        self.metadata = [self.metadata[i] for i in keep]
+        self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        self._matrix = None
+        return len(doomed)
+    
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors) if self.vectors else np.zeros((0, Config.VECTOR_DIMENSION), dtype=np.float32)
+        return self._matrix
+    
+    def top_k(self, scores: np.ndarray, top_k: int) -> List[Dict]:
+        """Best matches for one row of cosine scores"""
+        k = min(top_k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {
+                "id": self.ids[i],
+                "score": float(scores[i]),
+                "metadata": self.metadata[i],
+                "text": self.metadata[i].get("full_text", self.metadata[i].get("text", ""))
+            }
+            for i in best
+        ]
+
+class InMemoryVectorStore:
+    """In-process stand-in for PineconeService.
+    
+    Exposes the same async interface so the app can run and be benchmarked
+    without Pinecone (VECTOR_BACKEND=memory). Cosine scores are computed
+    with NumPy; batched searches score all queries with one matrix multiply.
+    Every call sleeps FAKE_VECTOR_LATENCY_MS to approximate a network hop.
+    """
+    
+    def __init__(self):
+        self._namespaces: Dict[str, _Namespace] = {}
+    
+    async def _latency(self):
+        if Config.FAKE_VECTOR_LATENCY_MS:
+            await deadlines.bounded("vector", asyncio.sleep(Config.FAKE_VECTOR_LATENCY_MS / 1000))
+    
+    async def upsert_document_chunks(
+        self,
+        project_id: str,
+        document_id: str,
+        filename: str,
+        chunks: List[str],
+        embeddings: List[List[float]],
+        existing_count: int = 0
+    ) -> bool:
+        """Store document chunks with their embeddings"""
+        await self._latency()
+        namespace = self._namespaces.setdefault(f"project_{project_id}", _Namespace())
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            namespace.upsert(f"{document_id}_{i}", embedding, {
+                "project_id": project_id,
+                "document_id": document_id,
+                "filename": filename,
+                "chunk_index": i,
+                "text": chunk[:1000],
+                "full_text": chunk
+            })
+        return True
+    
+    async def search_similar_chunks(
+        self,
+        query_embedding: List[float],
+        project_id: str = None,
+        top_k: int = 5
+    ) -> List[Dict]:
+        """Search for similar document chunks"""
+        return (await self.search_similar_chunks_batch([query_embedding], project_id, top_k))[0]
+    
+    async def search_similar_chunks_batch(
+        self,
+        query_embeddings: List[List[float]],
+        project_id: str = None,
+        top_k: int = 5
+    ) -> List[List[Dict]]:
+        """Score every query against the namespace in a single matrix multiply"""
+        await self._latency()
+        namespace = self._namespaces.get(f"project_{project_id}")
+        if not namespace or not namespace.ids or not query_embeddings:
+            return [[] for _ in query_embeddings]
+        
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        scores = queries @ namespace.matrix.T
+        return [namespace.top_k(row, top_k) for row in scores]
+    
+    async def search_across_projects(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10
+    ) -> List[Dict]:
+        """Search across all projects"""
+        await self._latency()
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+        
+        all_results = []
+        for namespace in self._namespaces.values():
+            if namespace.ids:
+                all_results.extend(namespace.top_k(namespace.matrix @ query, top_k))
+        all_results.sort(key=lambda x: x["score"], reverse=True)
+        return all_results[:top_k]
+    
+    async def fetch_document_chunks(self, project_id: str, document_id: str, vector_count: int) -> List[str]:
+        """Full text of a document's chunks in chunk order"""
+        await self._latency()
+        namespace = self._namespaces.get(f"project_{project_id}")
+        if not namespace:
+            return []
+        chunks = []
+        for i in range(vector_count):
+            position = namespace.positions.get(f"{document_id}_{i}")
+            if position is not None:
+                metadata = namespace.metadata[position]
+                chunks.append(metadata.get("full_text", metadata.get("text", "")))
+        return chunks
+    
+    async def delete_document(self, project_id: str, document_id: str, vector_count: int) -> bool:
+        """Delete all chunks for a specific document"""
+        vector_ids = [f"{document_id}_{i}" for i in range(vector_count)]
+        return await self.delete_vectors(f"project_{project_id}", vector_ids)
+    
+    async def delete_vectors(self, namespace: str, vector_ids: List[str]) -> bool:
+        """Delete vectors by ID"""
+        await self._latency()
+        if namespace in self._namespaces:
+            self._namespaces[namespace].delete(vector_ids)
+            if not self._namespaces[namespace].ids:
+                del self._namespaces[namespace]
+        return True
+    
+    async def delete_project_namespace(self, project_id: str) -> bool:
+        """Delete entire project namespace"""
+        await self._latency()
+        self._namespaces.pop(f"project_{project_id}", None)
+        return True
+    
+    async def list_namespaces(self) -> List[str]:
+        return list(self._namespaces.keys())
+    
+    async def list_vector_ids(self, namespace: str) -> List[str]:
+        return list(self._namespaces[namespace].ids) if namespace in self._namespaces else []
+    
+    async def refresh_namespace_counts(self) -> bool:
+        # Counts are always exact for the in-memory store
+        return True
+    
+    async def get_cached_namespaces(self) -> List[str]:
+        return list(self._namespaces.keys())
+    
+    async def get_project_stats(self, project_id: str) -> Dict:
+        """Get statistics for a project's vectors"""
+        namespace = f"project_{project_id}"
+        return {
+            "vector_count": len(self._namespaces[namespace].ids) if namespace in self._namespaces else 0,
+            "namespace": namespace
+        }
@@ -0,0 +1,55 @@
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional
+
+class Metrics:
+    """In-process counters and latency samples, exposed at /metrics.
+    
+    Prompts may be built on worker threads, so updates take a lock.
+    """
+    
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+    
+    def observe(self, name: str, value: float):
+        """Record one sample (e.g. a latency in milliseconds)"""
+        with self._lock:
+            self.samples[name].append(value)
+    
+    def percentile(self, name: str, percentile: float) -> Optional[float]:
+        """Percentile over the most recent samples, or None if there are none"""
+        with self._lock:
+            values = sorted(self.samples.get(name, ()))
+        if not values:
+            return None
+        index = min(len(values) - 1, max(0, math.ceil(percentile / 100 * len(values)) - 1))
+        return values[index]
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            samples = {name: list(values) for name, values in self.samples.items() if values}
+        return {
+            "counters": counters,
+            "samples": {
+                name: {
+                    "count": len(values),
+                    "avg": sum(values) / len(values),
+                    "p50": self.percentile(name, 50),
+                    "p95": self.percentile(name, 95),
+                    "p99": self.percentile(name, 99),
+                }
+                for name, values in samples.items()
+            }
+        }
+
+# Global metrics registry
+metrics = Metrics()
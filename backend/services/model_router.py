@@ -0,0 +1,126 @@
+import re
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional
+from backend.models import RoutingDecision
+from backend.services.metrics import metrics
+from backend.services.prompt_builder import prompt_builder
+from shared.config import Config
+
+# Questions that ask for reasoning rather than a lookup
+ANALYTICAL_QUERY = re.compile(
+    r"\b(why|explain|compare|contrast|analy[sz]e|evaluate|assess|critique|derive|prove|justify|"
+    r"implications?|trade-?offs?|step by step|in depth|pros and cons|difference between|how (does|do|would|could|should))\b",
+    re.IGNORECASE
+)
+
+# Phrases a fast answer uses when it is not confident
+LOW_CONFIDENCE_ANSWER = re.compile(
+    r"\b(i('m| am) not (sure|certain)|i don't know|i do not know|cannot be (found|determined)|"
+    r"not enough (information|context)|unable to (answer|determine)|unclear from the)\b",
+    re.IGNORECASE
+)
+
+class ModelRouter:
+    """Chooses between the fast and the strong Gemini model per request.
+    
+    Each route has a configured tier (MODEL_ROUTES). For ``auto`` routes
+    the query length, retrieved context size, a keyword classifier and
+    the caller's latency budget decide; fast answers that signal low
+    confidence can be escalated to the strong model. Decisions are logged,
+    counted in metrics and kept for /api/admin/routing.
+    """
+    
+    def __init__(self):
+        self.decisions: Deque[RoutingDecision] = deque(maxlen=Config.ROUTER_DECISION_LOG_SIZE)
+    
+    @property
+    def fast_model(self) -> str:
+        return Config.GEMINI_FAST_MODEL
+    
+    @property
+    def strong_model(self) -> str:
+        return Config.GEMINI_MODEL
+    
+    def choose(
+        self,
+        route: str,
+        query: str = "",
+        context_tokens: int = 0,
+        latency_budget_ms: Optional[int] = None
+    ) -> RoutingDecision:
+        tier, reason = self._classify(route, query, context_tokens, latency_budget_ms)
+        return RoutingDecision(
+            route=route,
+            tier=tier,
+            model=self.fast_model if tier == "fast" else self.strong_model,
+            reason=reason,
+            query_chars=len(query),
+            context_tokens=context_tokens,
+            latency_budget_ms=latency_budget_ms,
+            timestamp=datetime.now()
+        )
+    
+    def model_for(self, route: str) -> str:
+        """Model a route resolves to for a prompt that fits either model"""
+        return self.choose(route).model
+    
+    def _classify(self, route: str, query: str, context_tokens: int, latency_budget_ms: Optional[int]):
+        # Whatever the route says, the fast model must be able to take the prompt
+        if context_tokens > prompt_builder.budget_for(self.fast_model):
+            return "strong", "prompt exceeds fast model budget"
+        
+        configured = Config.MODEL_ROUTES.get(route, "strong")
+        if configured in ("fast", "strong"):
+            return configured, "route default"
+        
+        if latency_budget_ms is not None and latency_budget_ms < Config.ROUTER_STRONG_MIN_BUDGET_MS:
+            return "fast", "tight latency budget"
+        if len(query) > Config.ROUTER_FAST_MAX_QUERY_CHARS:
+            return "strong", "long query"
+        if context_tokens > Config.ROUTER_FAST_MAX_CONTEXT_TOKENS:
+            return "strong", "large retrieved context"
+        if ANALYTICAL_QUERY.search(query):
+            return "strong", "analytical question"
+        return "fast", "short factual query"
+    
+    def should_escalate(self, decision: RoutingDecision, answer: str, elapsed_ms: float) -> bool:
+        """Whether a fast answer should be regenerated with the strong model"""
+        if decision.tier != "fast" or decision.escalated or not Config.ROUTER_ESCALATE_LOW_CONFIDENCE:
+            return False
+        if answer.strip() and not LOW_CONFIDENCE_ANSWER.search(answer):
+            return False
+        
+        # Only escalate when the strong model can still finish within the caller's budget
+        if decision.latency_budget_ms is not None:
+            expected_ms = metrics.percentile("llm.strong.latency_ms", 50) or 0
+            if elapsed_ms + expected_ms > decision.latency_budget_ms:
+                return False
+        return True
+    
+    def escalate(self, decision: RoutingDecision) -> RoutingDecision:
+        decision.tier = "strong"
+        decision.model = self.strong_model
+        decision.escalated = True
+        return decision
+    
+    def record(self, decision: RoutingDecision):
+        """Log a finished routing decision and count it in metrics"""
+        self.decisions.append(decision)
+        metrics.increment(f"llm.route.{decision.route}.{decision.tier}")
+        if decision.escalated:
+            metrics.increment(f"llm.route.{decision.route}.escalated")
+        if decision.latency_ms is not None:
+            # Escalated requests paid for both models, so they are tracked apart
+            tier = "escalated" if decision.escalated else decision.tier
+            metrics.observe(f"llm.{tier}.latency_ms", decision.latency_ms)
+        print(
+            f"Model routing: route={decision.route} model={decision.model} reason=\"{decision.reason}\" "
+            f"escalated={decision.escalated} latency_ms={decision.latency_ms}"
+        )
+    
+    def recent(self, limit: int = 100) -> List[RoutingDecision]:
+        return list(self.decisions)[-limit:]
+
+# Global router instance
+model_router = ModelRouter()
@@ -1,5 +1,11 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Tuple, Optional
+from pinecone.exceptions import NotFoundException
+from typing import List, Dict, Set, Tuple, Optional
+from backend.services import deadlines
+from backend.services.deadlines import DeadlineExceeded
 from shared.config import Config
 
 class PineconeService:
@@ -10,10 +16,29 @@ class PineconeService:
         # Initialize Pinecone (new API - no environment needed)
         self.pc = Pinecone(api_key=Config.PINECONE_API_KEY)
         
-        # Create or connect to index
+        # Create or connect to index with a keep-alive connection pool large
+        # enough for every worker thread to hold its own connection
         self.index_name = "studybuddy-documents"
         self._ensure_index_exists()
-        self.index = self.pc.Index(self.index_name)
+        self.index = self.pc.Index(
+            self.index_name,
+            pool_threads=Config.PINECONE_POOL_SIZE,
+            connection_pool_maxsize=Config.PINECONE_POOL_SIZE
+        )
+        
+        # The SDK is blocking, so calls run on this pool to keep the event loop free
+        self._executor = ThreadPoolExecutor(
+            max_workers=Config.PINECONE_POOL_SIZE,
+            thread_name_prefix="pinecone"
+        )
+        
+        # Local vector counts per namespace, kept current on upsert and
+        # periodically refreshed from describe_index_stats(). Deleting by ID
+        # does not say how many vectors existed, so deletes mark the
+        # namespace dirty and its count is reloaded before it is next read.
+        self._namespace_counts: Dict[str, int] = {}
+        self._dirty_namespaces: Set[str] = set()
+        self._counts_loaded = False
     
     def _ensure_index_exists(self):
         """Create index if it doesn't exist"""
@@ -29,15 +54,30 @@ class PineconeService:
                 )
             )
     
-    def upsert_document_chunks(
+    async def _call(self, func, *args, **kwargs):
+        """Run a blocking SDK call on the worker pool within the call timeout and request deadline"""
+        loop = asyncio.get_running_loop()
+        return await deadlines.bounded(
+            "vector",
+            loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs)),
+            timeout=Config.VECTOR_CALL_TIMEOUT
+        )
+    
+    async def upsert_document_chunks(
         self, 
         project_id: str, 
         document_id: str, 
         filename: str,
         chunks: List[str], 
-        embeddings: List[List[float]]
+        embeddings: List[List[float]],
+        existing_count: int = 0
     ) -> bool:
-        """Store document chunks with their embeddings"""
+        """Store document chunks with their embeddings.
+        
+        ``existing_count`` is the number of the document's chunk vectors
+        already stored; those IDs are overwritten, not added, so they are
+        left out of the cached namespace count.
+        """
         try:
             vectors = []
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
@@ -52,15 +92,23 @@ class PineconeService:
                 }
                 vectors.append((vector_id, embedding, metadata))
             
-            # Upsert vectors to Pinecone with project namespace
+            # Upsert vectors to Pinecone with project namespace, batches in parallel
             namespace = f"project_{project_id}"
-            self.index.upsert(vectors=vectors, namespace=namespace)
+            await asyncio.gather(*[
+                self._call(
+                    self.index.upsert,
+                    vectors=vectors[start:start + Config.VECTOR_UPSERT_BATCH_SIZE],
+                    namespace=namespace
+                )
+                for start in range(0, len(vectors), Config.VECTOR_UPSERT_BATCH_SIZE)
+            ])
+            self._adjust_namespace_count(namespace, max(len(vectors) - existing_count, 0))
             return True
         except Exception as e:
             print(f"Error upserting document chunks: {str(e)}")
             return False
     
-    def search_similar_chunks(
+    async def search_similar_chunks(
         self, 
         query_embedding: List[float], 
         project_id: str = None,
@@ -71,121 +119,222 @@ class PineconeService:
             # If project_id is specified, search within that project's namespace
             namespace = f"project_{project_id}" if project_id else None
             
-            results = self.index.query(
+            # Queries are idempotent, so a slow one is hedged with a backup request
+            results = await deadlines.hedged("vector_query", lambda: self._call(
+                self.index.query,
                 vector=query_embedding,
                 top_k=top_k,
                 include_metadata=True,
                 namespace=namespace
-            )
+            ))
             
-            # Format results
-            formatted_results = []
-            for match in results.matches:
-                formatted_results.append({
-                    "id": match.id,
-                    "score": match.score,
-                    "metadata": match.metadata,
-                    "text": match.metadata.get("full_text", match.metadata.get("text", ""))
-                })
-            
-            return formatted_results
+            return self._format_matches(results.matches)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error searching similar chunks: {str(e)}")
             return []
     
-    def search_across_projects(
+    async def search_similar_chunks_batch(
+        self, 
+        query_embeddings: List[List[float]], 
+        project_id: str = None,
+        top_k: int = 5
+    ) -> List[List[Dict]]:
+        """Search for similar chunks for several query embeddings at once.
+        
+        Pinecone has no multi-vector query, so the per-query requests are
+        issued concurrently and the results are returned in input order.
+        """
+        return list(await asyncio.gather(*[
+            self.search_similar_chunks(
+                query_embedding=embedding,
+                project_id=project_id,
+                top_k=top_k
+            )
+            for embedding in query_embeddings
+        ]))
+    
+    async def search_across_projects(
         self, 
         query_embedding: List[float], 
         top_k: int = 10
     ) -> List[Dict]:
         """Search across all projects"""
         try:
-            # Get all namespaces (projects)
-            stats = self.index.describe_index_stats()
-            namespaces = list(stats.namespaces.keys()) if stats.namespaces else [None]
+            # Get all namespaces (projects) from the local cache
+            namespaces = [
+                namespace for namespace in await self.get_cached_namespaces()
+                if namespace.startswith("project_")
+            ]
             
-            all_results = []
+            # Search in each namespace concurrently
+            responses = await asyncio.gather(*[
+                self._call(
+                    self.index.query,
+                    vector=query_embedding,
+                    top_k=top_k,
+                    include_metadata=True,
+                    namespace=namespace
+                )
+                for namespace in namespaces
+            ])
             
-            # Search in each namespace
-            for namespace in namespaces:
-                if namespace and namespace.startswith("project_"):
-                    results = self.index.query(
-                        vector=query_embedding,
-                        top_k=top_k,
-                        include_metadata=True,
-                        namespace=namespace
-                    )
-                    
-                    for match in results.matches:
-                        all_results.append({
-                            "id": match.id,
-                            "score": match.score,
-                            "metadata": match.metadata,
-                            "text": match.metadata.get("full_text", match.metadata.get("text", ""))
-                        })
+            all_results = []
+            for results in responses:
+                all_results.extend(self._format_matches(results.matches))
             
             # Sort by score and return top results
             all_results.sort(key=lambda x: x["score"], reverse=True)
             return all_results[:top_k]
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error searching across projects: {str(e)}")
             return []
     
-    def delete_document(self, project_id: str, document_id: str) -> bool:
-        """Delete all chunks for a specific document"""
+    def _format_matches(self, matches) -> List[Dict]:
+        """Convert Pinecone query matches into plain result dictionaries"""
+        return [
+            {
+                "id": match.id,
+                "score": match.score,
+                "metadata": match.metadata,
+                "text": match.metadata.get("full_text", match.metadata.get("text", ""))
+            }
+            for match in matches
+        ]
+    
+    async def fetch_document_chunks(self, project_id: str, document_id: str, vector_count: int) -> List[str]:
+        """Full text of a document's chunks in chunk order, fetched by registered vector ID"""
         try:
             namespace = f"project_{project_id}"
+            vector_ids = [f"{document_id}_{i}" for i in range(vector_count)]
+            responses = await asyncio.gather(*[
+                self._call(
+                    self.index.fetch,
+                    ids=vector_ids[start:start + Config.VECTOR_FETCH_BATCH_SIZE],
+                    namespace=namespace
+                )
+                for start in range(0, len(vector_ids), Config.VECTOR_FETCH_BATCH_SIZE)
+            ])
             
-            # Get all vector IDs for this document
-            # We need to query to find all chunks for this document
-            # This is a limitation of Pinecone - we can't easily get all IDs
-            # So we'll use a metadata filter instead
-            
-            # For now, we'll implement a simple approach
-            # In production, you might want to keep track of vector IDs separately
-            print(f"Deleting document {document_id} from project {project_id}")
-            
-            # Pinecone doesn't support deletion by metadata filter directly
-            # You would need to query first to get IDs, then delete
-            # This is a simplified implementation
+            vectors = {}
+            for response in responses:
+                vectors.update(response.vectors)
+            return [
+                vectors[vector_id].metadata.get("full_text", vectors[vector_id].metadata.get("text", ""))
+                for vector_id in vector_ids
+                if vector_id in vectors
+            ]
+        except Exception as e:
+            print(f"Error fetching chunks for document {document_id}: {str(e)}")
+            return []
+    
+    async def delete_document(self, project_id: str, document_id: str, vector_count: int) -> bool:
+        """Delete all chunks for a specific document.
+        
+        Chunk vector IDs are ``{document_id}_{i}``, so the registered
+        vector count is enough to rebuild every ID without a query.
+        """
+        vector_ids = [f"{document_id}_{i}" for i in range(vector_count)]
+        return await self.delete_vectors(f"project_{project_id}", vector_ids)
+    
+    async def delete_vectors(self, namespace: str, vector_ids: List[str]) -> bool:
+        """Delete vectors by ID in batches"""
+        try:
+            for start in range(0, len(vector_ids), Config.VECTOR_DELETE_BATCH_SIZE):
+                batch = vector_ids[start:start + Config.VECTOR_DELETE_BATCH_SIZE]
+                await self._call(self.index.delete, ids=batch, namespace=namespace)
+                self._dirty_namespaces.add(namespace)
             return True
         except Exception as e:
-            print(f"Error deleting document: {str(e)}")
+            print(f"Error deleting vectors from {namespace}: {str(e)}")
             return False
     
-    def delete_project_namespace(self, project_id: str) -> bool:
+    async def delete_project_namespace(self, project_id: str) -> bool:
         """Delete entire project namespace"""
+        namespace = f"project_{project_id}"
         try:
-            namespace = f"project_{project_id}"
-            # Note: Pinecone doesn't have a direct way to delete namespace
-            # You would need to delete all vectors in the namespace
-            # This is a placeholder implementation
-            print(f"Deleting project namespace: {namespace}")
-            return True
+            await self._call(self.index.delete, delete_all=True, namespace=namespace)
+        except NotFoundException:
+            # Namespace was never created or is already gone
+            pass
         except Exception as e:
             print(f"Error deleting project namespace: {str(e)}")
             return False
+        
+        self._namespace_counts.pop(namespace, None)
+        self._dirty_namespaces.discard(namespace)
+        return True
+    
+    async def list_namespaces(self) -> List[str]:
+        """List all namespaces currently present in the index"""
+        stats = await self._call(self.index.describe_index_stats)
+        return list(stats.namespaces.keys()) if stats.namespaces else []
+    
+    async def list_vector_ids(self, namespace: str) -> List[str]:
+        """List every vector ID stored in a namespace"""
+        def collect():
+            vector_ids = []
+            for page in self.index.list(namespace=namespace):
+                vector_ids.extend(page)
+            return vector_ids
+        
+        return await self._call(collect)
     
-    def get_project_stats(self, project_id: str) -> Dict:
-        """Get statistics for a project's vectors"""
+    async def refresh_namespace_counts(self) -> bool:
+        """Reload per-namespace vector counts from the index"""
         try:
-            namespace = f"project_{project_id}"
-            stats = self.index.describe_index_stats()
-            
-            if stats.namespaces and namespace in stats.namespaces:
-                return {
-                    "vector_count": stats.namespaces[namespace].vector_count,
-                    "namespace": namespace
-                }
-            else:
-                return {"vector_count": 0, "namespace": namespace}
+            stats = await self._call(self.index.describe_index_stats)
+            self._dirty_namespaces.clear()
+            self._namespace_counts = {
+                namespace: summary.vector_count
+                for namespace, summary in (stats.namespaces or {}).items()
+            }
+            self._counts_loaded = True
+            return True
         except Exception as e:
-            print(f"Error getting project stats: {str(e)}")
-            return {"vector_count": 0, "namespace": f"project_{project_id}"}
+            print(f"Error refreshing namespace counts: {str(e)}")
+            return False
+    
+    async def _refresh_dirty_counts(self):
+        """Reload the counts if a delete has left any namespace's count unknown"""
+        if self._dirty_namespaces:
+            await self.refresh_namespace_counts()
+    
+    def _adjust_namespace_count(self, namespace: str, delta: int):
+        """Apply a local upsert to the cached namespace counts"""
+        count = max(self._namespace_counts.get(namespace, 0) + delta, 0)
+        if count:
+            self._namespace_counts[namespace] = count
+        else:
+            self._namespace_counts.pop(namespace, None)
+    
+    async def get_cached_namespaces(self) -> List[str]:
+        """Namespaces known to hold vectors, loading the counts on first use"""
+        if not self._counts_loaded:
+            await self.refresh_namespace_counts()
+        else:
+            await self._refresh_dirty_counts()
+        return list(self._namespace_counts.keys())
+    
+    async def get_project_stats(self, project_id: str) -> Dict:
+        """Get statistics for a project's vectors from the local cache"""
+        await self._refresh_dirty_counts()
+        namespace = f"project_{project_id}"
+        return {
+            "vector_count": self._namespace_counts.get(namespace, 0),
+            "namespace": namespace
+        }
 
 # Global service instance
-try:
-    pinecone_service = PineconeService()
-except Exception as e:
-    print(f"Warning: Could not initialize Pinecone service: {e}")
-    pinecone_service = None
\ No newline at end of file
+if Config.VECTOR_BACKEND == "memory":
+    from backend.services.memory_vector_store import InMemoryVectorStore
+    pinecone_service = InMemoryVectorStore()
+else:
+    try:
+        pinecone_service = PineconeService()
+    except Exception as e:
+        print(f"Warning: Could not initialize Pinecone service: {e}")
+        pinecone_service = None
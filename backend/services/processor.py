@@ -1,5 +1,6 @@
 import os
 import io
+from datetime import datetime
 from typing import List, Tuple
 from pathlib import Path
 import PyPDF2
@@ -7,7 +8,11 @@ from docx import Document as DocxDocument
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from backend.services.gemini_service import gemini_service
 from backend.services.pinecone_service import pinecone_service
-from backend.models import Document
+from backend.services.prompt_builder import prompt_builder
+from backend.services.scheduler import scheduler
+from backend.services.summarizer import project_summarizer
+from backend.database import db
+from backend.models import Document, DocumentInsights
 from shared.config import Config
 
 class DocumentProcessor:
@@ -54,12 +59,20 @@ class DocumentProcessor:
             
             # Store in Pinecone
             if pinecone_service:
-                success = pinecone_service.upsert_document_chunks(
+                # Re-processing overwrites the chunk IDs already registered
+                registry = await db.get_document_vectors(document.id)
+                
+                # Register the vector IDs before upserting so a failed or
+                # interrupted upsert can still be cleaned up later
+                await db.record_document_vectors(project_id, document.id, len(chunks))
+                
+                success = await pinecone_service.upsert_document_chunks(
                     project_id=project_id,
                     document_id=document.id,
                     filename=filename,
                     chunks=chunks,
-                    embeddings=embeddings
+                    embeddings=embeddings,
+                    existing_count=registry.vector_count if registry else 0
                 )
                 
                 if not success:
@@ -67,12 +80,65 @@ class DocumentProcessor:
                     return False
             
             print(f"Successfully processed {filename} with {len(chunks)} chunks")
+            
+            # Summary, outline and key terms are generated later at low priority
+            if Config.DOCUMENT_INSIGHTS_ENABLED:
+                scheduler.enqueue(f"insights-{document.id}", lambda: self.generate_insights(document))
             return True
             
         except Exception as e:
             print(f"Error processing document {filename}: {str(e)}")
             return False
     
+    async def generate_insights(self, document: Document) -> bool:
+        """Post-ingestion stage: store a summary, outline and key terms for a document.
+        
+        The summary comes from the map-reduce summarizer, so its partial
+        summaries are cached for later project summaries as well.
+        """
+        try:
+            # The document may have been deleted while the job was queued
+            if not await db.get_document(document.id):
+                return False
+            
+            summary = await project_summarizer.summarize_document(document, {"computed": 0, "cached": 0})
+            if not summary:
+                print(f"No content available for insights on {document.filename}")
+                return False
+            
+            prompt = await prompt_builder.offload(prompt_builder.build_insights_prompt, summary, document.filename, gemini_service.model_name)
+            outline, key_terms = self._parse_insights(await gemini_service.generate_text(prompt, route="insights"))
+            
+            await db.save_document_insights(DocumentInsights(
+                document_id=document.id,
+                project_id=document.project_id,
+                summary=summary,
+                outline=outline,
+                key_terms=key_terms[:Config.INSIGHTS_KEY_TERMS],
+                created_at=datetime.now()
+            ))
+            return True
+        except Exception as e:
+            print(f"Error generating insights for {document.filename}: {str(e)}")
+            return False
+    
+    def _parse_insights(self, text: str) -> Tuple[List[str], List[str]]:
+        """Split an OUTLINE / KEY TERMS reply into its two lists"""
+        outline, key_terms = [], []
+        section = None
+        for line in text.splitlines():
+            line = line.strip()
+            header = line.upper().rstrip(":")
+            if header == "OUTLINE":
+                section = outline
+            elif header == "KEY TERMS":
+                section = key_terms
+            elif line and section is outline:
+                outline.append(line.lstrip("-*• ").strip())
+            elif line and section is key_terms:
+                key_terms.extend(term.strip() for term in line.lstrip("-*• ").split(",") if term.strip())
+        return outline, key_terms
+    
     def _extract_text(self, file_content: bytes, filename: str) -> str:
         """Extract text from different file types"""
         file_extension = Path(filename).suffix.lower()
@@ -151,20 +217,6 @@ class DocumentProcessor:
             return False, f"File size exceeds {max_size_mb}MB limit"
         
         return True, "File is valid"
-    
-    async def get_document_summary(self, chunks: List[str], filename: str) -> str:
-        """Generate a summary of the document"""
-        try:
-            # Combine first few chunks for summary (to avoid token limits)
-            content = "\n\n".join(chunks[:5])  # Use first 5 chunks
-            
-            summary = await gemini_service.generate_response(
-                f"Please provide a brief summary of this document '{filename}':\n\n{content}"
-            )
-            
-            return summary
-        except Exception as e:
-            return f"Could not generate summary: {str(e)}"
 
 # Global processor instance
 document_processor = DocumentProcessor()
\ No newline at end of file
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from backend.database import db
+from backend.models import Project
+from backend.services.metrics import metrics
+from shared.config import Config
+
+class ProjectCache:
+    """Small in-process cache of project rows for the per-request existence checks.
+    
+    Entries live for PROJECT_CACHE_TTL seconds (bounding staleness across
+    processes) and the least recently used are evicted past
+    PROJECT_CACHE_SIZE. Concurrent misses for one project share a single
+    database read. Project writes go through ``put`` and ``invalidate``.
+    """
+    
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[float, Project]]" = OrderedDict()
+        self._loads: Dict[str, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+    
+    async def get(self, project_id: str) -> Optional[Project]:
+        """The project, or None if it does not exist"""
+        entry = self._entries.get(project_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(project_id)
+            metrics.increment("project_cache.hit")
+            return entry[1]
+        
+        load = self._loads.get(project_id)
+        if load is not None:
+            metrics.increment("project_cache.coalesced")
+        else:
+            metrics.increment("project_cache.miss")
+            load = asyncio.ensure_future(self._load(project_id))
+            self._loads[project_id] = load
+            load.add_done_callback(lambda done: self._forget_load(project_id, done))
+        # One caller going away must not cancel the read for the others
+        return await asyncio.shield(load)
+    
+    async def _load(self, project_id: str) -> Optional[Project]:
+        generation = self._generations.get(project_id, 0)
+        project = await db.get_project(project_id)
+        # Drop the result if the project was written while it was being read
+        if project and generation == self._generations.get(project_id, 0):
+            self.put(project)
+        return project
+    
+    def _forget_load(self, project_id: str, load: asyncio.Future):
+        if self._loads.get(project_id) is load:
+            del self._loads[project_id]
+    
+    def put(self, project: Project):
+        """Store a project just written to the database"""
+        self._entries[project.id] = (time.monotonic() + Config.PROJECT_CACHE_TTL, project)
+        self._entries.move_to_end(project.id)
+        while len(self._entries) > Config.PROJECT_CACHE_SIZE:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, project_id: str):
+        """Forget a project that was updated or deleted, including any read in flight"""
+        self._entries.pop(project_id, None)
+        self._loads.pop(project_id, None)
+        self._generations[project_id] = self._generations.get(project_id, 0) + 1
+
+# Global project cache instance
+project_cache = ProjectCache()
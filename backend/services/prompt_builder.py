@@ -0,0 +1,323 @@
+import asyncio
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple, TypeVar
+import google.generativeai as genai
+from backend.models import ConversationContext, PromptStats
+from backend.services.metrics import metrics
+from shared.config import Config
+
+SYSTEM_PREAMBLE = "You are StudyBuddy AI, an intelligent assistant that helps users understand and analyze their documents."
+
+# Sentence ends (or paragraph breaks) that are safe places to cut a chunk
+SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+T = TypeVar("T")
+
+class PromptBuilder:
+    """Assembles prompts that fit a per-model token budget.
+    
+    Context sections are added in rank order; the first one that does not
+    fit is cut at a sentence boundary and lower-ranked ones are dropped.
+    Token counts are estimated locally by default, or fetched from the
+    countTokens API (cached per text) when PROMPT_TOKEN_COUNTER=api. Each
+    section is counted once; text derived from it (truncations, the
+    assembled prompt) is estimated from those counts, and async callers
+    build prompts through ``offload`` so API counts never block the loop.
+    """
+    
+    async def offload(self, build: Callable[..., T], *args) -> T:
+        """Run a prompt-building step, on a worker thread when token counts come from the API"""
+        if Config.PROMPT_TOKEN_COUNTER == "api":
+            return await asyncio.to_thread(build, *args)
+        return build(*args)
+    
+    def budget_for(self, model_name: str) -> int:
+        return Config.MODEL_PROMPT_TOKEN_BUDGETS.get(model_name, Config.DEFAULT_PROMPT_TOKEN_BUDGET)
+    
+    def count_tokens(self, text: str, model_name: str) -> int:
+        if Config.PROMPT_TOKEN_COUNTER == "api":
+            try:
+                return _count_tokens_remote(model_name, text)
+            except Exception as e:
+                print(f"Error counting tokens remotely, using estimate: {str(e)}")
+        return _estimate_tokens(text)
+    
+    def estimate_tokens(self, text: str) -> int:
+        """Local token estimate, for text that is not worth an API call"""
+        return _estimate_tokens(text)
+    
+    def truncate_to_tokens(self, text: str, max_tokens: int, model_name: str, tokens: Optional[int] = None) -> str:
+        """Cut text to roughly max_tokens, ending on a sentence boundary; ``tokens`` is the text's count if already known"""
+        if tokens is None:
+            tokens = self.count_tokens(text, model_name)
+        if tokens <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        
+        char_limit = int(len(text) * max_tokens / tokens)
+        cut = None
+        for match in SENTENCE_END.finditer(text, 0, char_limit):
+            cut = match.end()
+        # Fall back to a word boundary when no sentence ends early enough
+        if cut is None:
+            cut = text.rfind(" ", 0, char_limit)
+        return text[:cut if cut and cut > 0 else char_limit].rstrip()
+    
+    def fit_sections(
+        self,
+        sections: List[str],
+        budget: int,
+        model_name: str,
+        fair_share: bool = False,
+        section_overhead: int = 0
+    ) -> Tuple[List[str], int, int]:
+        """Fit sections into a token budget.
+        
+        By default sections are taken in rank order until the budget runs
+        out. With ``fair_share`` every section gets an equal slice (unused
+        slices are passed on), so each one is represented in the prompt.
+        ``section_overhead`` reserves tokens for the label or separator
+        placed around each section. Returns the kept sections, the number truncated and the tokens used.
+        """
+        kept, truncated, used = [], 0, 0
+        for i, section in enumerate(sections):
+            remaining = budget - used
+            allowance = (remaining // (len(sections) - i) if fair_share else remaining) - section_overhead
+            if allowance < Config.MIN_CONTEXT_SECTION_TOKENS:
+                if fair_share:
+                    continue
+                break
+            
+            tokens = self.count_tokens(section, model_name)
+            if tokens > allowance:
+                original_chars = len(section)
+                section = self.truncate_to_tokens(section, allowance, model_name, tokens)
+                if not section:
+                    continue
+                # Scale the section's count rather than counting the cut text again
+                tokens = min(allowance, -(-tokens * len(section) // original_chars))
+                truncated += 1
+            kept.append(section)
+            used += tokens + section_overhead
+        return kept, truncated, used
+    
+    def build_conversation_block(self, conversation: Optional[ConversationContext], model_name: str) -> Tuple[str, int]:
+        """Render the running summary plus the most recent turns, each capped in size"""
+        if not conversation or (not conversation.summary and not conversation.recent_turns):
+            return "", 0
+        
+        parts = []
+        if conversation.summary:
+            summary = self.truncate_to_tokens(conversation.summary, Config.MEMORY_SUMMARY_TOKENS, model_name)
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if conversation.recent_turns:
+            turns = "\n".join(
+                f"Student: {self.truncate_to_tokens(turn.message, Config.MEMORY_TURN_TOKENS, model_name)}\n"
+                f"StudyBuddy: {self.truncate_to_tokens(turn.response, Config.MEMORY_TURN_TOKENS, model_name)}"
+                for turn in conversation.recent_turns
+            )
+            parts.append(f"Recent conversation:\n{turns}")
+        return "\n\n".join(parts) + "\n\n", len(conversation.recent_turns)
+    
+    def build_chat_prompt(
+        self,
+        prompt: str,
+        context: Optional[List[str]],
+        model_name: str,
+        conversation: Optional[ConversationContext] = None
+    ) -> Tuple[str, PromptStats]:
+        """Build the question-answering prompt with prior conversation and as much ranked context as fits"""
+        memory_text, history_turns = self.build_conversation_block(conversation, model_name)
+        
+        if not context:
+            text = f"""
+{SYSTEM_PREAMBLE}
+
+{memory_text}User Question: {prompt}
+
+Please provide a helpful and accurate response based on the question asked.
+"""
+            return text, self._record("chat", model_name, text, 0, 0, 0, history_turns)
+        
+        def render(context_text: str) -> str:
+            return f"""
+{SYSTEM_PREAMBLE}
+
+{memory_text}Here are the relevant document excerpts for context:
+
+{context_text}
+
+User Question: {prompt}
+
+Please provide a helpful and accurate response based on the provided documents. If the answer cannot be found in the documents, please say so clearly.
+"""
+        budget = self.budget_for(model_name) - self.count_tokens(render(""), model_name)
+        kept, truncated, _ = self.fit_sections(context, budget, model_name, section_overhead=6)
+        text = render("\n\n".join([f"Document {i+1}:\n{doc}" for i, doc in enumerate(kept)]))
+        return text, self._record("chat", model_name, text, len(context), len(kept), truncated, history_turns)
+    
+    def build_cached_context(self, chunks: List[str], model_name: str) -> Tuple[str, List[str], int]:
+        """Contents of a project's cached context: the given chunks within half the model budget.
+        
+        Returns the text, the chunks that made it in and its token count.
+        """
+        header = "Here are the relevant document excerpts for context:\n\n"
+        kept, _, used = self.fit_sections(chunks, self.budget_for(model_name) // 2, model_name, section_overhead=6)
+        text = header + "\n\n".join([f"Document {i+1}:\n{doc}" for i, doc in enumerate(kept)])
+        return text, kept, used + _estimate_tokens(header)
+    
+    def build_cached_chat_prompt(
+        self,
+        prompt: str,
+        context: Optional[List[str]],
+        model_name: str,
+        cached_tokens: int,
+        conversation: Optional[ConversationContext] = None
+    ) -> Tuple[str, PromptStats]:
+        """Build the per-turn prompt sent on top of a cached project context.
+        
+        The preamble and the cached excerpts are already on the server, so
+        only the conversation, excerpts missing from the cache and the
+        question are sent.
+        """
+        memory_text, history_turns = self.build_conversation_block(conversation, model_name)
+        
+        def render(context_text: str) -> str:
+            extra = f"Additional document excerpts:\n\n{context_text}\n\n" if context_text else ""
+            return f"""
+{memory_text}{extra}User Question: {prompt}
+
+Please provide a helpful and accurate response based on the provided documents. If the answer cannot be found in the documents, please say so clearly.
+"""
+        context = context or []
+        budget = self.budget_for(model_name) - cached_tokens - self.count_tokens(render(""), model_name)
+        kept, truncated, _ = self.fit_sections(context, budget, model_name, section_overhead=6)
+        text = render("\n\n".join([f"Document {i+1}:\n{doc}" for i, doc in enumerate(kept)]))
+        return text, self._record("chat_cached", model_name, text, len(context), len(kept), truncated, history_turns)
+    
+    def build_memory_prompt(self, existing_summary: Optional[str], turns: List, model_name: str) -> str:
+        """Prompt that folds aged-out turns into the running conversation summary"""
+        transcript = "\n".join(
+            f"Student: {self.truncate_to_tokens(turn.message, Config.MEMORY_TURN_TOKENS, model_name)}\n"
+            f"StudyBuddy: {self.truncate_to_tokens(turn.response, Config.MEMORY_TURN_TOKENS, model_name)}"
+            for turn in turns
+        )
+        return f"""
+You maintain a running summary of a study conversation between a student and StudyBuddy AI.
+
+Current summary:
+{existing_summary or "(none yet)"}
+
+New conversation turns:
+{transcript}
+
+Rewrite the summary so it also covers the new turns. Keep the topics discussed, facts established, open questions and the student's goals. Use at most {Config.MEMORY_SUMMARY_TOKENS * 3 // 4} words and reply with the summary only.
+"""
+    
+    def build_chunk_group_prompt(self, chunks: List[str], filename: str, model_name: str) -> Tuple[str, PromptStats]:
+        """Build the map-step prompt summarizing one group of consecutive chunks"""
+        def render(content: str) -> str:
+            return f"""
+Summarize the following excerpt from the document "{filename}".
+
+{content}
+
+Cover the main points, key facts, definitions and conclusions. Be concise and do not add information that is not in the excerpt.
+"""
+        budget = self.budget_for(model_name) - self.count_tokens(render(""), model_name)
+        kept, truncated, _ = self.fit_sections(chunks, budget, model_name, section_overhead=1)
+        text = render("\n\n".join(kept))
+        return text, self._record("summary_map", model_name, text, len(chunks), len(kept), truncated)
+    
+    def build_document_summary_prompt(self, partial_summaries: List[str], filename: str, model_name: str) -> Tuple[str, PromptStats]:
+        """Build the reduce-step prompt combining a document's partial summaries"""
+        def render(content: str) -> str:
+            return f"""
+The following are summaries of consecutive parts of the document "{filename}".
+
+{content}
+
+Combine them into a single summary of the whole document: its main topics, key insights and any conclusions. Keep it informative but concise.
+"""
+        budget = self.budget_for(model_name) - self.count_tokens(render(""), model_name)
+        kept, truncated, _ = self.fit_sections(partial_summaries, budget, model_name, fair_share=True, section_overhead=6)
+        text = render("\n\n".join([f"Part {i+1}:\n{summary}" for i, summary in enumerate(kept)]))
+        return text, self._record("summary_document", model_name, text, len(partial_summaries), len(kept), truncated)
+    
+    def build_insights_prompt(self, document_summary: str, filename: str, model_name: str) -> str:
+        """Prompt asking for an outline and key terms of a summarized document"""
+        summary = self.truncate_to_tokens(document_summary, self.budget_for(model_name) // 2, model_name)
+        return f"""
+Here is a summary of the document "{filename}":
+
+{summary}
+
+Reply in exactly this format:
+OUTLINE:
+- <main section or topic>
+- <main section or topic>
+KEY TERMS:
+<term>, <term>, <term>
+
+List the outline in the order the document covers it and give at most {Config.INSIGHTS_KEY_TERMS} key terms.
+"""
+    
+    def build_summary_prompt(self, document_contents: List[str], project_name: str, model_name: str) -> Tuple[str, PromptStats]:
+        """Build the multi-document summary prompt, giving each document a fair share"""
+        def render(combined_content: str) -> str:
+            return f"""
+Please provide a comprehensive summary of the documents in {project_name}.
+
+Documents content:
+{combined_content}
+
+Create a summary that includes:
+1. Main topics covered
+2. Key insights and findings
+3. Important concepts or themes
+4. Any notable conclusions or recommendations
+
+Keep the summary informative but concise.
+"""
+        budget = self.budget_for(model_name) - self.count_tokens(render(""), model_name)
+        kept, truncated, _ = self.fit_sections(document_contents, budget, model_name, fair_share=True, section_overhead=3)
+        text = render("\n\n---\n\n".join(kept))
+        return text, self._record("summary", model_name, text, len(document_contents), len(kept), truncated)
+    
+    def _record(
+        self,
+        kind: str,
+        model_name: str,
+        text: str,
+        offered: int,
+        used: int,
+        truncated: int,
+        history_turns: int = 0
+    ) -> PromptStats:
+        stats = PromptStats(
+            kind=kind,
+            model=model_name,
+            budget_tokens=self.budget_for(model_name),
+            prompt_tokens=_estimate_tokens(text),  # the final text is unique, so never worth an API call
+            sections_offered=offered,
+            sections_used=used,
+            sections_truncated=truncated,
+            history_turns=history_turns
+        )
+        metrics.observe(f"prompt.{kind}.tokens", stats.prompt_tokens)
+        metrics.increment(f"prompt.{kind}.sections_dropped", offered - used)
+        metrics.increment(f"prompt.{kind}.sections_truncated", truncated)
+        return stats
+
+def _estimate_tokens(text: str) -> int:
+    # Gemini tokenizers average roughly four characters per token for English
+    return (len(text) + 3) // 4
+
+@lru_cache(maxsize=4096)
+def _count_tokens_remote(model_name: str, text: str) -> int:
+    return genai.GenerativeModel(model_name).count_tokens(text).total_tokens
+
+# Global prompt builder instance
+prompt_builder = PromptBuilder()
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, Optional, Set
+from backend.database import db
+from backend.models import Document
+from backend.services.blob_store import blob_store
+from backend.services.context_cache import context_cache
+from backend.services.document_status import document_status
+from backend.services.metrics import metrics
+from backend.services.processor import document_processor
+from backend.services.vector_cleanup import vector_cleanup_service
+from shared.config import Config
+
+class DocumentReprocessor:
+    """Runs stored originals back through the ingestion pipeline.
+    
+    Used after changing the chunking, the embedding model or an extractor.
+    Documents are read from the database REPROCESS_BATCH at a time and
+    REPROCESS_CONCURRENCY of them are re-ingested at once, so a run over
+    every project never holds more than a few originals in memory.
+    Documents uploaded before originals were kept have no content hash
+    and are skipped.
+    """
+    
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self.last_run: Optional[Dict[str, int]] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+    
+    async def run(self, project_id: Optional[str] = None) -> Dict[str, int]:
+        """Re-process every document, or only a project's; returns counts per outcome"""
+        async with self._lock:
+            counts = {"reprocessed": 0, "failed": 0, "skipped": 0}
+            projects: Set[str] = set()
+            semaphore = asyncio.Semaphore(Config.REPROCESS_CONCURRENCY)
+            
+            async def reprocess(document: Document):
+                async with semaphore:
+                    outcome = await self._reprocess(document)
+                counts[outcome] += 1
+                metrics.increment(f"reprocess.{outcome}")
+            
+            after = None
+            while True:
+                documents = await db.get_documents_after(project_id, after, Config.REPROCESS_BATCH)
+                if not documents:
+                    break
+                after = documents[-1].id
+                await asyncio.gather(*(reprocess(document) for document in documents))
+                projects.update(document.project_id for document in documents)
+            
+            await document_status.flush()
+            for reprocessed_project in projects:
+                context_cache.invalidate(reprocessed_project)
+            self.last_run = counts
+            print(f"Re-processing finished: {counts}")
+            return counts
+    
+    async def _reprocess(self, document: Document) -> str:
+        if not document.content_hash:
+            return "skipped"
+        content = await blob_store.get(document.content_hash)
+        if content is None:
+            print(f"Original of {document.filename} ({document.content_hash}) is missing from the blob store")
+            return "skipped"
+        
+        registry = await db.get_document_vectors(document.id)
+        previous_count = registry.vector_count if registry else 0
+        
+        # The new chunks overwrite the old ones by ID, so the document stays
+        # searchable throughout and keeps its old vectors if ingestion fails
+        document_status.record(document.id, "processing")
+        success = await document_processor.process_document(
+            file_content=content,
+            filename=document.filename,
+            project_id=document.project_id,
+            document=document
+        )
+        if success:
+            success = await vector_cleanup_service.delete_stale_vectors(document.project_id, document.id, previous_count)
+        if not success:
+            # Keep every vector that may still exist registered, so deleting the document removes them all
+            registry = await db.get_document_vectors(document.id)
+            if previous_count > (registry.vector_count if registry else 0):
+                await db.record_document_vectors(document.project_id, document.id, previous_count)
+        # A failed run leaves the previous vectors in place, so the document is still usable
+        document_status.record(document.id, "ready" if success or previous_count else "failed")
+        return "reprocessed" if success else "failed"
+
+# Global reprocessor instance
+document_reprocessor = DocumentReprocessor()
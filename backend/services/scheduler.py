@@ -0,0 +1,66 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+from backend.services import deadlines
+from shared.config import Config
+
+class BackgroundScheduler:
+    """Runs periodic maintenance jobs and a low-priority job queue for the lifetime of the app"""
+    
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._queue: Optional[asyncio.Queue] = None
+    
+    def schedule(self, name: str, interval: float, job: Callable[[], Awaitable], initial_delay: float = 0):
+        """Run ``job`` every ``interval`` seconds until shutdown"""
+        self._tasks.append(asyncio.create_task(self._run(name, interval, job, initial_delay), name=name))
+    
+    async def _run(self, name: str, interval: float, job: Callable[[], Awaitable], initial_delay: float):
+        deadlines.clear()
+        await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in background job {name}: {str(e)}")
+            await asyncio.sleep(interval)
+    
+    def enqueue(self, name: str, job: Callable[[], Awaitable]):
+        """Run ``job`` once on the low-priority queue.
+        
+        Queued jobs run one after another on BACKGROUND_QUEUE_WORKERS
+        workers, pausing between jobs, so they never compete with request
+        handling for more than a small share of the LLM and database.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            for i in range(Config.BACKGROUND_QUEUE_WORKERS):
+                self._tasks.append(asyncio.create_task(self._drain(), name=f"background-queue-{i}"))
+        self._queue.put_nowait((name, job))
+    
+    async def _drain(self):
+        # Workers are started lazily, possibly from inside a request
+        deadlines.clear()
+        while True:
+            name, job = await self._queue.get()
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in queued job {name}: {str(e)}")
+            finally:
+                self._queue.task_done()
+            await asyncio.sleep(Config.BACKGROUND_QUEUE_PAUSE)
+    
+    async def shutdown(self):
+        """Cancel all scheduled jobs and wait for them to stop"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._queue = None
+
+# Global scheduler instance
+scheduler = BackgroundScheduler()
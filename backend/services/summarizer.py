@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+from typing import Dict, List, Optional
+from backend.database import db
+from backend.models import Document, Project
+from backend.services.gemini_service import gemini_service
+from backend.services.model_router import model_router
+from backend.services.pinecone_service import pinecone_service
+from backend.services.prompt_builder import prompt_builder
+from shared.config import Config
+
+class ProjectSummarizer:
+    """Map-reduce summarization of a project's document content.
+    
+    Chunks are summarized in groups (map), the group summaries are
+    combined per document, and the document summaries are reduced into the
+    project summary. Every level is cached in SQLite under a hash of its
+    input, so adding a document only computes that document's summaries
+    and the final reduce step.
+    """
+    
+    def __init__(self):
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    def _content_hash(self, level: str, *parts: str) -> str:
+        # Keyed by the model that generates summaries, so rerouting them invalidates the cache
+        digest = hashlib.sha256(f"{level}:{model_router.model_for('summary')}".encode("utf-8"))
+        for part in parts:
+            digest.update(b"\0")
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()
+    
+    async def _cached(self, level: str, content_hash: str, prompt_factory, stats: Dict[str, int]) -> str:
+        """Return the cached summary for a hash, generating and storing it on a miss"""
+        summary = await db.get_cached_summary(content_hash)
+        if summary is not None:
+            stats["cached"] += 1
+            return summary
+        
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(Config.SUMMARY_CONCURRENCY)
+        prompt, _ = await prompt_builder.offload(prompt_factory)
+        async with self._semaphore:
+            summary = await gemini_service.generate_text(prompt)
+        await db.save_cached_summary(content_hash, level, summary)
+        stats["computed"] += 1
+        return summary
+    
+    async def summarize_document(self, document: Document, stats: Dict[str, int]) -> Optional[str]:
+        """Summary of one document, or None if its content is not available"""
+        registry = await db.get_document_vectors(document.id)
+        if not registry or not pinecone_service:
+            return None
+        chunks = await pinecone_service.fetch_document_chunks(document.project_id, document.id, registry.vector_count)
+        if not chunks:
+            return None
+        
+        document_hash = self._content_hash("document", document.filename, *chunks)
+        cached = await db.get_cached_summary(document_hash)
+        if cached is not None:
+            stats["cached"] += 1
+            return cached
+        
+        # Map: summarize groups of consecutive chunks in parallel
+        groups = [
+            chunks[start:start + Config.SUMMARY_CHUNK_GROUP_SIZE]
+            for start in range(0, len(chunks), Config.SUMMARY_CHUNK_GROUP_SIZE)
+        ]
+        partials = await asyncio.gather(*[
+            self._cached(
+                "group",
+                self._content_hash("group", document.filename, *group),
+                lambda group=group: prompt_builder.build_chunk_group_prompt(group, document.filename, gemini_service.model_name),
+                stats
+            )
+            for group in groups
+        ])
+        
+        # Reduce: combine the partial summaries into the document summary
+        if len(partials) == 1:
+            await db.save_cached_summary(document_hash, "document", partials[0])
+            return partials[0]
+        return await self._cached(
+            "document",
+            document_hash,
+            lambda: prompt_builder.build_document_summary_prompt(list(partials), document.filename, gemini_service.model_name),
+            stats
+        )
+    
+    async def summarize_project(self, project: Project, documents: List[Document]) -> Dict:
+        """Summarize every document, then reduce them into the project summary"""
+        stats = {"computed": 0, "cached": 0}
+        document_summaries = await asyncio.gather(*[
+            self.summarize_document(document, stats) for document in documents
+        ])
+        
+        summarized = [
+            (document, summary)
+            for document, summary in zip(documents, document_summaries)
+            if summary
+        ]
+        if not summarized:
+            return {"summary": None, "documents": {}, "stats": stats}
+        
+        sections = [f"{document.filename}:\n{summary}" for document, summary in summarized]
+        project_summary = await self._cached(
+            "project",
+            self._content_hash("project", project.name, *sections),
+            lambda: prompt_builder.build_summary_prompt(sections, project.name, gemini_service.model_name),
+            stats
+        )
+        return {
+            "summary": project_summary,
+            "documents": {document.id: summary for document, summary in summarized},
+            "stats": stats
+        }
+
+# Global summarizer instance
+project_summarizer = ProjectSummarizer()
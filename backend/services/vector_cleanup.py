@@ -0,0 +1,122 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+from backend.database import db
+from backend.services.pinecone_service import pinecone_service
+from shared.config import Config
+
+class VectorCleanupService:
+    """Removes vectors for deleted documents and projects.
+    
+    Deletes run as background tasks so API responses do not wait on
+    Pinecone. Registry rows are only dropped once Pinecone confirms the
+    delete, so anything that still fails after retries is picked up by
+    the next reconciliation run.
+    """
+    
+    async def _with_retries(self, description: str, operation: Callable[[], Awaitable[bool]]) -> bool:
+        """Run a Pinecone operation, retrying with exponential backoff"""
+        delay = Config.VECTOR_DELETE_RETRY_DELAY
+        for attempt in range(1, Config.VECTOR_DELETE_MAX_RETRIES + 1):
+            if await operation():
+                return True
+            if attempt < Config.VECTOR_DELETE_MAX_RETRIES:
+                print(f"Retrying {description} in {delay:.1f}s (attempt {attempt} failed)")
+                await asyncio.sleep(delay)
+                delay *= 2
+        print(f"Giving up on {description} after {Config.VECTOR_DELETE_MAX_RETRIES} attempts")
+        return False
+    
+    async def delete_document_vectors(self, project_id: str, document_id: str) -> bool:
+        """Delete the registered vectors of a document"""
+        if not pinecone_service:
+            return False
+        
+        registry = await db.get_document_vectors(document_id)
+        if not registry:
+            return True
+        
+        success = await self._with_retries(
+            f"vector delete for document {document_id}",
+            lambda: pinecone_service.delete_document(project_id, document_id, registry.vector_count)
+        )
+        if success:
+            await db.delete_document_vectors(document_id)
+        return success
+    
+    async def delete_stale_vectors(self, project_id: str, document_id: str, previous_count: int) -> bool:
+        """Delete the chunks a re-ingestion no longer produced: indexes from the new count up to ``previous_count``"""
+        if not pinecone_service:
+            return False
+        
+        registry = await db.get_document_vectors(document_id)
+        current_count = registry.vector_count if registry else 0
+        if previous_count <= current_count:
+            return True
+        
+        stale_ids = [f"{document_id}_{i}" for i in range(current_count, previous_count)]
+        return await self._with_retries(
+            f"stale vector delete for document {document_id}",
+            lambda: pinecone_service.delete_vectors(f"project_{project_id}", stale_ids)
+        )
+    
+    async def delete_project_vectors(self, project_id: str) -> bool:
+        """Delete the whole vector namespace of a project"""
+        if not pinecone_service:
+            return False
+        
+        success = await self._with_retries(
+            f"namespace delete for project {project_id}",
+            lambda: pinecone_service.delete_project_namespace(project_id)
+        )
+        if success:
+            await db.delete_project_document_vectors(project_id)
+        return success
+    
+    async def reconcile_orphaned_vectors(self) -> Dict[str, int]:
+        """Find and remove vectors that no longer belong to a live document.
+        
+        Covers three cases: registry entries left behind by failed deletes,
+        namespaces of deleted projects, and vectors that were upserted but
+        never registered (e.g. a crash mid-ingestion).
+        """
+        report = {"documents": 0, "namespaces": 0, "unregistered_vectors": 0}
+        if not pinecone_service:
+            return report
+        
+        # Registry entries whose document or project is gone
+        for orphan in await db.get_orphaned_document_vectors():
+            if await self.delete_document_vectors(orphan.project_id, orphan.document_id):
+                report["documents"] += 1
+        
+        project_ids = set(await db.get_project_ids())
+        namespaces = await pinecone_service.list_namespaces()
+        
+        for namespace in namespaces:
+            if not namespace.startswith("project_"):
+                continue
+            project_id = namespace[len("project_"):]
+            
+            # Namespaces of deleted projects
+            if project_id not in project_ids:
+                if await self.delete_project_vectors(project_id):
+                    report["namespaces"] += 1
+                continue
+            
+            # Vectors in live namespaces without a registry entry
+            registered = set(await db.get_registered_document_ids(project_id))
+            vector_ids = await pinecone_service.list_vector_ids(namespace)
+            unregistered = [
+                vector_id for vector_id in vector_ids
+                if vector_id.rsplit("_", 1)[0] not in registered
+            ]
+            if unregistered and await self._with_retries(
+                f"orphan vector delete in {namespace}",
+                lambda: pinecone_service.delete_vectors(namespace, unregistered)
+            ):
+                report["unregistered_vectors"] += len(unregistered)
+        
+        print(f"Vector reconciliation finished: {report}")
+        return report
+
+# Global service instance
+vector_cleanup_service = VectorCleanupService()
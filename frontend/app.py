@@ -196,7 +196,7 @@ def show_welcome_screen():
     ---
     
     ### Quick Tips:
-    - Upload up to 20 documents per project
+    - Upload hundreds of documents per project (filter and sort them in the Documents tab)
     - Supported formats: PDF, DOCX, TXT (max 50MB each)
     - Use the chat to ask specific questions about your documents
     - Search across all projects to find relevant information
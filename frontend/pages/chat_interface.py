@@ -1,7 +1,9 @@
 import streamlit as st
 import requests
+import json
 from datetime import datetime
 from typing import List, Dict
+from urllib.parse import quote
 
 API_BASE_URL = "http://localhost:8000"
 
@@ -45,12 +47,20 @@ def show_chat_page(project_id: str):
                 
                 # AI response
                 with st.chat_message("assistant"):
+                    if chat["response"] == "🤔 Thinking...":
+                        # Stream the pending answer into this bubble, then rerun to show it
+                        st.session_state[chat_key][i] = stream_chat_response(project_id, chat["message"], st.empty())
+                        st.rerun()
+                    
                     st.write(chat["response"])
                     
                     # Show metadata if available
                     if chat.get("sources_used", 0) > 0:
                         st.caption(f"📄 Referenced {chat['sources_used']} document sections")
                     
+                    if chat.get("ttft_ms"):
+                        st.caption(f"⚡ First token after {chat['ttft_ms'] / 1000:.1f}s")
+                    
                     if chat.get("timestamp"):
                         timestamp = datetime.fromisoformat(chat['timestamp'].replace('Z', '+00:00'))
                         st.caption(f"⏰ {timestamp.strftime('%H:%M:%S')}")
@@ -70,41 +80,6 @@ def show_chat_page(project_id: str):
         # Rerun to show user message immediately
         st.rerun()
     
-    # Process the latest message if it's still "thinking"
-    if (st.session_state[chat_key] and 
-        st.session_state[chat_key][-1]["response"] == "🤔 Thinking..."):
-        
-        latest_message = st.session_state[chat_key][-1]["message"]
-        
-        # Show thinking indicator
-        with st.spinner("AI is analyzing your documents..."):
-            # Make API request
-            response = make_api_request(
-                f"/api/projects/{project_id}/chat",
-                method="POST",
-                data={"message": latest_message, "project_id": project_id}
-            )
-        
-        if response:
-            # Update the last message with the real response
-            st.session_state[chat_key][-1] = {
-                "message": latest_message,
-                "response": response["response"],
-                "sources_used": response.get("sources_used", 0),
-                "timestamp": response.get("timestamp", datetime.now().isoformat())
-            }
-        else:
-            # Update with error message
-            st.session_state[chat_key][-1] = {
-                "message": latest_message,
-                "response": "❌ Sorry, I couldn't process your request. Please try again.",
-                "sources_used": 0,
-                "timestamp": datetime.now().isoformat()
-            }
-        
-        # Rerun to show the response
-        st.rerun()
-    
     # Action buttons
     col1, col2, col3 = st.columns([1, 1, 2])
     
@@ -123,20 +98,85 @@ def show_chat_page(project_id: str):
             st.success("Chat history refreshed!")
             st.rerun()
 
+def stream_chat_response(project_id: str, message: str, placeholder) -> dict:
+    """Stream an answer over server-sent events, rendering tokens as they arrive"""
+    url = f"{API_BASE_URL}/api/projects/{project_id}/chat/stream"
+    result = {
+        "message": message,
+        "response": "❌ Sorry, I couldn't process your request. Please try again.",
+        "sources_used": 0,
+        "timestamp": datetime.now().isoformat()
+    }
+    placeholder.markdown("🤔 Thinking...")
+    
+    try:
+        with requests.post(url, json={"message": message, "project_id": project_id}, stream=True) as response:
+            response.raise_for_status()
+            
+            text = ""
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "token":
+                        text += data["text"]
+                        placeholder.markdown(text + "▌")
+                    elif event == "done":
+                        result.update(
+                            response=text,
+                            sources_used=data.get("sources_used", 0),
+                            timestamp=data.get("timestamp", result["timestamp"]),
+                            ttft_ms=data.get("ttft_ms")
+                        )
+                    elif event == "error":
+                        st.error(data.get("detail", "Streaming failed"))
+    except requests.exceptions.RequestException as e:
+        st.error(f"API Error: {str(e)}")
+    
+    placeholder.markdown(result["response"])
+    return result
+
+def _history_entries(history: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "message": chat["message"],
+            "response": chat["response"],
+            "sources_used": 0,  # Not stored in backend currently
+            "timestamp": chat["timestamp"]
+        }
+        for chat in history
+    ]
+
 def load_chat_history(project_id: str):
-    """Load chat history from backend"""
-    history = make_api_request(f"/api/projects/{project_id}/chat/history")
-    if history:
+    """Load the most recent page of chat history from backend"""
+    page = make_api_request(f"/api/projects/{project_id}/chat/history/page")
+    if page:
+        st.session_state[f"chat_history_{project_id}"] = _history_entries(page["items"])
+        st.session_state[f"chat_cursor_{project_id}"] = page.get("next_cursor")
+
+def load_older_chat_history(project_id: str):
+    """Prepend the next older page of chat history"""
+    cursor_key = f"chat_cursor_{project_id}"
+    page = make_api_request(f"/api/projects/{project_id}/chat/history/page?before={quote(st.session_state[cursor_key])}")
+    if page:
         chat_key = f"chat_history_{project_id}"
-        st.session_state[chat_key] = [
-            {
-                "message": chat["message"],
-                "response": chat["response"],
-                "sources_used": 0,  # Not stored in backend currently
-                "timestamp": chat["timestamp"]
-            }
-            for chat in history
-        ]
+        st.session_state[chat_key] = _history_entries(page["items"]) + st.session_state[chat_key]
+        st.session_state[cursor_key] = page.get("next_cursor")
+
+def show_history_search(project_id: str):
+    """Search past questions and answers in this project"""
+    with st.expander("🔎 Search Past Conversations"):
+        query = st.text_input("Search chat history", key=f"history_search_{project_id}")
+        if query:
+            results = make_api_request(f"/api/projects/{project_id}/chat/history/search?q={quote(query)}")
+            if not results:
+                st.info("No matching conversations found.")
+            for result in results or []:
+                timestamp = datetime.fromisoformat(result['timestamp'].replace('Z', '+00:00'))
+                st.markdown(f"**Q:** {result['message']}")
+                st.caption(f"{result['snippet']} · ⏰ {timestamp.strftime('%Y-%m-%d %H:%M')}")
 
 def generate_project_summary(project_id: str):
     """Generate and display project summary"""
@@ -162,6 +202,8 @@ def generate_project_summary(project_id: str):
                 for doc in summary['documents']:
                     upload_date = datetime.fromisoformat(doc['upload_date'].replace('Z', '+00:00'))
                     st.markdown(f"- **{doc['filename']}** *(uploaded {upload_date.strftime('%Y-%m-%d')})*")
+                    if doc.get('summary'):
+                        st.caption(doc['summary'])
 
 # Sample questions to help users get started
 def show_sample_questions():
@@ -214,9 +256,16 @@ def show_chat_page(project_id: str):
                 st.markdown("• How do these documents relate?")
                 st.markdown("• What should I focus on studying?")
     
+    show_history_search(project_id)
+    
     # Display chat history
     chat_container = st.container()
     with chat_container:
+        if st.session_state.get(f"chat_cursor_{project_id}"):
+            if st.button("⬆️ Load older messages"):
+                load_older_chat_history(project_id)
+                st.rerun()
+        
         if st.session_state[chat_key]:
             for i, chat in enumerate(st.session_state[chat_key]):
                 # User message
@@ -225,12 +274,20 @@ def show_chat_page(project_id: str):
                 
                 # AI response
                 with st.chat_message("assistant"):
+                    if chat["response"] == "🤔 Thinking...":
+                        # Stream the pending answer into this bubble, then rerun to show it
+                        st.session_state[chat_key][i] = stream_chat_response(project_id, chat["message"], st.empty())
+                        st.rerun()
+                    
                     st.write(chat["response"])
                     
                     # Show metadata if available
                     if chat.get("sources_used", 0) > 0:
                         st.caption(f"📄 Referenced {chat['sources_used']} document sections")
                     
+                    if chat.get("ttft_ms"):
+                        st.caption(f"⚡ First token after {chat['ttft_ms'] / 1000:.1f}s")
+                    
                     if chat.get("timestamp"):
                         timestamp = datetime.fromisoformat(chat['timestamp'].replace('Z', '+00:00'))
                         st.caption(f"⏰ {timestamp.strftime('%H:%M:%S')}")
@@ -250,41 +307,6 @@ def show_chat_page(project_id: str):
         # Rerun to show user message immediately
         st.rerun()
     
-    # Process the latest message if it's still "thinking"
-    if (st.session_state[chat_key] and 
-        st.session_state[chat_key][-1]["response"] == "🤔 Thinking..."):
-        
-        latest_message = st.session_state[chat_key][-1]["message"]
-        
-        # Show thinking indicator
-        with st.spinner("AI is analyzing your documents..."):
-            # Make API request
-            response = make_api_request(
-                f"/api/projects/{project_id}/chat",
-                method="POST",
-                data={"message": latest_message, "project_id": project_id}
-            )
-        
-        if response:
-            # Update the last message with the real response
-            st.session_state[chat_key][-1] = {
-                "message": latest_message,
-                "response": response["response"],
-                "sources_used": response.get("sources_used", 0),
-                "timestamp": response.get("timestamp", datetime.now().isoformat())
-            }
-        else:
-            # Update with error message
-            st.session_state[chat_key][-1] = {
-                "message": latest_message,
-                "response": "❌ Sorry, I couldn't process your request. Please try again.",
-                "sources_used": 0,
-                "timestamp": datetime.now().isoformat()
-            }
-        
-        # Rerun to show the response
-        st.rerun()
-    
     # Action buttons
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 1, 2])
@@ -292,6 +314,7 @@ def show_chat_page(project_id: str):
     with col1:
         if st.button("🗑️ Clear Chat"):
             st.session_state[chat_key] = []
+            st.session_state[f"chat_cursor_{project_id}"] = None
             st.rerun()
     
     with col2:
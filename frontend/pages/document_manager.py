@@ -2,8 +2,10 @@ import streamlit as st
 import requests
 from datetime import datetime
 from typing import List, Dict
+from urllib.parse import urlencode
 
 API_BASE_URL = "http://localhost:8000"
+DOCUMENTS_PER_PAGE = 25
 
 def make_api_request(endpoint: str, method: str = "GET", data: dict = None, files: dict = None):
     """Make API request to backend"""
@@ -29,7 +31,7 @@ def show_document_page(project_id: str):
     """Show document management interface"""
     
     st.markdown("### 📄 Document Management")
-    st.markdown("Upload and manage documents for this project. Supported formats: PDF, DOCX, TXT (max 50MB each, up to 20 files per project).")
+    st.markdown("Upload and manage documents for this project. Supported formats: PDF, DOCX, TXT (max 50MB each).")
     
     # Document upload section
     st.markdown("#### 📤 Upload Documents")
@@ -55,17 +57,32 @@ def show_document_page(project_id: str):
     # Document list section
     st.markdown("#### 📚 Project Documents")
     
-    # Refresh button
-    col1, col2 = st.columns([1, 4])
+    # Filter and sort controls
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
     with col1:
-        if st.button("🔄 Refresh"):
-            st.rerun()
+        name_filter = st.text_input("Filter by name", key=f"doc_filter_{project_id}")
+    with col2:
+        sort_labels = {"Upload date": "upload_date", "Name": "filename", "Size": "file_size"}
+        sort = sort_labels[st.selectbox("Sort by", list(sort_labels), key=f"doc_sort_{project_id}")]
+    with col3:
+        order = "desc" if st.selectbox("Order", ["↓", "↑"], key=f"doc_order_{project_id}") == "↓" else "asc"
+    with col4:
+        st.markdown("&nbsp;")
+        refresh = st.button("🔄 Refresh")
     
-    # Get and display documents
-    documents = get_project_documents(project_id)
+    # Documents are fetched a page at a time; a new filter or sort starts over
+    query = {"sort": sort, "order": order}
+    if name_filter:
+        query["q"] = name_filter
+    listing_key = f"doc_listing_{project_id}"
+    listing = st.session_state.get(listing_key)
+    if refresh or not listing or listing["query"] != query:
+        listing = load_documents_page(project_id, query)
+        st.session_state[listing_key] = listing
+    documents = listing["items"]
     
     if documents:
-        st.success(f"Found {len(documents)} document(s) in this project")
+        st.success(f"Showing {len(documents)} of {listing['total']} document(s)")
         
         # Display documents in a nice format
         for i, doc in enumerate(documents):
@@ -81,6 +98,19 @@ def show_document_page(project_id: str):
                     upload_date = datetime.fromisoformat(doc['upload_date'].replace('Z', '+00:00'))
                     file_size_mb = doc['file_size'] / (1024 * 1024)
                     st.caption(f"Uploaded: {upload_date.strftime('%Y-%m-%d %H:%M')} • Size: {file_size_mb:.1f} MB")
+                    if doc.get('status', 'ready') != 'ready':
+                        st.caption(f"⏳ {doc['status'].capitalize()}")
+                    
+                    # Precomputed summary, outline and key terms (ready shortly after upload)
+                    insights = doc.get('insights')
+                    if insights:
+                        with st.expander("📝 Summary"):
+                            st.markdown(insights['summary'])
+                            if insights['outline']:
+                                st.markdown("**Outline**")
+                                st.markdown("\n".join(f"- {item}" for item in insights['outline']))
+                            if insights['key_terms']:
+                                st.markdown(f"**Key terms:** {', '.join(insights['key_terms'])}")
                 
                 with col2:
                     st.markdown(f"**{doc['file_type'].upper()}**")
@@ -97,22 +127,33 @@ def show_document_page(project_id: str):
                 
                 st.markdown("---")
         
-        # Show storage usage
-        total_size = sum(doc['file_size'] for doc in documents)
-        total_size_mb = total_size / (1024 * 1024)
-        max_files = 20  # From config
+        if listing["next_cursor"]:
+            if st.button("⬇️ Load more documents"):
+                page = load_documents_page(project_id, query, listing["next_cursor"])
+                listing["items"] = documents + page["items"]
+                listing["next_cursor"] = page["next_cursor"]
+                st.rerun()
+        
+        # Show storage usage from the project's counters
+        stats = make_api_request(f"/api/projects/{project_id}/stats") or {}
+        total_size_mb = stats.get('total_bytes', 0) / (1024 * 1024)
+        file_count = stats.get('document_count', listing['total'])
+        max_files = listing['max_documents']
         
         col1, col2 = st.columns(2)
         with col1:
             st.metric("📊 Storage Used", f"{total_size_mb:.1f} MB")
         with col2:
-            st.metric("📁 Files", f"{len(documents)}/{max_files}")
+            st.metric("📁 Files", f"{file_count}/{max_files}")
         
         # Progress bar for file count
-        progress = len(documents) / max_files
+        progress = min(file_count / max_files, 1.0)
         st.progress(progress)
         if progress > 0.8:
-            st.warning(f"You're using {len(documents)} out of {max_files} available file slots.")
+            st.warning(f"You're using {file_count} out of {max_files} available file slots.")
+    
+    elif name_filter:
+        st.info("No documents match this filter.")
     
     else:
         st.info("📋 No documents uploaded yet. Use the upload section above to add your first documents!")
@@ -141,6 +182,16 @@ def get_project_documents(project_id: str):
     """Get documents for a project"""
     return make_api_request(f"/api/projects/{project_id}/documents")
 
+def load_documents_page(project_id: str, query: Dict, cursor: str = None) -> Dict:
+    """Fetch one page of the project's documents for the given sort and filter"""
+    params = dict(query, limit=DOCUMENTS_PER_PAGE)
+    if cursor:
+        params["cursor"] = cursor
+    page = make_api_request(f"/api/projects/{project_id}/documents/page?{urlencode(params)}")
+    if not page:
+        return {"query": query, "items": [], "total": 0, "max_documents": 0, "next_cursor": None}
+    return dict(page, query=query)
+
 def upload_documents(project_id: str, uploaded_files):
     """Upload documents to the project"""
     if len(uploaded_files) == 1:
@@ -156,6 +207,7 @@ def upload_documents(project_id: str, uploaded_files):
             
             if result:
                 st.success(f"✅ Successfully uploaded {file.name}")
+                st.session_state.pop(f"doc_listing_{project_id}", None)
                 st.rerun()
             else:
                 st.error(f"❌ Failed to upload {file.name}")
@@ -185,6 +237,7 @@ def upload_documents(project_id: str, uploaded_files):
             else:
                 st.error("❌ Failed to upload any files")
             
+            st.session_state.pop(f"doc_listing_{project_id}", None)
             st.rerun()
 
 def delete_document(project_id: str, document_id: str, filename: str):
@@ -202,6 +255,7 @@ def delete_document(project_id: str, document_id: str, filename: str):
                 # Clear confirmation state
                 if f"confirm_delete_{document_id}" in st.session_state:
                     del st.session_state[f"confirm_delete_{document_id}"]
+                st.session_state.pop(f"doc_listing_{project_id}", None)
                 st.rerun()
             else:
                 st.error(f"❌ Failed to delete {filename}")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the list endpoints at 10k rows.
+
+Fills a throwaway database with one project holding BENCH_ROWS documents
+and chat turns (plus BENCH_ROWS projects), then measures:
+
+- requests/s of GET /api/projects/, /documents/ and /chat/history
+  through the ASGI app in-process (no network);
+- the row-to-JSON cost per list, comparing per-row model construction
+  encoded through FastAPI's jsonable_encoder and json (the previous path)
+  with one bulk validation pass serialized by pydantic-core.
+
+Usage:
+    python scripts/bench_list_endpoints.py
+    BENCH_ROWS=50000 BENCH_REQUESTS=20 python scripts/bench_list_endpoints.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+ROWS = int(os.getenv("BENCH_ROWS", "10000"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "10"))
+
+# Point the app at a scratch database and offline backends before importing it
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("VECTOR_BACKEND", "memory")
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from backend.database import db
+from backend.main import app
+from backend.migrations import apply_migrations
+from backend.models import ChatHistory
+from backend.serialization import list_response, models_from_rows
+
+def fill_database(db_path: str) -> str:
+    """Insert the benchmark rows in one transaction, returning the busy project's id"""
+    import sqlite3
+    apply_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    start = datetime.now() - timedelta(days=30)
+    project_id = str(uuid.uuid4())
+    with conn:
+        conn.executemany(
+            "INSERT INTO projects (id, name, description, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (project_id if i == 0 else str(uuid.uuid4()), f"Project {i}", "Benchmark project", start, start + timedelta(seconds=i))
+                for i in range(ROWS)
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO documents (id, project_id, filename, file_type, file_size, upload_date) VALUES (?, ?, ?, ?, ?, ?)",
+            [(str(uuid.uuid4()), project_id, f"notes_{i}.pdf", "pdf", 1024 * i, start + timedelta(seconds=i)) for i in range(ROWS)]
+        )
+        conn.executemany(
+            "INSERT INTO chat_history (id, project_id, message, response, timestamp) VALUES (?, ?, ?, ?, ?)",
+            [
+                (str(uuid.uuid4()), project_id, f"Question {i} about the notes?", f"Answer {i}. " * 20, start + timedelta(seconds=i))
+                for i in range(ROWS)
+            ]
+        )
+    conn.close()
+    return project_id
+
+async def endpoint_throughput(client: httpx.AsyncClient, url: str) -> float:
+    await client.get(url)  # warm up
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = await client.get(url)
+        response.raise_for_status()
+    return REQUESTS / (time.perf_counter() - start)
+
+async def serialization_cost(project_id: str):
+    """Milliseconds to turn the chat history rows into JSON bytes, per-row vs bulk"""
+    async with db.pool.reader() as conn:
+        cursor = await conn.execute(
+            "SELECT id, project_id, message, response, timestamp FROM chat_history WHERE project_id = ?",
+            (project_id,)
+        )
+        rows = await cursor.fetchall()
+    
+    start = time.perf_counter()
+    per_row = [
+        ChatHistory(id=row[0], project_id=row[1], message=row[2], response=row[3], timestamp=datetime.fromisoformat(row[4]))
+        for row in rows
+    ]
+    json.dumps(jsonable_encoder(per_row)).encode()
+    per_row_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    list_response(ChatHistory, models_from_rows(ChatHistory, ("id", "project_id", "message", "response", "timestamp"), rows))
+    bulk_ms = (time.perf_counter() - start) * 1000
+    return per_row_ms, bulk_ms
+
+async def main():
+    project_id = fill_database(os.environ["DATABASE_PATH"])
+    print(f"Benchmarking with {ROWS} rows per table, {REQUESTS} requests per endpoint\n")
+    
+    endpoints = {
+        "GET /api/projects/": "/api/projects/",
+        "GET /documents/": f"/api/projects/{project_id}/documents/",
+        "GET /chat/history": f"/api/projects/{project_id}/chat/history?limit={ROWS}",
+    }
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, url in endpoints.items():
+                rate = await endpoint_throughput(client, url)
+                print(f"{name:<22} {rate:8.1f} req/s  {1000 / rate:8.1f} ms/request")
+        
+        per_row_ms, bulk_ms = await serialization_cost(project_id)
+        print(f"\nRows to JSON ({ROWS} chat turns): per-row {per_row_ms:.1f} ms, bulk {bulk_ms:.1f} ms "
+              f"({per_row_ms / bulk_ms:.1f}x)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
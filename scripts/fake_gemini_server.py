@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Gemini API, for load and latency testing.
+
+Speaks the subset of the Gemini REST API the backend uses
+(generateContent, streamGenerateContent, embedContent,
+batchEmbedContents, countTokens, cachedContents) so the real SDK code
+path is exercised.
+Embeddings are deterministic hashed bag-of-words vectors, so similar
+texts still retrieve each other. Latency, errors and 429s are injected
+according to the FAKE_* settings in shared/config.py.
+
+Usage:
+    python scripts/fake_gemini_server.py
+    LLM_BACKEND=fake VECTOR_BACKEND=memory python start_backend.py
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from shared.config import Config
+
+app = FastAPI(title="Fake Gemini API")
+
+# Cached contents by name, with the prompt text they stand for
+cached_contents: Dict[str, dict] = {}
+
+def fake_embedding(text: str) -> List[float]:
+    """Deterministic unit vector built by hashing the words of the text"""
+    vector = [0.0] * Config.VECTOR_DIMENSION
+    for token in re.findall(r"\w+", text.lower()) or [text]:
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % Config.VECTOR_DIMENSION
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+def fake_answer(prompt: str) -> str:
+    """Deterministic response text whose length follows the prompt"""
+    seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    words = re.findall(r"\w+", prompt) or ["study"]
+    return " ".join(rng.choice(words) for _ in range(Config.FAKE_LLM_RESPONSE_WORDS)) + "."
+
+def _prompt_text(body: dict) -> str:
+    return "\n".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+def _cached_text(body: dict) -> str:
+    """Prompt text held by the cached content a request refers to, if any"""
+    name = body.get("cachedContent")
+    return cached_contents[name]["text"] + "\n" if name in cached_contents else ""
+
+def _injected_error():
+    """Return an error response according to the configured rates, if any"""
+    roll = random.random()
+    if roll < Config.FAKE_RATE_LIMIT_RATE:
+        return JSONResponse(status_code=429, content={"error": {
+            "code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"
+        }})
+    if roll < Config.FAKE_RATE_LIMIT_RATE + Config.FAKE_ERROR_RATE:
+        return JSONResponse(status_code=500, content={"error": {
+            "code": 500, "message": "Injected internal error", "status": "INTERNAL"
+        }})
+    return None
+
+async def _sleep_ms(base_ms: float):
+    jitter = random.uniform(0, Config.FAKE_LATENCY_JITTER_MS)
+    await asyncio.sleep((base_ms + jitter) / 1000)
+
+def _candidate(text: str, finish: bool = True) -> dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+@app.post("/v1beta/cachedContents")
+async def create_cached_content(request: Request):
+    body = await request.json()
+    system = "\n".join(part.get("text", "") for part in body.get("systemInstruction", {}).get("parts", []))
+    text = system + "\n" + _prompt_text(body)
+    now = datetime.now(timezone.utc)
+    ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+    cached = {
+        "name": f"cachedContents/{uuid.uuid4().hex}",
+        "model": body.get("model", ""),
+        "displayName": body.get("displayName", ""),
+        "createTime": now.isoformat().replace("+00:00", "Z"),
+        "updateTime": now.isoformat().replace("+00:00", "Z"),
+        "expireTime": (now + timedelta(seconds=ttl)).isoformat().replace("+00:00", "Z"),
+        "usageMetadata": {"totalTokenCount": max(1, len(text) // 4)}
+    }
+    cached_contents[cached["name"]] = {**cached, "text": text}
+    return cached
+
+@app.delete("/v1beta/cachedContents/{cache_id}")
+async def delete_cached_content(cache_id: str):
+    if cached_contents.pop(f"cachedContents/{cache_id}", None) is None:
+        return JSONResponse(status_code=404, content={"error": {
+            "code": 404, "message": f"CachedContent not found: {cache_id}", "status": "NOT_FOUND"
+        }})
+    return {}
+
+@app.post("/v1beta/models/{model_action}")
+async def model_action(model_action: str, request: Request):
+    model, _, action = model_action.partition(":")
+    body = await request.json()
+
+    error = _injected_error()
+    if error:
+        return error
+
+    if action == "embedContent":
+        await _sleep_ms(Config.FAKE_EMBEDDING_LATENCY_MS)
+        return {"embedding": {"values": fake_embedding(_prompt_text({"contents": [body.get("content", {})]}))}}
+
+    if action == "batchEmbedContents":
+        await _sleep_ms(Config.FAKE_EMBEDDING_LATENCY_MS)
+        return {"embeddings": [
+            {"values": fake_embedding(_prompt_text({"contents": [item.get("content", {})]}))}
+            for item in body.get("requests", [])
+        ]}
+
+    if action == "countTokens":
+        text = _prompt_text(body) or _prompt_text(body.get("generateContentRequest", {}))
+        return {"totalTokens": max(1, len(text) // 4)}
+
+    if body.get("cachedContent") and body["cachedContent"] not in cached_contents:
+        return JSONResponse(status_code=404, content={"error": {
+            "code": 404, "message": f"CachedContent not found: {body['cachedContent']}", "status": "NOT_FOUND"
+        }})
+
+    if action == "generateContent":
+        await _sleep_ms(Config.FAKE_LLM_LATENCY_MS)
+        answer = fake_answer(_cached_text(body) + _prompt_text(body))
+        return {**_candidate(answer), "usageMetadata": {
+            "promptTokenCount": len(_cached_text(body) + _prompt_text(body)) // 4,
+            "cachedContentTokenCount": len(_cached_text(body)) // 4,
+            "candidatesTokenCount": len(answer) // 4
+        }}
+
+    if action == "streamGenerateContent":
+        words = fake_answer(_cached_text(body) + _prompt_text(body)).split(" ")
+
+        async def stream():
+            # The SDK's REST transport reads a streamed JSON array
+            await _sleep_ms(Config.FAKE_LLM_LATENCY_MS)
+            yield "["
+            for i, word in enumerate(words):
+                if i:
+                    yield ","
+                    await _sleep_ms(Config.FAKE_TOKEN_LATENCY_MS)
+                yield json.dumps(_candidate(word + " ", finish=i == len(words) - 1))
+            yield "]"
+
+        return StreamingResponse(stream(), media_type="application/json")
+
+    return JSONResponse(status_code=404, content={"error": {
+        "code": 404, "message": f"Unknown action {action} for {model}", "status": "NOT_FOUND"
+    }})
+
+if __name__ == "__main__":
+    host, _, port = Config.FAKE_LLM_URL.split("://")[-1].partition(":")
+    uvicorn.run(app, host=host, port=int(port or 80), log_level="warning")
@@ -1,59 +1,19 @@
-import sqlite3
 import os
-from datetime import datetime
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.migrations import apply_migrations
 
 def init_database(db_path: str = "studybuddy.db"):
-    """Initialize the SQLite database with required tables."""
+    """Initialize the SQLite database, applying any pending schema migrations."""
     
     # Create database directory if it doesn't exist
     os.makedirs(os.path.dirname(db_path) if os.path.dirname(db_path) else ".", exist_ok=True)
     
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Create projects table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS projects (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create documents table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS documents (
-            id TEXT PRIMARY KEY,
-            project_id TEXT NOT NULL,
-            filename TEXT NOT NULL,
-            file_type TEXT NOT NULL,
-            file_size INTEGER,
-            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-        )
-    """)
-    
-    # Create chat_history table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS chat_history (
-            id TEXT PRIMARY KEY,
-            project_id TEXT NOT NULL,
-            message TEXT NOT NULL,
-            response TEXT NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-        )
-    """)
-    
-    # Create indexes for better performance
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_project_id ON documents(project_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_project_id ON chat_history(project_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp)")
-    
-    conn.commit()
-    conn.close()
+    apply_migrations(db_path)
     
     print(f"Database initialized successfully at: {db_path}")
 
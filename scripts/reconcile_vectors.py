@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Remove orphaned vectors from Pinecone.
+
+Run periodically (e.g. from cron) to clean up vectors whose documents or
+projects were deleted while Pinecone was unreachable.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.services.vector_cleanup import vector_cleanup_service
+
+if __name__ == "__main__":
+    report = asyncio.run(vector_cleanup_service.reconcile_orphaned_vectors())
+    print(f"Removed {report['documents']} orphaned documents, "
+          f"{report['namespaces']} namespaces and "
+          f"{report['unregistered_vectors']} unregistered vectors")
@@ -3,13 +3,57 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _parse_token_budgets(value: str) -> dict:
+    """Parse "model=tokens,model=tokens" into a dict"""
+    budgets = {}
+    for item in value.split(","):
+        if "=" in item:
+            model, tokens = item.split("=", 1)
+            budgets[model.strip()] = int(tokens)
+    return budgets
+
+def _parse_model_routes(value: str) -> dict:
+    """Parse "route=tier,route=tier" into a dict"""
+    routes = {}
+    for item in value.split(","):
+        if "=" in item:
+            route, tier = item.split("=", 1)
+            routes[route.strip()] = tier.strip().lower()
+    return routes
+
 class Config:
     # API Keys
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     
+    # Backend Selection
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")  # "gemini" or "fake" (scripts/fake_gemini_server.py)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")  # "pinecone" or "memory"
+    
+    # Offline Stand-in Settings (load and latency testing)
+    FAKE_LLM_URL = os.getenv("FAKE_LLM_URL", "http://127.0.0.1:8090")
+    FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+    FAKE_TOKEN_LATENCY_MS = float(os.getenv("FAKE_TOKEN_LATENCY_MS", "20"))
+    FAKE_EMBEDDING_LATENCY_MS = float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", "50"))
+    FAKE_VECTOR_LATENCY_MS = float(os.getenv("FAKE_VECTOR_LATENCY_MS", "30"))
+    FAKE_LATENCY_JITTER_MS = float(os.getenv("FAKE_LATENCY_JITTER_MS", "0"))
+    FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))  # fraction of calls answered with 500
+    FAKE_RATE_LIMIT_RATE = float(os.getenv("FAKE_RATE_LIMIT_RATE", "0"))  # fraction of calls answered with 429
+    FAKE_LLM_RESPONSE_WORDS = int(os.getenv("FAKE_LLM_RESPONSE_WORDS", "120"))
+    
     # Database
     DATABASE_PATH = os.getenv("DATABASE_PATH", "./studybuddy.db")
+    SQLITE_READERS = int(os.getenv("SQLITE_READERS", "4"))  # read-only pooled connections next to the single writer
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))  # page cache per connection
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))  # prepared statements kept per connection
+    DB_OPTIMIZE_INTERVAL = int(os.getenv("DB_OPTIMIZE_INTERVAL", "3600"))  # seconds between PRAGMA optimize runs
+    DB_ANALYZE_INTERVAL = int(os.getenv("DB_ANALYZE_INTERVAL", "86400"))  # seconds between full ANALYZE runs
+    SQLITE_ANALYSIS_LIMIT = int(os.getenv("SQLITE_ANALYSIS_LIMIT", "1000"))  # rows sampled per index by ANALYZE
+    PROJECT_CACHE_TTL = float(os.getenv("PROJECT_CACHE_TTL", "60"))  # seconds a cached project lookup stays valid
+    PROJECT_CACHE_SIZE = int(os.getenv("PROJECT_CACHE_SIZE", "1024"))
+    CHAT_HISTORY_PAGE_MAX = int(os.getenv("CHAT_HISTORY_PAGE_MAX", "200"))  # largest history page or search result list
     
     # Security
     SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -20,12 +64,101 @@ class Config:
     
     # File Upload Settings
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
-    MAX_FILES_PER_PROJECT = 20
+    MAX_FILES_PER_PROJECT = int(os.getenv("MAX_FILES_PER_PROJECT", "1000"))
+    STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL", "0.5"))  # seconds a status change may wait to be batched
+    STATUS_FLUSH_BATCH = int(os.getenv("STATUS_FLUSH_BATCH", "100"))  # flush early once this many documents are waiting
+    DOCUMENT_PAGE_MAX = int(os.getenv("DOCUMENT_PAGE_MAX", "200"))  # largest page of the document listing
     ALLOWED_EXTENSIONS = {".pdf", ".txt", ".docx"}
+    BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "./blobs")  # originals of uploaded files, by content hash
+    BLOB_COMPRESSION_LEVEL = int(os.getenv("BLOB_COMPRESSION_LEVEL", "6"))  # zlib level
+    BLOB_MIN_COMPRESSION_SAVING = 0.1  # store raw unless compression saves at least this fraction
+    REPROCESS_BATCH = int(os.getenv("REPROCESS_BATCH", "50"))  # documents read from the database per batch
+    REPROCESS_CONCURRENCY = int(os.getenv("REPROCESS_CONCURRENCY", "2"))  # documents re-ingested in parallel
     
     # Vector Database Settings
     VECTOR_DIMENSION = 768  # Gemini embedding dimension
     
+    # Search Settings
+    MAX_BATCH_SEARCH_QUERIES = int(os.getenv("MAX_BATCH_SEARCH_QUERIES", "50"))
+    EMBEDDING_BATCH_SIZE = 100  # Max texts per batchEmbedContents call
+    
+    # Vector Store Client Settings
+    PINECONE_POOL_SIZE = int(os.getenv("PINECONE_POOL_SIZE", "50"))  # worker threads and keep-alive connections
+    VECTOR_CALL_TIMEOUT = float(os.getenv("VECTOR_CALL_TIMEOUT", "10"))  # seconds per Pinecone call
+    VECTOR_UPSERT_BATCH_SIZE = 100  # Pinecone recommended vectors per upsert request
+    
+    # Vector Cleanup Settings
+    VECTOR_DELETE_BATCH_SIZE = 1000  # Pinecone limit for IDs per delete call
+    VECTOR_DELETE_MAX_RETRIES = int(os.getenv("VECTOR_DELETE_MAX_RETRIES", "3"))
+    VECTOR_DELETE_RETRY_DELAY = float(os.getenv("VECTOR_DELETE_RETRY_DELAY", "1.0"))  # seconds, doubled per attempt
+    VECTOR_STATS_REFRESH_INTERVAL = int(os.getenv("VECTOR_STATS_REFRESH_INTERVAL", "300"))  # seconds
+    
+    # Request Deadlines and Hedging
+    REQUEST_DEADLINE_MS = int(os.getenv("REQUEST_DEADLINE_MS", "120000"))  # clients may shorten it with X-Request-Timeout-Ms
+    DISCONNECT_POLL_INTERVAL = 0.25  # seconds between client disconnect checks
+    HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "true").lower() == "true"  # backup requests for idempotent upstream calls
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))  # send the backup once the first call is this slow
+    HEDGE_MIN_SAMPLES = 20  # latency samples needed before hedging a stage
+    
     # Text Processing
     CHUNK_SIZE = 1000
-    CHUNK_OVERLAP = 200
\ No newline at end of file
+    CHUNK_OVERLAP = 200
+    
+    # Generation Settings
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+    LLM_COALESCE_REQUESTS = os.getenv("LLM_COALESCE_REQUESTS", "true").lower() == "true"  # share identical in-flight calls
+    
+    # Model Routing (per request between a fast and a strong model)
+    GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash")
+    MODEL_ROUTES = _parse_model_routes(  # tier per route: "auto", "fast" or "strong"
+        os.getenv("MODEL_ROUTES", "chat=auto,stream=auto,summary=strong,memory=fast,insights=fast")
+    )
+    ROUTER_FAST_MAX_QUERY_CHARS = int(os.getenv("ROUTER_FAST_MAX_QUERY_CHARS", "200"))
+    ROUTER_FAST_MAX_CONTEXT_TOKENS = int(os.getenv("ROUTER_FAST_MAX_CONTEXT_TOKENS", "4000"))
+    ROUTER_STRONG_MIN_BUDGET_MS = int(os.getenv("ROUTER_STRONG_MIN_BUDGET_MS", "4000"))  # below this, stay on the fast model
+    ROUTER_ESCALATE_LOW_CONFIDENCE = os.getenv("ROUTER_ESCALATE_LOW_CONFIDENCE", "true").lower() == "true"
+    ROUTER_DECISION_LOG_SIZE = 500  # recent decisions kept for /api/admin/routing
+    
+    # Context Caching (explicit Gemini cached contexts for hot projects)
+    CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", "600"))  # seconds
+    CONTEXT_CACHE_HOT_REQUESTS = int(os.getenv("CONTEXT_CACHE_HOT_REQUESTS", "5"))  # requests within the window that make a project hot
+    CONTEXT_CACHE_HOT_WINDOW = int(os.getenv("CONTEXT_CACHE_HOT_WINDOW", "300"))  # seconds
+    CONTEXT_CACHE_MAX_CHUNKS = int(os.getenv("CONTEXT_CACHE_MAX_CHUNKS", "40"))  # most retrieved chunks kept in a cache
+    CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "4096"))  # Gemini minimum for cached content
+    
+    # Prompt Budgets (input tokens per prompt)
+    MODEL_PROMPT_TOKEN_BUDGETS = _parse_token_budgets(
+        os.getenv("PROMPT_TOKEN_BUDGETS", "gemini-2.5-pro=32000,gemini-2.5-flash=16000")
+    )
+    DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv("DEFAULT_PROMPT_TOKEN_BUDGET", "16000"))
+    PROMPT_TOKEN_COUNTER = os.getenv("PROMPT_TOKEN_COUNTER", "local")  # "local" estimate or "api" (cached countTokens)
+    MIN_CONTEXT_SECTION_TOKENS = 50  # Don't bother adding context sections smaller than this
+    
+    # Conversation Memory
+    MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "4"))  # turns included verbatim
+    MEMORY_TURN_TOKENS = int(os.getenv("MEMORY_TURN_TOKENS", "300"))  # cap per verbatim turn
+    MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "600"))  # cap for the running summary
+    MEMORY_SUMMARY_MIN_TURNS = int(os.getenv("MEMORY_SUMMARY_MIN_TURNS", "4"))  # aged-out turns needed before folding
+    MEMORY_SUMMARY_BATCH = 20  # max turns folded into the summary per update
+    
+    # Chat History Retention (moves old turns into a compressed archive table)
+    CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", "90"))  # turns older than this are archived; 0 disables
+    CHAT_RETENTION_MIN_TURNS = int(os.getenv("CHAT_RETENTION_MIN_TURNS", "200"))  # newest turns per project always kept live
+    CHAT_ARCHIVE_SUMMARIZED_ONLY = os.getenv("CHAT_ARCHIVE_SUMMARIZED_ONLY", "true").lower() == "true"  # wait until turns are in the rolling summary
+    CHAT_ARCHIVE_BATCH = int(os.getenv("CHAT_ARCHIVE_BATCH", "200"))  # turns moved per write transaction
+    CHAT_ARCHIVE_PAUSE = float(os.getenv("CHAT_ARCHIVE_PAUSE", "0.1"))  # seconds between batches, leaving the writer to requests
+    CHAT_ARCHIVE_INTERVAL = int(os.getenv("CHAT_ARCHIVE_INTERVAL", "3600"))  # seconds between retention runs
+    DB_VACUUM_INTERVAL = int(os.getenv("DB_VACUUM_INTERVAL", "3600"))  # seconds between incremental vacuum runs
+    DB_VACUUM_STEP_PAGES = int(os.getenv("DB_VACUUM_STEP_PAGES", "500"))  # free pages reclaimed per write transaction
+    
+    # Project Summarization (map-reduce)
+    SUMMARY_CHUNK_GROUP_SIZE = int(os.getenv("SUMMARY_CHUNK_GROUP_SIZE", "8"))  # chunks per map-step prompt
+    SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))  # parallel summarization calls
+    VECTOR_FETCH_BATCH_SIZE = 100  # IDs per Pinecone fetch request
+    
+    # Document Insights (generated after ingestion on the low-priority queue)
+    DOCUMENT_INSIGHTS_ENABLED = os.getenv("DOCUMENT_INSIGHTS_ENABLED", "true").lower() == "true"
+    INSIGHTS_KEY_TERMS = 10  # max key terms stored per document
+    BACKGROUND_QUEUE_WORKERS = int(os.getenv("BACKGROUND_QUEUE_WORKERS", "1"))
+    BACKGROUND_QUEUE_PAUSE = float(os.getenv("BACKGROUND_QUEUE_PAUSE", "0.5"))  # seconds between low-priority jobs
\ No newline at end of file
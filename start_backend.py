@@ -28,7 +28,11 @@ def check_environment():
     if env_file.exists():
         print(f"🔍 .env file path: {env_file.absolute()}")
     
-    required_vars = ['GEMINI_API_KEY', 'PINECONE_API_KEY']
+    required_vars = []
+    if os.getenv('LLM_BACKEND', 'gemini') != 'fake':
+        required_vars.append('GEMINI_API_KEY')
+    if os.getenv('VECTOR_BACKEND', 'pinecone') != 'memory':
+        required_vars.append('PINECONE_API_KEY')
     missing_vars = []
     
     for var in required_vars: